@@ -1,6 +1,10 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-from actions import run_assistant
+import time
+
+started = time.perf_counter()
+
+from actions import run_assistant  # noqa: E402
 
 if __name__ == "__main__":
-    run_assistant()
+    run_assistant(started)
@@ -1,26 +1,76 @@
+import threading
+import time
+from functools import wraps
+from itertools import chain
+
 from assistant.assistant import Assistant, TestAssistant
-from openhab.openhab import OpenHAB
-from genderdeterminator import GenderDeterminator, Case
+from assistant.injection import InjectionRecord, assistant_identity
+from common.tracing import StartupTimer, traced
+from openhab.coalescer import CommandCoalescer
 
 USER_PREFIX = "Alpha200"
 
 UNKNOWN_DEVICE = "Ich habe nicht verstanden, welches Gerät du {} möchtest."
 UNKNOWN_TEMPERATURE = "Die Temperatur {} ist unbekannt."
+UNKNOWN_STATES = "Die Zustände der Geräte {} sind unbekannt."
 UNKNOWN_PROPERTY = "Ich habe nicht verstanden, welche Eigenschaft verändert werden soll."
 FEATURE_NOT_IMPLEMENTED = "Diese Funktionalität ist aktuell nicht implementiert."
+DEVICES_FAILED = "Folgende Geräte haben nicht reagiert: {}."
+NOT_READY = "Ich bin noch nicht bereit. Bitte versuche es gleich noch einmal."
+
+STARTUP_RETRY_INTERVAL = 10
 
-gd = GenderDeterminator()
 openhab = None
+coalescer = None
+injection_record = InjectionRecord()
+site_languages = {}
+ready = threading.Event()
+startup_timer = StartupTimer()
+
+
+def gender_determinator():
+    # genderdeterminator takes a while to import, so it is imported when the first response needs it
+    from actions.grammar import gender_determinator as shared_gender_determinator
+
+    return shared_gender_determinator()
 
 
 def inject_items(assistant):
+    """
+    Inject the names of the devices and rooms into the Snips model. Only values which have not been injected before
+    are sent, all values are injected again only if values have been removed. The record of the injected values is
+    stored once Snips has completed the injection.
+    """
+    items, locations = openhab.get_injections()
+    entities = dict(device=items, room=locations)
+
+    with injection_record.lock:
+        changes = injection_record.changes(entities)
+
+        if changes is None:
+            return
+
+        injected_entities, from_vanilla = changes
+        record = injection_record
+        record.update(entities)
+        assistant.inject(injected_entities, from_vanilla=from_vanilla, on_complete=lambda: record.store(entities))
+
+
+def precompute_genders():
+    """
+    Determine the genders of all device and room names once, so that responses don't have to look them up.
+    """
     items, locations = openhab.get_injections()
+    descriptions = (item.description() for item in openhab.items.values())
 
-    assistant.inject(dict(device=items, room=locations))
+    gender_determinator().precompute(chain(items, locations, descriptions))
 
 
+@traced("sentence")
 def add_local_preposition(noun):
-    word = gd.get(noun, Case.DATIVE, append=False)
+    from genderdeterminator import Case
+
+    word = gender_determinator().get(noun, Case.DATIVE, append=False)
     word = "im" if word == "dem" else "in der"
     return "{} {}".format(word, noun)
 
@@ -29,6 +79,28 @@ def user_intent(intent_name):
     return "{}:{}".format(USER_PREFIX, intent_name)
 
 
+def parse_site_languages(value):
+    """
+    Parse the comma separated list of site id and language pairs of the configuration, e.g. "kueche:en,bad:en".
+    """
+    languages = {}
+
+    for entry in value.split(","):
+        if entry.strip() != "":
+            site_id, _, lang = entry.partition(":")
+            languages[site_id.strip()] = lang.strip()
+
+    return languages
+
+
+def get_language(intent_message):
+    """
+    Return the language of the site the intent was spoken at or None for the default language.
+    """
+    return site_languages.get(intent_message.site_id)
+
+
+@traced("slots")
 def get_items_and_room(intent_message):
     if len(intent_message.slots.room) > 0:
         room = intent_message.slots.room.first().value
@@ -43,9 +115,23 @@ def get_items_and_room(intent_message):
     return devices, room
 
 
-def generate_switch_result_sentence(devices, command):
+@traced("sentence")
+def join_devices(devices):
+    from genderdeterminator import Case
+
     l_devices = list(devices)
+    gd = gender_determinator()
+
+    if len(l_devices) == 1:
+        return gd.get(l_devices[0].description(), Case.ACCUSATIVE)
+    else:
+        return ", ".join(
+            gd.get(device.description(), Case.ACCUSATIVE) for device in l_devices[:len(l_devices) - 1]
+        ) + " und " + gd.get(l_devices[len(l_devices) - 1].description(), Case.ACCUSATIVE)
 
+
+@traced("sentence")
+def generate_switch_result_sentence(devices, command):
     if command == "ON":
         command_spoken = "eingeschaltet"
     elif command == "OFF":
@@ -53,14 +139,26 @@ def generate_switch_result_sentence(devices, command):
     else:
         command_spoken = ""
 
-    if len(l_devices) == 1:
-        return "Ich habe dir {} {}.".format(gd.get(l_devices[0].description(), Case.ACCUSATIVE), command_spoken)
-    else:
-        return "Ich habe dir {} {}.".format(
-            ", ".join(gd.get(device.description(), Case.ACCUSATIVE) for device in l_devices[:len(l_devices) - 1])
-            + " und " + gd.get(l_devices[len(l_devices) - 1].description(), Case.ACCUSATIVE),
-            command_spoken
-        )
+    return "Ich habe dir {} {}.".format(join_devices(devices), command_spoken)
+
+
+def get_failed_relevant_devices(failed_devices, relevant_devices):
+    """
+    Map the items a command failed for to the devices the user asked for. Points of an equipment are reported as the
+    equipment itself.
+    """
+    failed = set()
+
+    for device in failed_devices:
+        if device not in relevant_devices and device.is_point_of in openhab.items:
+            equipment = openhab.items[device.is_point_of]
+
+            if equipment in relevant_devices:
+                device = equipment
+
+        failed.add(device)
+
+    return failed
 
 
 def get_room_for_current_site(intent_message, default_room):
@@ -74,7 +172,7 @@ def what_do_you_know_about_callback(assistant, intent_message, conf):
     devices, spoken_room = get_items_and_room(intent_message)
 
     if spoken_room is not None:
-        room = openhab.get_location(spoken_room)
+        room = openhab.get_location(spoken_room, lang=get_language(intent_message))
 
         if room is None:
             return False, "Ich habe keinen Ort mit der Bezeichnung {location} gefunden.".format(location=spoken_room)
@@ -87,7 +185,7 @@ def what_do_you_know_about_callback(assistant, intent_message, conf):
         )
 
         if len(room.synonyms) > 0 or room.semantics is not None:
-            synonyms = room.synonyms
+            synonyms = list(room.synonyms)
             if room.semantics is not None:
                 synonyms += openhab.additional_synonyms[room.semantics]
 
@@ -105,7 +203,7 @@ def what_do_you_know_about_callback(assistant, intent_message, conf):
     if devices is not None and len(devices) > 0:
         device_spoken = devices[0]
 
-        devices_found = openhab.get_relevant_items(device_spoken, location=room)
+        devices_found = openhab.get_relevant_items(device_spoken, location=room, lang=get_language(intent_message))
 
         if len(devices_found) > 0:
             device = devices_found.pop()
@@ -121,7 +219,7 @@ def what_do_you_know_about_callback(assistant, intent_message, conf):
                 result += "Es ist vom Typ Punkt. "
 
             if len(device.synonyms) > 0 or device.semantics is not None:
-                synonyms = device.synonyms
+                synonyms = list(device.synonyms)
                 if device.semantics is not None:
                     synonyms = synonyms + openhab.additional_synonyms[device.semantics]
 
@@ -157,14 +255,15 @@ def what_do_you_know_about_callback(assistant, intent_message, conf):
 
 
 def repeat_last_callback(assistant, intent_message, conf):
-    return None, assistant.last_message
+    return None, assistant.get_last_message(intent_message.site_id)
 
 
 def switch_on_off_callback(assistant, intent_message, conf):
     devices, spoken_room = get_items_and_room(intent_message)
+    lang = get_language(intent_message)
 
     if spoken_room is not None:
-        room = openhab.get_location(spoken_room)
+        room = openhab.get_location(spoken_room, lang=lang)
 
         if room is None:
             return False, "Ich habe keinen Ort mit der Bezeichnung {location} gefunden.".format(location=spoken_room)
@@ -176,7 +275,7 @@ def switch_on_off_callback(assistant, intent_message, conf):
     if devices is None:
         return False, UNKNOWN_DEVICE.format("einschalten" if command == "ON" else "ausschalten")
 
-    relevant_devices = openhab.get_relevant_items(devices, room)
+    relevant_devices = openhab.get_relevant_items(devices, room, lang=lang)
 
     # The user is allowed to ommit the room if the request matches exactly one device in the users home (e.g.
     # if there is only one tv) or if the request contains only devices of the current room
@@ -184,9 +283,9 @@ def switch_on_off_callback(assistant, intent_message, conf):
         print("Request without room matched more than one item. Requesting again with current room.")
 
         spoken_room = get_room_for_current_site(intent_message, conf['secret']['room_of_device_default'])
-        room = openhab.get_location(spoken_room)
+        room = openhab.get_location(spoken_room, lang=lang)
 
-        relevant_devices = openhab.get_relevant_items(devices, room)
+        relevant_devices = openhab.get_relevant_items(devices, room, lang=lang)
 
         if len(relevant_devices) == 0:
             return False, "Deine Anfrage war nicht eindeutig genug"
@@ -206,7 +305,23 @@ def switch_on_off_callback(assistant, intent_message, conf):
                 if point_item.semantics == "Point_Control_Switch":
                     devices.add(point_item)
 
-    openhab.send_command_to_devices(devices, command)
+    failed_devices = get_failed_relevant_devices(
+        openhab.send_command_to_devices(devices, command), relevant_devices
+    )
+
+    if len(failed_devices) > 0:
+        command_spoken = "einschalten" if command == "ON" else "ausschalten"
+        succeeded_devices = [device for device in relevant_devices if device not in failed_devices]
+
+        if len(succeeded_devices) == 0:
+            return False, "Ich konnte {} nicht {}.".format(join_devices(failed_devices), command_spoken)
+
+        return False, "{} {} konnte ich nicht {}.".format(
+            generate_switch_result_sentence(succeeded_devices, command),
+            join_devices(failed_devices).capitalize(),
+            command_spoken
+        )
+
     result_sentence = generate_switch_result_sentence(relevant_devices, command)
 
     return True, result_sentence
@@ -218,7 +333,7 @@ def get_room(intent_message, default_room):
     else:
         spoken_room = get_room_for_current_site(intent_message, default_room)
 
-    room = openhab.get_location(spoken_room)
+    room = openhab.get_location(spoken_room, lang=get_language(intent_message))
 
     return spoken_room, room
 
@@ -247,7 +362,110 @@ def get_temperature_callback(assistant, intent_message, conf):
         return False, "Ich habe keinen Temperatursensor {} gefunden.".format(add_local_preposition(spoken_room))
 
 
+def device_of(item):
+    """
+    Return the equipment of a point or the item itself.
+    """
+    if item.is_point_of is not None and item.is_point_of in openhab.items:
+        return openhab.items[item.is_point_of]
+
+    return item
+
+
+def location_of(item):
+    location = device_of(item).has_location
+    return openhab.items[location] if location is not None and location in openhab.items else None
+
+
+@traced("sentence")
+def join_nominative(nouns):
+    from genderdeterminator import Case
+
+    gd = gender_determinator()
+    words = [gd.get(noun, Case.NOMINATIVE) for noun in nouns]
+
+    if len(words) == 1:
+        return words[0]
+
+    return ", ".join(words[:-1]) + " und " + words[-1]
+
+
+def summarize_temperatures(temperatures, states, spoken_room):
+    readings = [(item, states[item]) for item in temperatures if states.get(item) not in (None, "UNDEF")]
+
+    if len(readings) == 0:
+        return None
+
+    if len(readings) == 1:
+        return "Die Temperatur {} beträgt {} Grad.".format(
+            add_local_preposition(spoken_room), readings[0][1].replace(".", ",")
+        )
+
+    parts = []
+
+    for item, state in readings:
+        location = location_of(item)
+        description = location.description() if location is not None else item.description()
+        parts.append("{} {} Grad".format(add_local_preposition(description), state.replace(".", ",")))
+
+    return "Die Temperatur beträgt {} und {}.".format(", ".join(parts[:-1]), parts[-1])
+
+
+def summarize_switches(switches, states):
+    sentences = []
+
+    for state, spoken_state in (("ON", "Eingeschaltet"), ("OFF", "Ausgeschaltet")):
+        descriptions = []
+
+        for item in switches:
+            description = device_of(item).description()
+
+            if states.get(item) == state and description not in descriptions:
+                descriptions.append(description)
+
+        if len(descriptions) > 0:
+            sentences.append("{} {} {}.".format(
+                spoken_state, "ist" if len(descriptions) == 1 else "sind", join_nominative(descriptions)
+            ))
+
+    return " ".join(sentences) if len(sentences) > 0 else None
+
+
+def get_summary_callback(assistant, intent_message, conf):
+    spoken_room, room = get_room(intent_message, conf['secret']['room_of_device_default'])
+
+    if room is None:
+        return False, "Ich habe keinen Ort mit der Bezeichnung {location} gefunden.".format(location=spoken_room)
+
+    temperatures = openhab.get_items_with_attributes("Point_Measurement", "Property_Temperature", location=room)
+    switches = [
+        item for semantics in ("Point_Control", "Point_Control_Switch")
+        for item in openhab.get_items_with_attributes(semantics, location=room, item_type="Switch")
+    ]
+
+    if len(temperatures) + len(switches) == 0:
+        return False, "Ich habe {} keine Temperatursensoren oder Schalter gefunden.".format(
+            add_local_preposition(spoken_room)
+        )
+
+    # All states are fetched with a single request
+    states = openhab.get_states(temperatures + switches)
+    sentences = [
+        sentence for sentence in (
+            summarize_temperatures(temperatures, states, spoken_room),
+            summarize_switches(switches, states)
+        ) if sentence is not None
+    ]
+
+    if len(sentences) == 0:
+        return None, UNKNOWN_STATES.format(add_local_preposition(spoken_room))
+
+    return None, " ".join(sentences)
+
+
 def increase_decrease_callback(assistant, intent_message, conf):
+    from genderdeterminator import Case
+
     increase = intent_message.intent.intent_name == user_intent("increaseItem")
 
     spoken_room, room = get_room(intent_message, conf['secret']['room_of_device_default'])
@@ -270,12 +488,16 @@ def increase_decrease_callback(assistant, intent_message, conf):
         if len(items) > 0:
             dimmer_devices = [item for item in items if item.item_type == "Dimmer"]
             switch_devices = [item for item in items if item.item_type == "Switch"]
+            failed_devices = []
 
             if len(dimmer_devices) > 0:
-                openhab.send_command_to_devices(dimmer_devices, "INCREASE" if increase else "DECREASE")
+                failed_devices += coalescer.step(dimmer_devices, increase)
 
             if len(switch_devices) > 0:
-                openhab.send_command_to_devices(switch_devices, "ON" if increase else "OFF")
+                failed_devices += openhab.send_command_to_devices(switch_devices, "ON" if increase else "OFF")
+
+            if len(failed_devices) > 0:
+                return False, DEVICES_FAILED.format(join_devices(failed_devices))
 
             if len(dimmer_devices) + len(switch_devices) > 0:
                 return True, "Ich habe die Helligkeit {} {}.".format(
@@ -287,27 +509,33 @@ def increase_decrease_callback(assistant, intent_message, conf):
         items = openhab.get_items_with_attributes("Point_Control", location=room, item_type="Number")
 
         if len(items) > 0:
-            temperature = float(openhab.get_state(items[0]))
-            temperature = temperature + (1 if increase else -1)
-            openhab.send_command_to_devices([items[0]], str(temperature))
+            success, temperature = coalescer.adjust(items[0], 1 if increase else -1)
+
+            if not success:
+                return False, DEVICES_FAILED.format(join_devices(items[:1]))
+
             return True, "Ich habe die gewünschte Temperatur {} auf {} Grad eingestellt".format(
                 add_local_preposition(spoken_room),
                 temperature
             )
     else:
-        items = openhab.get_relevant_items(device_property, room, item_type="Dimmer")
+        items = openhab.get_relevant_items(device_property, room, item_type="Dimmer", lang=get_language(intent_message))
 
         if len(items) > 0:
-            openhab.send_command_to_devices(items, "INCREASE" if increase else "DECREASE")
+            failed_devices = coalescer.step(items, increase)
+
+            if len(failed_devices) > 0:
+                return False, DEVICES_FAILED.format(join_devices(failed_devices))
+
             return True, "Ich habe {} {} {}.".format(
-                gd.get(device_property, Case.ACCUSATIVE),
+                gender_determinator().get(device_property, Case.ACCUSATIVE),
                 add_local_preposition(spoken_room),
                 "erhöht" if increase else "verringert"
             )
 
     if len(items) == 0:
         return False, "Ich habe keine Möglichkeit gefunden, um {} {} zu {}.".format(
-            gd.get(device_property, Case.ACCUSATIVE),
+            gender_determinator().get(device_property, Case.ACCUSATIVE),
             add_local_preposition(spoken_room),
             "erhöhen" if increase else "verringern"
         )
@@ -343,48 +571,175 @@ def player_callback(assistant, intent_message, conf):
         command = "PREVIOUS"
         response = "{} geht es zurück zur vorherigen Wiedergabe.".format(add_local_preposition(spoken_room))
 
-    openhab.send_command_to_devices(items, command)
+    failed_devices = openhab.send_command_to_devices(items, command)
+
+    if len(failed_devices) > 0:
+        return False, DEVICES_FAILED.format(join_devices(failed_devices))
+
     return True, response
 
 
-def add_callbacks(assistant):
-    assistant.add_callback(user_intent("switchDeviceOn"), switch_on_off_callback)
-    assistant.add_callback(user_intent("switchDeviceOff"), switch_on_off_callback)
+def when_ready(callback):
+    """
+    Answer that the skill is not ready yet as long as the item model is loaded in the background.
+    """
 
-    assistant.add_callback(user_intent("getTemperature"), get_temperature_callback)
+    @wraps(callback)
+    def ready_callback(assistant, intent_message, conf):
+        if not ready.is_set():
+            return False, NOT_READY
 
-    assistant.add_callback(user_intent("increaseItem"), increase_decrease_callback)
-    assistant.add_callback(user_intent("decreaseItem"), increase_decrease_callback)
+        result = callback(assistant, intent_message, conf)
 
-    assistant.add_callback(user_intent("setValue"), set_value_callback)
+        if startup_timer.mark("first_intent"):
+            print(startup_timer.report())
 
-    assistant.add_callback(user_intent("playMedia"), player_callback)
-    assistant.add_callback(user_intent("pauseMedia"), player_callback)
-    assistant.add_callback(user_intent("nextMedia"), player_callback)
-    assistant.add_callback(user_intent("previousMedia"), player_callback)
+        return result
 
-    assistant.add_callback(user_intent("repeatLastMessage"), repeat_last_callback)
+    return ready_callback
 
-    assistant.add_callback(user_intent("whatDoYouKnowAbout"), what_do_you_know_about_callback)
+
+def add_callbacks(assistant):
+    callbacks = [
+        ("switchDeviceOn", switch_on_off_callback),
+        ("switchDeviceOff", switch_on_off_callback),
+        ("getTemperature", get_temperature_callback),
+        ("getSummary", get_summary_callback),
+        ("increaseItem", increase_decrease_callback),
+        ("decreaseItem", increase_decrease_callback),
+        ("setValue", set_value_callback),
+        ("playMedia", player_callback),
+        ("pauseMedia", player_callback),
+        ("nextMedia", player_callback),
+        ("previousMedia", player_callback),
+        ("repeatLastMessage", repeat_last_callback),
+        ("whatDoYouKnowAbout", what_do_you_know_about_callback),
+    ]
+
+    for intent_name, callback in callbacks:
+        assistant.add_callback(user_intent(intent_name), when_ready(callback))
 
 
 def get_test_assistant(openhab_url):
-    global openhab
+    global openhab, coalescer, injection_record, site_languages
+    from openhab.openhab import OpenHAB
 
     assistant = TestAssistant()
     add_callbacks(assistant)
     openhab = OpenHAB(openhab_url)
+    coalescer = CommandCoalescer(openhab)
+    injection_record = InjectionRecord()
+    site_languages = {}
     inject_items(assistant)
+    ready.set()
     assistant.start()
     return assistant
 
 
-def run_assistant():
-    global openhab
+def create_model(a):
+    """
+    Create the item model and everything depending on it without loading it yet. Returns the ModelServer if this
+    process shares its model, the socket is bound right away so that a socket which is in use stops the skill.
+    """
+    global openhab, coalescer, injection_record, site_languages
+    from openhab.model_service import DEFAULT_SOCKET_PATH, ModelServer, RemoteOpenHAB
+    from openhab.openhab import OpenHAB
+
+    model_service = a.conf['secret'].get('model_service', 'off')
+    model_socket = a.conf['secret'].get('model_socket') or DEFAULT_SOCKET_PATH
+    site_languages = parse_site_languages(a.conf['secret'].get('site_languages', ''))
+    languages = ["de"] + sorted(set(site_languages.values()) - {"de"})
+
+    if model_service == 'client':
+        # The server process owns the item model and injects the vocabulary
+        openhab = RemoteOpenHAB(model_socket, timeout=float(a.conf['secret'].get('http_timeout', 5)))
+    else:
+        openhab = OpenHAB(
+            a.conf['secret']['openhab_server_url'],
+            state_max_age=float(a.conf['secret'].get('state_cache_max_age', 0)),
+            timeout=float(a.conf['secret'].get('http_timeout', 5)),
+            retries=int(a.conf['secret'].get('http_retries', 3)),
+            pool_size=int(a.conf['secret'].get('http_pool_size', 10)),
+            command_workers=int(a.conf['secret'].get('command_workers', 8)),
+            snapshot_path=a.conf['secret'].get('item_snapshot') or None,
+            group_commands=a.conf['secret'].get('group_commands', 'off') == 'on',
+            resolution_cache_size=int(a.conf['secret'].get('resolution_cache_size', 256)),
+            languages=languages,
+            synonym_cache_path=a.conf['secret'].get('synonym_cache') or None,
+            load=False
+        )
+        a.tracer.add_counters("resolution_cache", openhab.resolution_stats)
+        injection_record = InjectionRecord(
+            a.conf['secret'].get('injection_record') or None,
+            assistant=assistant_identity(a.assistant_directory)
+        )
+        openhab.add_vocabulary_listener(lambda: inject_items(a))
+
+    coalescer = CommandCoalescer(openhab, window=float(a.conf['secret'].get('command_window', 0)))
+
+    if model_service != 'client':
+        # Clients would have to fetch the whole item model of the server for the genders
+        openhab.add_vocabulary_listener(precompute_genders)
+
+    if model_service == 'server':
+        return ModelServer(model_socket, openhab)
+
+    return None
+
+
+def start_model(a, model_server=None):
+    """
+    Load the item model in the background while the intents are already received. A failed attempt, e.g. because
+    openHAB is not reachable yet, is repeated until it succeeds. Afterwards the vocabulary is injected and the
+    services depending on the model are started.
+    """
+    while True:
+        try:
+            openhab.load()
+            break
+        except Exception as e:
+            print("Failed to load the item model, retrying in {} seconds: {}".format(STARTUP_RETRY_INTERVAL, e))
+            time.sleep(STARTUP_RETRY_INTERVAL)
+
+    startup_timer.mark("model")
+
+    try:
+        if a.conf['secret'].get('model_service', 'off') != 'client':
+            inject_items(a)
+            startup_timer.mark("injection")
+
+        if a.conf['secret'].get('event_stream', 'off') == 'on':
+            openhab.start_event_stream()
+    except Exception as e:
+        print("Failed to inject the vocabulary or to start the event stream: {}".format(e))
+
+    if model_server is not None:
+        model_server.start()
+
+    ready.set()
+    startup_timer.mark("ready")
+    print(startup_timer.report())
+
+    # The answers are possible without the precomputed genders, they only speed up the first responses
+    if a.conf['secret'].get('model_service', 'off') != 'client':
+        precompute_genders()
+        startup_timer.mark("genders")
+
+
+def run_assistant(started=None):
+    """
+    Start the skill. started is the time.perf_counter() value at the start of the process, the startup phases are
+    reported relative to it.
+    """
+    global startup_timer
+
+    startup_timer = StartupTimer(started)
+    startup_timer.mark("imports")
 
     with Assistant() as a:
+        startup_timer.mark("hermes")
         add_callbacks(a)
-        openhab = OpenHAB(a.conf['secret']['openhab_server_url'])
-
-        inject_items(a)
+        a.tracer.add_counters("startup_seconds", startup_timer.offsets)
+        model_server = create_model(a)
+        threading.Thread(target=start_model, args=(a, model_server), name="startup", daemon=True).start()
         a.start()
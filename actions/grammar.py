@@ -0,0 +1,71 @@
+import threading
+from functools import lru_cache
+
+from genderdeterminator import GenderDeterminator
+
+_gender_determinator = None
+_lock = threading.Lock()
+
+
+class CachedGenderDeterminator(GenderDeterminator):
+    """
+    GenderDeterminator with constant time lookups. The original implementation scans the whole word list for every
+    noun, here the words are indexed by themselves and a noun is looked up by its suffixes. The word that comes first
+    in the list wins like in the scan.
+
+    The genders of the device and room names of the item model are determined once by precompute, other spoken words
+    are kept in an LRU cache of limited size.
+    """
+
+    def __init__(self, cache_size=512):
+        super().__init__()
+        self.positions = {}
+        self.known = {}
+
+        for position, (word, gender) in enumerate(self.words):
+            self.positions.setdefault(word, (position, gender.split(';')[0]))
+
+        self.cached_gender = lru_cache(maxsize=cache_size)(self.determine_gender)
+
+    def determine_gender(self, noun):
+        noun_lowered = noun.lower()
+        match = None
+
+        for i in range(len(noun_lowered) + 1):
+            entry = self.positions.get(noun_lowered[i:])
+
+            if entry is not None and (match is None or entry[0] < match[0]):
+                match = entry
+
+        return match[1] if match is not None else None
+
+    def get_gender(self, noun):
+        noun = noun.lower()
+        known = self.known
+
+        if noun in known:
+            return known[noun]
+
+        return self.cached_gender(noun)
+
+    def precompute(self, nouns):
+        """
+        Determine the genders of the nouns passed, e.g. the labels and synonyms of the items. Replaces the nouns
+        precomputed before.
+        """
+        self.known = {noun.lower(): self.determine_gender(noun) for noun in nouns}
+
+
+def gender_determinator():
+    """
+    Return the shared CachedGenderDeterminator. It is created on first use since loading the word list takes a
+    while.
+    """
+    global _gender_determinator
+
+    if _gender_determinator is None:
+        with _lock:
+            if _gender_determinator is None:
+                _gender_determinator = CachedGenderDeterminator()
+
+    return _gender_determinator
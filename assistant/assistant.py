@@ -1,11 +1,32 @@
 from assistant.config import read_configuration_file
-import toml
-from hermes_python.hermes import Hermes
-from hermes_python.ontology import MqttOptions
-from hermes_python.ontology.injection import InjectionRequestMessage, AddFromVanillaInjectionRequest
-from hermes_python.ontology.tts import RegisterSoundMessage
+from assistant.dispatcher import IntentDispatcher
+from assistant.injection import DEFAULT_ASSISTANT_DIRECTORY
+from assistant.profiling import IntentProfiler, call
+from assistant.sounds import DEFAULT_TTS_COMMAND, ResponseSounds, render_with_command
+from common.tracing import Tracer, span
+import asyncio
+import threading
+import time
+import uuid
 from os import environ, path
 
+BUSY = "Ich bin gerade beschäftigt. Bitte versuche es gleich noch einmal."
+
+
+async def run_intent_callback(callback, assistant, intent_message, loop, trace=None):
+    """
+    Run the intent callback on the event loop. Coroutine functions are awaited directly, blocking callbacks run on
+    the default executor of the loop so that overlapping intents don't wait for each other. The stages of blocking
+    callbacks are recorded in the trace passed.
+    """
+    if asyncio.iscoroutinefunction(callback):
+        return await callback(assistant, intent_message, assistant.conf)
+
+    if trace is not None:
+        callback = trace.wrap(callback)
+
+    return await loop.run_in_executor(None, callback, assistant, intent_message, assistant.conf)
+
 
 class TestIntent:
     def __init__(self, intent_name):
@@ -44,6 +65,9 @@ class TestSlots:
         else:
             return []
 
+    def items(self):
+        return self.slots.items()
+
 
 class TestIntentMessage:
     def __init__(self, intent, slots, site_id="default"):
@@ -55,6 +79,11 @@ class TestIntentMessage:
 class TestAssistant:
     def __init__(self):
         self.intents = {}
+        self.last_messages = {}
+        self.injections = []
+        self.tracer = Tracer()
+        self.profiler = None
+        self.assistant_directory = None
         self.conf = dict(
             secret=dict(room_of_device_default='schlafzimmer')
         )
@@ -69,11 +98,38 @@ class TestAssistant:
         intent_name = intent_message.intent.intent_name
 
         if intent_name in self.intents:
-            success, message = self.intents[intent_name](self, intent_message, self.conf)
+            trace = self.tracer.start(intent_name)
+            profile = self.profiler.start(trace) if self.profiler is not None else None
+
+            with trace.activate(), span("callback"):
+                success, message = call(profile, self.intents[intent_name], self, intent_message, self.conf)
+
+            duration = self.tracer.finish(trace)
+
+            if self.profiler is not None:
+                self.profiler.finish(trace, intent_message, duration, profile)
+
+            self.last_messages[intent_message.site_id] = message
             return success, message
 
-    def inject(self, entities):
-        pass
+    def get_last_message(self, site_id):
+        return self.last_messages.get(site_id)
+
+    async def async_callback(self, intent_message, loop=None):
+        intent_name = intent_message.intent.intent_name
+
+        if intent_name in self.intents:
+            loop = loop if loop is not None else asyncio.get_event_loop()
+            trace = self.tracer.start(intent_name)
+            result = await run_intent_callback(self.intents[intent_name], self, intent_message, loop, trace)
+            self.tracer.finish(trace)
+            return result
+
+    def inject(self, entities, from_vanilla=True, on_complete=None):
+        self.injections.append((entities, from_vanilla))
+
+        if on_complete is not None:
+            on_complete()
 
     def __enter__(self):
         return self
@@ -90,7 +146,18 @@ class TestAssistant:
 class Assistant:
     def __init__(self):
         self.intents = {}
-        self.last_message = None
+        self.last_messages = {}
+        self.loop = None
+        self.dispatcher = None
+        self.tracer = Tracer()
+        self.profiler = None
+        self.injection_callbacks = {}
+        self.assistant_directory = DEFAULT_ASSISTANT_DIRECTORY
+
+        # Imported here so that the TestAssistant and the benchmarks work without the Snips platform
+        import toml
+        from hermes_python.hermes import Hermes
+        from hermes_python.ontology import MqttOptions
 
         snips_config = toml.load('/etc/snips.toml')
 
@@ -104,6 +171,8 @@ class Assistant:
             mqtt_username = snips_config['snips-common']['mqtt_username']
         if 'mqtt_password' in snips_config['snips-common'].keys():
             mqtt_password = snips_config['snips-common']['mqtt_password']
+        if 'assistant' in snips_config['snips-common'].keys():
+            self.assistant_directory = snips_config['snips-common']['assistant']
 
         mqtt_opts = MqttOptions(username=mqtt_username, password=mqtt_password, broker_address=mqtt_broker_address)
 
@@ -116,41 +185,198 @@ class Assistant:
             self.conf['secret']['room_of_device_default'] = environ.get('OPENHAB_ROOM_OF_DEVICE_DEFAULT')
         if 'OPENHAB_SOUND_FEEDBACK' in environ:
             self.conf['secret']['sound_feedback'] = environ.get('OPENHAB_SOUND_FEEDBACK')
+        if 'OPENHAB_EVENT_STREAM' in environ:
+            self.conf['secret']['event_stream'] = environ.get('OPENHAB_EVENT_STREAM')
+        if 'OPENHAB_STATE_CACHE_MAX_AGE' in environ:
+            self.conf['secret']['state_cache_max_age'] = environ.get('OPENHAB_STATE_CACHE_MAX_AGE')
+        if 'OPENHAB_HTTP_TIMEOUT' in environ:
+            self.conf['secret']['http_timeout'] = environ.get('OPENHAB_HTTP_TIMEOUT')
+        if 'OPENHAB_HTTP_RETRIES' in environ:
+            self.conf['secret']['http_retries'] = environ.get('OPENHAB_HTTP_RETRIES')
+        if 'OPENHAB_HTTP_POOL_SIZE' in environ:
+            self.conf['secret']['http_pool_size'] = environ.get('OPENHAB_HTTP_POOL_SIZE')
+        if 'OPENHAB_COMMAND_WORKERS' in environ:
+            self.conf['secret']['command_workers'] = environ.get('OPENHAB_COMMAND_WORKERS')
+        if 'OPENHAB_EVENT_LOOP' in environ:
+            self.conf['secret']['event_loop'] = environ.get('OPENHAB_EVENT_LOOP')
+        if 'OPENHAB_INTENT_WORKERS' in environ:
+            self.conf['secret']['intent_workers'] = environ.get('OPENHAB_INTENT_WORKERS')
+        if 'OPENHAB_INTENT_QUEUE_SIZE' in environ:
+            self.conf['secret']['intent_queue_size'] = environ.get('OPENHAB_INTENT_QUEUE_SIZE')
+        if 'OPENHAB_INTENT_QUEUE_POLICY' in environ:
+            self.conf['secret']['intent_queue_policy'] = environ.get('OPENHAB_INTENT_QUEUE_POLICY')
+        if 'OPENHAB_ITEM_SNAPSHOT' in environ:
+            self.conf['secret']['item_snapshot'] = environ.get('OPENHAB_ITEM_SNAPSHOT')
+        if 'OPENHAB_INJECTION_RECORD' in environ:
+            self.conf['secret']['injection_record'] = environ.get('OPENHAB_INJECTION_RECORD')
+        if 'OPENHAB_METRICS_PORT' in environ:
+            self.conf['secret']['metrics_port'] = environ.get('OPENHAB_METRICS_PORT')
+        if 'OPENHAB_METRICS_LOG_INTERVAL' in environ:
+            self.conf['secret']['metrics_log_interval'] = environ.get('OPENHAB_METRICS_LOG_INTERVAL')
+        if 'OPENHAB_GROUP_COMMANDS' in environ:
+            self.conf['secret']['group_commands'] = environ.get('OPENHAB_GROUP_COMMANDS')
+        if 'OPENHAB_COMMAND_WINDOW' in environ:
+            self.conf['secret']['command_window'] = environ.get('OPENHAB_COMMAND_WINDOW')
+        if 'OPENHAB_MODEL_SERVICE' in environ:
+            self.conf['secret']['model_service'] = environ.get('OPENHAB_MODEL_SERVICE')
+        if 'OPENHAB_MODEL_SOCKET' in environ:
+            self.conf['secret']['model_socket'] = environ.get('OPENHAB_MODEL_SOCKET')
+        if 'OPENHAB_RESOLUTION_CACHE_SIZE' in environ:
+            self.conf['secret']['resolution_cache_size'] = environ.get('OPENHAB_RESOLUTION_CACHE_SIZE')
+        if 'OPENHAB_SITE_LANGUAGES' in environ:
+            self.conf['secret']['site_languages'] = environ.get('OPENHAB_SITE_LANGUAGES')
+        if 'OPENHAB_SYNONYM_CACHE' in environ:
+            self.conf['secret']['synonym_cache'] = environ.get('OPENHAB_SYNONYM_CACHE')
+        if 'OPENHAB_RESPONSE_SOUNDS' in environ:
+            self.conf['secret']['response_sounds'] = environ.get('OPENHAB_RESPONSE_SOUNDS')
+        if 'OPENHAB_RESPONSE_SOUND_CACHE' in environ:
+            self.conf['secret']['response_sound_cache'] = environ.get('OPENHAB_RESPONSE_SOUND_CACHE')
+        if 'OPENHAB_TTS_COMMAND' in environ:
+            self.conf['secret']['tts_command'] = environ.get('OPENHAB_TTS_COMMAND')
+        if 'OPENHAB_PROFILE_SLOWEST' in environ:
+            self.conf['secret']['profile_slowest'] = environ.get('OPENHAB_PROFILE_SLOWEST')
+        if 'OPENHAB_PROFILE_SAMPLE_RATE' in environ:
+            self.conf['secret']['profile_sample_rate'] = environ.get('OPENHAB_PROFILE_SAMPLE_RATE')
+        if 'OPENHAB_PROFILE_LOG' in environ:
+            self.conf['secret']['profile_log'] = environ.get('OPENHAB_PROFILE_LOG')
+        if 'OPENHAB_METRICS_HOST' in environ:
+            self.conf['secret']['metrics_host'] = environ.get('OPENHAB_METRICS_HOST')
 
         self.sound_feedback = self.conf['secret']["sound_feedback"] == "on"
+        self.response_sounds = None
 
     def add_callback(self, intent_name, callback):
         self.intents[intent_name] = callback
 
     def register_sound(self, sound_name, sound_data):
+        from hermes_python.ontology.tts import RegisterSoundMessage
+
         self.hermes.register_sound(RegisterSoundMessage(sound_name, sound_data))
 
     def callback(self, intent_message):
         intent_name = intent_message.intent.intent_name
 
-        if intent_name in self.intents:
-            success, message = self.intents[intent_name](self, intent_message, self.conf)
-
-            self.last_message = message
-
-            if self.sound_feedback:
-                if success is None:
-                    self.hermes.publish_end_session(intent_message.session_id, message)
-                elif success:
-                    self.hermes.publish_end_session(intent_message.session_id, "[[sound:success]]")
-                else:
-                    # TODO: negative sound
-                    self.hermes.publish_end_session(intent_message.session_id, message)
+        if intent_name not in self.intents:
+            return
+
+        received = time.perf_counter()
+
+        if self.dispatcher is not None:
+            if not self.dispatcher.submit(intent_message.site_id, lambda: self.handle(intent_message, received)):
+                self.hermes.publish_end_session(intent_message.session_id, BUSY)
+        elif self.loop is not None:
+            future = asyncio.run_coroutine_threadsafe(self.async_callback(intent_message, received), self.loop)
+            future.add_done_callback(self.report_callback_error)
+        else:
+            self.handle(intent_message, received)
+
+    def handle(self, intent_message, received=None):
+        trace = self.tracer.start(intent_message.intent.intent_name, received)
+        trace.add("queue", time.perf_counter() - trace.start)
+        profile = self.profiler.start(trace) if self.profiler is not None else None
+
+        with trace.activate():
+            with span("callback"):
+                success, message = call(
+                    profile, self.intents[intent_message.intent.intent_name], self, intent_message, self.conf
+                )
+
+            with span("respond"):
+                self.respond(intent_message, success, message)
+
+        self.finish(trace, intent_message, profile)
+
+    def finish(self, trace, intent_message, profile=None):
+        duration = self.tracer.finish(trace)
+
+        if self.profiler is not None:
+            self.profiler.finish(trace, intent_message, duration, profile)
+
+    async def async_callback(self, intent_message, received=None):
+        trace = self.tracer.start(intent_message.intent.intent_name, received)
+        trace.add("queue", time.perf_counter() - trace.start)
+
+        if self.profiler is not None:
+            # The callback runs on an executor thread which cProfile doesn't follow, only the details are collected
+            self.profiler.start(trace, profile=False)
+
+        callback = self.intents[intent_message.intent.intent_name]
+        callback_start = time.perf_counter()
+        success, message = await run_intent_callback(callback, self, intent_message, self.loop, trace)
+        respond_start = time.perf_counter()
+        trace.add("callback", respond_start - callback_start)
+
+        self.respond(intent_message, success, message)
+        trace.add("respond", time.perf_counter() - respond_start)
+        self.finish(trace, intent_message)
+
+    @staticmethod
+    def report_callback_error(future):
+        if future.exception() is not None:
+            print("Intent callback failed: {}".format(future.exception()))
+
+    def get_last_message(self, site_id):
+        return self.last_messages.get(site_id)
+
+    def respond(self, intent_message, success, message):
+        self.last_messages[intent_message.site_id] = message
+
+        if self.sound_feedback:
+            if success is None:
+                self.hermes.publish_end_session(intent_message.session_id, self.speech(message))
+            elif success:
+                self.hermes.publish_end_session(intent_message.session_id, "[[sound:success]]")
             else:
-                self.hermes.publish_end_session(intent_message.session_id, message)
+                # TODO: negative sound
+                self.hermes.publish_end_session(intent_message.session_id, self.speech(message))
+        else:
+            self.hermes.publish_end_session(intent_message.session_id, self.speech(message))
+
+    def speech(self, message):
+        """
+        Return the reference to the pre-rendered sound of the message if there is one, otherwise the message itself.
+        """
+        if self.response_sounds is None or not message:
+            return message
+
+        return self.response_sounds.get(message) or message
+
+    def start_event_loop(self):
+        """
+        Run an event loop in a background thread on which the intent callbacks are executed.
+        """
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, name="intent-loop", daemon=True).start()
+
+    def inject(self, entities, from_vanilla=True, on_complete=None):
+        """
+        Inject the entity values into the Snips model. Unless from_vanilla is set, the values are added to the values
+        injected before instead of replacing them. on_complete is called once Snips has completed the injection.
+        """
+        from hermes_python.ontology.injection import InjectionRequestMessage, AddInjectionRequest, \
+            AddFromVanillaInjectionRequest
+
+        if from_vanilla:
+            request = AddFromVanillaInjectionRequest(entities)
+        else:
+            request = AddInjectionRequest(entities)
+
+        request_id = uuid.uuid4().hex
+
+        if on_complete is not None:
+            self.injection_callbacks[request_id] = on_complete
 
-    def inject(self, entities):
-        self.hermes.request_injection(InjectionRequestMessage([
-            AddFromVanillaInjectionRequest(entities)
-        ]))
+        self.hermes.request_injection(InjectionRequestMessage([request], id=request_id))
+
+    def injection_complete(self, hermes, message):
+        on_complete = self.injection_callbacks.pop(message.request_id, None)
+
+        if on_complete is not None:
+            on_complete()
 
     def __enter__(self):
         self.hermes.connect()
+        self.hermes.subscribe_injection_complete(self.injection_complete)
         return self
 
     def __exit__(self, exception_type, exception_val, trace):
@@ -166,5 +392,52 @@ class Assistant:
         with open(path.join(path.dirname(__file__), 'success.wav'), 'rb') as f:
             self.register_sound("success", bytearray(f.read()))
 
+        response_sounds = int(self.conf['secret'].get('response_sounds', 0))
+
+        if response_sounds > 0:
+            try:
+                render = render_with_command(self.conf['secret'].get('tts_command') or DEFAULT_TTS_COMMAND)
+            except ValueError as e:
+                print("Response sounds are disabled: {}".format(e))
+            else:
+                self.response_sounds = ResponseSounds(
+                    render,
+                    self.register_sound,
+                    max_sounds=response_sounds,
+                    directory=self.conf['secret'].get('response_sound_cache') or None
+                )
+                self.response_sounds.load()
+                self.tracer.add_counters("response_sounds", self.response_sounds.stats)
+
+        intent_workers = int(self.conf['secret'].get('intent_workers', 0))
+
+        if intent_workers > 0:
+            self.dispatcher = IntentDispatcher(
+                intent_workers,
+                max_pending=int(self.conf['secret'].get('intent_queue_size', 32)),
+                policy=self.conf['secret'].get('intent_queue_policy', 'block')
+            )
+        elif self.conf['secret'].get('event_loop', 'off') == 'on':
+            self.start_event_loop()
+
+        profile_slowest = int(self.conf['secret'].get('profile_slowest', 0))
+
+        if profile_slowest > 0:
+            self.profiler = IntentProfiler(
+                profile_slowest,
+                sample_rate=float(self.conf['secret'].get('profile_sample_rate', 0)),
+                path=self.conf['secret'].get('profile_log') or None
+            )
+            self.tracer.profiler = self.profiler
+
+        metrics_port = int(self.conf['secret'].get('metrics_port', 0))
+        metrics_log_interval = float(self.conf['secret'].get('metrics_log_interval', 0))
+
+        if metrics_port > 0:
+            self.tracer.start_server(metrics_port, host=self.conf['secret'].get('metrics_host') or "127.0.0.1")
+
+        if metrics_log_interval > 0:
+            self.tracer.start_log_summary(metrics_log_interval)
+
         self.hermes.subscribe_intents(helper_callback)
         self.hermes.start()
@@ -0,0 +1,74 @@
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+BLOCK = "block"
+DROP = "drop"
+
+
+class IntentDispatcher:
+    """
+    Runs tasks on a pool of worker threads. Tasks of the same site are executed one after another in the order they
+    were submitted, tasks of different sites run in parallel.
+
+    At most max_pending tasks may wait for execution. If the limit is reached, submit either blocks until a task has
+    been started (policy block) or rejects the new task (policy drop).
+    """
+
+    def __init__(self, workers, max_pending=32, policy=BLOCK):
+        if policy not in (BLOCK, DROP):
+            raise ValueError("Unknown policy {}".format(policy))
+
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.max_pending = max_pending
+        self.policy = policy
+        self.queues = {}
+        self.pending = 0
+        self.dropped = 0
+        self.condition = threading.Condition()
+
+    def submit(self, site_id, task):
+        """
+        Schedule the task for the site. Returns False if the task was dropped because too many tasks are pending.
+        """
+        with self.condition:
+            while self.pending >= self.max_pending:
+                if self.policy == DROP:
+                    self.dropped += 1
+                    return False
+
+                self.condition.wait()
+
+            self.pending += 1
+
+            if site_id in self.queues:
+                self.queues[site_id].append(task)
+                return True
+
+            self.queues[site_id] = deque()
+
+        self.executor.submit(self._run, site_id, task)
+        return True
+
+    def _run(self, site_id, task):
+        while task is not None:
+            with self.condition:
+                self.pending -= 1
+                self.condition.notify()
+
+            try:
+                task()
+            except Exception as e:
+                print("Intent of site {} failed: {}".format(site_id, e))
+
+            with self.condition:
+                queue = self.queues[site_id]
+
+                if len(queue) > 0:
+                    task = queue.popleft()
+                else:
+                    del self.queues[site_id]
+                    task = None
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
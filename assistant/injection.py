@@ -0,0 +1,100 @@
+import hashlib
+import os
+import threading
+
+from common.files import read_versioned, write_versioned
+
+RECORD_VERSION = 2
+DEFAULT_ASSISTANT_DIRECTORY = "/usr/share/snips/assistant"
+
+
+def assistant_identity(directory):
+    """
+    Return a hash of the assistant.json of the installed Snips assistant or None if it can't be read. The hash
+    changes whenever the assistant is installed or trained again, which drops the injected values.
+    """
+    if directory is None:
+        return None
+
+    try:
+        with open(os.path.join(directory, "assistant.json"), "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except OSError as e:
+        print("Failed to read the Snips assistant in {}: {}".format(directory, e))
+        return None
+
+
+def read_record(path, assistant):
+    """
+    Return the entities stored in the record or None if there is no usable record for the assistant.
+    """
+    record = read_versioned(path, RECORD_VERSION, description="injection record")
+
+    if record is None or assistant is None or record.get("assistant") != assistant:
+        return None
+
+    return {entity: set(values) for entity, values in record["entities"].items()}
+
+
+def write_record(path, entities, assistant):
+    write_versioned(path, RECORD_VERSION, dict(
+        assistant=assistant,
+        entities={entity: sorted(values) for entity, values in entities.items()}
+    ))
+
+
+class InjectionRecord:
+    """
+    Entity values which have been injected into the Snips model last. Snips keeps injected values across restarts,
+    so the record is stored on disk to skip injections which would not change anything. It is only stored once Snips
+    has confirmed the injection, so that a failed injection is repeated on the next start. The record belongs to the
+    assistant passed, see assistant_identity, a record of another or an unknown assistant is ignored. Without a path
+    the record is only kept in memory.
+    """
+
+    def __init__(self, path=None, assistant=None):
+        self.path = path
+        self.assistant = assistant
+        self.entities = read_record(path, assistant) if path is not None else None
+        self.lock = threading.Lock()
+
+    def changes(self, entities):
+        """
+        Return a tuple of the entity values to inject and whether the model has to be reset to the vanilla model
+        first, or None if nothing changed. Added values are injected on top of the current model, removed values can
+        only be dropped by injecting all values into the vanilla model again.
+        """
+        entities = {entity: set(values) for entity, values in entities.items()}
+
+        if self.entities is None or any(
+            len(values - entities.get(entity, set())) > 0 for entity, values in self.entities.items()
+        ):
+            return {entity: sorted(values) for entity, values in entities.items()}, True
+
+        added = {
+            entity: sorted(values - self.entities.get(entity, set())) for entity, values in entities.items()
+        }
+        added = {entity: values for entity, values in added.items() if len(values) > 0}
+
+        if len(added) == 0:
+            return None
+
+        return added, False
+
+    def update(self, entities):
+        """
+        Remember the entity values of a requested injection, so that later changes are computed against them.
+        """
+        self.entities = {entity: set(values) for entity, values in entities.items()}
+
+    def store(self, entities):
+        """
+        Store the entity values of an injection confirmed by Snips.
+        """
+        if self.path is None:
+            return
+
+        try:
+            write_record(self.path, {entity: set(values) for entity, values in entities.items()}, self.assistant)
+        except OSError as e:
+            print("Failed to write injection record {}: {}".format(self.path, e))
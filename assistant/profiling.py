@@ -0,0 +1,113 @@
+import cProfile
+import heapq
+import io
+import itertools
+import json
+import logging
+import pstats
+import random
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+PROFILE_LINES = 20
+
+
+def call(profile, function, *args):
+    """
+    Call the function, under the profile if there is one.
+    """
+    if profile is None:
+        return function(*args)
+
+    return profile.runcall(function, *args)
+
+
+def slot_values(slots):
+    """
+    Return a dict of the slot names to the spoken values. Slot maps which can't be iterated are reported as empty.
+    """
+    try:
+        return {name: [str(value.value) for value in slot.all()] for name, slot in slots.items()}
+    except (AttributeError, TypeError):
+        return {}
+
+
+def profile_summary(profile):
+    """
+    Return the functions with the highest cumulative time of the profile as text.
+    """
+    stream = io.StringIO()
+    pstats.Stats(profile, stream=stream).sort_stats("cumulative").print_stats(PROFILE_LINES)
+    return stream.getvalue()
+
+
+class IntentProfiler:
+    """
+    Keeps the size slowest intents with the spoken input, the slot values, the details of the stages like the
+    resolved items and the durations of the stages. A sample_rate fraction of the intents is run under cProfile, for
+    these the functions with the highest cumulative time are kept as well. With a path every intent which is among
+    the slowest when it finishes is appended to the file as JSON line, the file is rotated at max_bytes.
+    """
+
+    def __init__(self, size=10, sample_rate=0.0, path=None, max_bytes=1024 * 1024, backups=3, sample=random.random):
+        self.size = size
+        self.sample_rate = sample_rate
+        self.sample = sample
+        self.entries = []
+        self.sequence = itertools.count()
+        self.lock = threading.Lock()
+        self.log = None
+
+        if path is not None:
+            self.log = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+
+    def start(self, trace, profile=True):
+        """
+        Collect the details of the trace. Returns a cProfile.Profile to run the callback with if the intent has been
+        sampled, None otherwise.
+        """
+        trace.details = {}
+
+        if profile and self.sample_rate > 0 and self.sample() < self.sample_rate:
+            return cProfile.Profile()
+
+        return None
+
+    def finish(self, trace, intent_message, duration, profile=None):
+        """
+        Keep the intent if it is among the slowest intents. Returns whether it has been kept.
+        """
+        with self.lock:
+            if len(self.entries) >= self.size and duration <= self.entries[0][0]:
+                return False
+
+        entry = dict(
+            time=time.strftime("%Y-%m-%dT%H:%M:%S"),
+            intent=trace.intent_name,
+            site_id=getattr(intent_message, "site_id", None),
+            input=getattr(intent_message, "input", None),
+            slots=slot_values(intent_message.slots),
+            duration_ms=round(duration * 1000, 1),
+            stages={stage: round(stage_duration * 1000, 1) for stage, stage_duration in sorted(trace.spans.items())},
+            details=trace.details,
+            profile=profile_summary(profile) if profile is not None else None
+        )
+
+        with self.lock:
+            if len(self.entries) < self.size:
+                heapq.heappush(self.entries, (duration, next(self.sequence), entry))
+            else:
+                heapq.heappushpop(self.entries, (duration, next(self.sequence), entry))
+
+        if self.log is not None:
+            self.log.handle(logging.makeLogRecord(dict(msg=json.dumps(entry, ensure_ascii=False))))
+
+        return True
+
+    def slowest(self):
+        """
+        Return the kept intents, the slowest first.
+        """
+        with self.lock:
+            return [entry for _, _, entry in sorted(self.entries, key=lambda e: (e[0], e[1]), reverse=True)]
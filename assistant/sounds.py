@@ -0,0 +1,235 @@
+import hashlib
+import os
+import shlex
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from common.files import read_versioned, write_versioned
+
+USAGE_VERSION = 1
+USAGE_FILE = "usage.json"
+SOUND_PREFIX = "response"
+DEFAULT_TTS_COMMAND = "pico2wave -w {file} -l de-DE {text}"
+
+
+def sound_name(slot):
+    return "{}{}".format(SOUND_PREFIX, slot)
+
+
+def sound_file(directory, sentence):
+    return os.path.join(directory, "{}.wav".format(hashlib.sha1(sentence.encode("utf-8")).hexdigest()))
+
+
+def render_with_command(command):
+    """
+    Return a function rendering a sentence to WAV data with the text to speech command, e.g. pico2wave. The
+    placeholders {file} and {text} of the command are replaced by the output file and the sentence. Raises a
+    ValueError if the command can't be parsed or contains other placeholders.
+    """
+    try:
+        arguments = shlex.split(command)
+
+        for argument in arguments:
+            argument.format(file="", text="")
+    except (ValueError, KeyError, IndexError) as e:
+        raise ValueError("Invalid text to speech command {}: {!r}".format(command, e))
+
+    def render(sentence):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "response.wav")
+            subprocess.run(
+                [argument.format(file=output, text=sentence) for argument in arguments],
+                check=True, timeout=30, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+            )
+
+            with open(output, "rb") as f:
+                return f.read()
+
+    return render
+
+
+def read_usage(path):
+    """
+    Return the usage counts and the rendered sentences stored in the file or None if there is no usable file.
+    """
+    usage = read_versioned(path, USAGE_VERSION, description="response sound usage")
+
+    if usage is None:
+        return None
+
+    return usage["counts"], usage["sounds"]
+
+
+def write_usage(path, counts, sounds):
+    write_versioned(path, USAGE_VERSION, dict(counts=counts, sounds=sorted(sounds)))
+
+
+class ResponseSounds:
+    """
+    Pre-rendered sounds of the most frequent responses. Each response is counted, once a sentence has been used
+    min_count times it is rendered in the background and registered as sound, so that later responses only refer to
+    the sound instead of being synthesized again.
+
+    At most max_sounds sentences are kept, they are registered under the names response0 to response<max_sounds - 1>.
+    A sentence replaces the least used one as soon as it is used more often. The counts are halved once more than
+    max_tracked sentences are counted, so that the counts follow changes of the usage. With a directory the rendered
+    sounds and the counts are kept across restarts.
+    """
+
+    def __init__(self, render, register, max_sounds=32, min_count=3, directory=None, max_tracked=None):
+        self.render = render
+        self.register = register
+        self.max_sounds = max_sounds
+        self.min_count = min_count
+        self.directory = directory
+        self.max_tracked = max_tracked if max_tracked is not None else max_sounds * 16
+        self.counts = {}
+        self.sounds = {}
+        self.free_slots = list(reversed(range(max_sounds)))
+        self.pending = set()
+        self.failed = set()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="response-sounds")
+
+    def load(self):
+        """
+        Register the sounds rendered by a previous run.
+        """
+        if self.directory is None:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        usage = read_usage(os.path.join(self.directory, USAGE_FILE))
+
+        if usage is None:
+            return
+
+        counts, sounds = usage
+
+        with self.lock:
+            self.counts = counts
+
+            for sentence in sorted(sounds, key=lambda s: counts.get(s, 0), reverse=True)[:self.max_sounds]:
+                try:
+                    with open(sound_file(self.directory, sentence), "rb") as f:
+                        data = f.read()
+                except OSError:
+                    continue
+
+                self.add_sound(sentence, data, self.free_slots.pop())
+
+    def get(self, sentence):
+        """
+        Count the use of the sentence and return the reference to its sound or None if it has not been rendered yet.
+        """
+        with self.lock:
+            self.count(sentence)
+
+            if sentence in self.sounds:
+                self.hits += 1
+                return "[[sound:{}]]".format(sound_name(self.sounds[sentence]))
+
+            self.misses += 1
+
+            if self.should_render(sentence):
+                self.pending.add(sentence)
+                self.executor.submit(self.render_sound, sentence)
+
+        return None
+
+    def count(self, sentence):
+        self.counts[sentence] = self.counts.get(sentence, 0) + 1
+
+        if len(self.counts) > self.max_tracked:
+            self.counts = {s: max(c // 2, 1) for s, c in self.counts.items() if c > 1 or s in self.sounds}
+
+    def least_used(self):
+        if len(self.sounds) == 0:
+            return None
+
+        return min(self.sounds, key=lambda s: self.counts.get(s, 0))
+
+    def should_render(self, sentence):
+        count = self.counts.get(sentence, 0)
+
+        if count < self.min_count or sentence in self.pending or sentence in self.failed:
+            return False
+
+        if len(self.sounds) + len(self.pending) < self.max_sounds:
+            return True
+
+        least_used = self.least_used()
+        return least_used is not None and self.counts.get(least_used, 0) < count
+
+    def render_sound(self, sentence):
+        try:
+            self.store_sound(sentence, self.render(sentence))
+        except Exception as e:
+            print("Failed to render the response \"{}\": {}".format(sentence, e))
+
+            with self.lock:
+                self.failed.add(sentence)
+        finally:
+            with self.lock:
+                self.pending.discard(sentence)
+
+    def store_sound(self, sentence, data):
+        with self.lock:
+            slot = self.take_slot(sentence)
+
+            if slot is None:
+                return
+
+            self.add_sound(sentence, data, slot)
+
+            if self.directory is not None:
+                try:
+                    with open(sound_file(self.directory, sentence), "wb") as f:
+                        f.write(data)
+
+                    write_usage(os.path.join(self.directory, USAGE_FILE), self.counts, self.sounds)
+                except OSError as e:
+                    print("Failed to store the response sound: {}".format(e))
+
+    def take_slot(self, sentence):
+        """
+        Return a free slot or the slot of the least used sentence if the sentence is used more often, None otherwise.
+        """
+        if len(self.free_slots) > 0:
+            return self.free_slots.pop()
+
+        least_used = self.least_used()
+
+        if least_used is None or self.counts.get(least_used, 0) >= self.counts.get(sentence, 0):
+            return None
+
+        slot = self.sounds.pop(least_used)
+
+        if self.directory is not None:
+            try:
+                os.remove(sound_file(self.directory, least_used))
+            except OSError:
+                pass
+
+        return slot
+
+    def add_sound(self, sentence, data, slot):
+        self.register(sound_name(slot), bytearray(data))
+        self.sounds[sentence] = slot
+
+    def stats(self):
+        with self.lock:
+            return dict(hits=self.hits, misses=self.misses, sounds=len(self.sounds))
+
+    def wait(self):
+        """
+        Wait until the sentences passed to get so far have been rendered.
+        """
+        self.executor.submit(lambda: None).result()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
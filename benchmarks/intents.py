@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Replay the utterances of the training data through TestAssistant.callback against a synthetic home served by a local
+openHAB mock server and report latency percentiles and throughput per intent as JSON.
+
+    $ python3 -m benchmarks.intents --locations 50 --utterances 2000 --report before.json
+    $ python3 -m benchmarks.intents --locations 50 --utterances 2000 --report after.json --compare before.json
+"""
+import argparse
+import contextlib
+import glob
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+
+from actions import get_test_assistant, user_intent
+from assistant.assistant import TestIntent, TestIntentMessage, TestSlot, TestSlots, TestValue
+from benchmarks.synthetic_home import synthetic_home
+from mocks.server import FakeOpenHABServer
+
+REPORT_VERSION = 1
+TRAINING_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "training")
+SLOT = re.compile(r"\[([^\]]+)\]\(([^)]+)\)")
+
+
+def load_utterances(directory=TRAINING_DIRECTORY):
+    """
+    Return a list of tuples of intent name and slots for every line of the training files. Slots map the slot name to
+    the list of values in the order they are spoken.
+    """
+    utterances = []
+
+    for path in sorted(glob.glob(os.path.join(directory, "*.txt"))):
+        intent_name = os.path.splitext(os.path.basename(path))[0]
+
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip() == "":
+                    continue
+
+                slots = {}
+
+                for value, slot in SLOT.findall(line):
+                    slots.setdefault(slot, []).append(value)
+
+                utterances.append((intent_name, slots))
+
+    return utterances
+
+
+def intent_message(intent_name, slots):
+    return TestIntentMessage(
+        TestIntent(user_intent(intent_name)),
+        TestSlots({slot: TestSlot([TestValue(value) for value in values]) for slot, values in slots.items()})
+    )
+
+
+def percentile(durations, p):
+    """
+    Nearest rank percentile of the sorted durations.
+    """
+    if len(durations) == 0:
+        return None
+
+    return durations[min(len(durations) - 1, max(0, int(round(p / 100 * len(durations))) - 1))]
+
+
+def statistics(durations, errors, elapsed):
+    durations = sorted(durations)
+
+    return dict(
+        count=len(durations),
+        errors=errors,
+        throughput=len(durations) / elapsed if elapsed > 0 else None,
+        mean_ms=sum(durations) / len(durations) * 1000 if len(durations) > 0 else None,
+        p50_ms=percentile(durations, 50) * 1000 if len(durations) > 0 else None,
+        p90_ms=percentile(durations, 90) * 1000 if len(durations) > 0 else None,
+        p99_ms=percentile(durations, 99) * 1000 if len(durations) > 0 else None,
+        max_ms=durations[-1] * 1000 if len(durations) > 0 else None
+    )
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=os.path.dirname(TRAINING_DIRECTORY), stderr=subprocess.DEVNULL
+        ).decode("ascii").strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(assistant, utterances):
+    """
+    Run the utterances one after another. Returns the durations and the number of failed callbacks per intent name
+    and the total time.
+    """
+    durations = {}
+    errors = {}
+    start = time.perf_counter()
+
+    for intent_name, slots in utterances:
+        message = intent_message(intent_name, slots)
+        callback_start = time.perf_counter()
+
+        try:
+            assistant.callback(message)
+        except Exception:
+            errors[intent_name] = errors.get(intent_name, 0) + 1
+
+        durations.setdefault(intent_name, []).append(time.perf_counter() - callback_start)
+
+    return durations, errors, time.perf_counter() - start
+
+
+def benchmark(locations, floors, equipment_per_location, utterance_count, warmup, seed):
+    items, states = synthetic_home(locations, floors, equipment_per_location, seed)
+    server = FakeOpenHABServer(items).start()
+    server.states.update(states)
+
+    try:
+        load_start = time.perf_counter()
+        assistant = get_test_assistant(server.url)
+        load_duration = time.perf_counter() - load_start
+
+        rng = random.Random(seed)
+        training = load_utterances()
+        utterances = [rng.choice(training) for _ in range(utterance_count)]
+
+        run(assistant, [rng.choice(training) for _ in range(warmup)])
+        durations, errors, elapsed = run(assistant, utterances)
+    finally:
+        server.stop()
+
+    all_durations = [duration for intent_durations in durations.values() for duration in intent_durations]
+
+    return dict(
+        version=REPORT_VERSION,
+        commit=git_commit(),
+        python=platform.python_version(),
+        parameters=dict(
+            locations=locations,
+            floors=floors,
+            equipment_per_location=equipment_per_location,
+            utterances=utterance_count,
+            warmup=warmup,
+            seed=seed
+        ),
+        model=dict(items=len(items)),
+        load_ms=load_duration * 1000,
+        total=statistics(all_durations, sum(errors.values()), elapsed),
+        intents={
+            intent_name: statistics(intent_durations, errors.get(intent_name, 0), sum(intent_durations))
+            for intent_name, intent_durations in sorted(durations.items())
+        },
+        stages={
+            "{} {}".format(intent_name.split(":")[-1], stage): dict(count=count, mean_ms=total / count * 1000)
+            for (intent_name, stage), _, count, total, _, _ in assistant.tracer.snapshot()
+        }
+    )
+
+
+def compare(report, baseline):
+    """
+    Return one line per intent with the change of the median and 99th percentile against the baseline report.
+    """
+    lines = []
+
+    for intent_name, current in sorted(dict(report["intents"], total=report["total"]).items()):
+        previous = baseline["intents"].get(intent_name) if intent_name != "total" else baseline["total"]
+
+        if previous is None or not previous["p50_ms"] or not previous["p99_ms"]:
+            continue
+
+        lines.append("{:<20} p50 {:8.2f} ms ({:+.0%})   p99 {:8.2f} ms ({:+.0%})".format(
+            intent_name,
+            current["p50_ms"], current["p50_ms"] / previous["p50_ms"] - 1,
+            current["p99_ms"], current["p99_ms"] / previous["p99_ms"] - 1
+        ))
+
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--locations", type=int, default=20, help="number of rooms of the synthetic home")
+    parser.add_argument("--floors", type=int, default=2, help="number of floors the rooms are distributed over")
+    parser.add_argument("--equipment", type=int, default=4, help="number of lamps and outlets per room")
+    parser.add_argument("--utterances", type=int, default=1000, help="number of replayed utterances")
+    parser.add_argument("--warmup", type=int, default=50, help="number of utterances replayed before measuring")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the home and of the utterance mix")
+    parser.add_argument("--report", default="-", help="file the JSON report is written to, - for stdout")
+    parser.add_argument("--compare", help="JSON report of a previous run to compare the percentiles with")
+    args = parser.parse_args()
+
+    # The callbacks print diagnostic messages which must not end up in the report
+    with contextlib.redirect_stdout(sys.stderr):
+        report = benchmark(args.locations, args.floors, args.equipment, args.utterances, args.warmup, args.seed)
+
+    if args.report == "-":
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        print()
+    else:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            print(compare(report, json.load(f)), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Compare the memory footprint of the item model with the former dict based item representation.
+
+    $ python3 -m benchmarks.item_memory --items 10000
+"""
+import argparse
+import gc
+import tracemalloc
+
+from openhab.openhab import parse_item
+
+
+class LegacyItem:
+    """
+    Item representation before __slots__, tuples and interned strings were introduced.
+    """
+
+    def __init__(self, name, label, item_type):
+        self.name = name
+        self.label = label
+        self.item_type = item_type
+        self.semantics = None
+        self.has_location = None
+        self.has_points = []
+        self.is_point_of = None
+        self.is_part_of = None
+        self.relates_to = None
+        self.synonyms = []
+
+        if self.label is not None:
+            self.label = self.label.lower()
+
+
+def legacy_parse_item(item_result):
+    item = LegacyItem(item_result['name'], item_result.get('label', None), item_result['type'])
+    semantics = item_result["metadata"]["semantics"]
+    item.semantics = semantics["value"]
+    config = semantics.get("config", {})
+
+    item.has_location = config.get("hasLocation")
+    item.relates_to = config.get("relatesTo")
+    item.is_part_of = config.get("isPartOf")
+    item.is_point_of = config.get("isPointOf")
+
+    if "hasPoint" in config:
+        item.has_points = config["hasPoint"].split(',')
+
+    if "synonyms" in item_result["metadata"]:
+        item.synonyms = [
+            synonym.strip().lower() for synonym in item_result["metadata"]["synonyms"]["value"].split(",")
+        ]
+
+    return item
+
+
+def synthetic_item_results(count):
+    """
+    Generate the JSON representation of count items. Every tenth item is an equipment with its points following it.
+    """
+    results = []
+
+    for i in range(count):
+        equipment = "Equipment_{}".format(i - i % 10)
+
+        if i % 10 == 0:
+            semantics = dict(value="Equipment_Lightbulb", config=dict(hasLocation="Room_{}".format(i % 50)))
+            item_type = "Group"
+        else:
+            semantics = dict(value="Point_Control_Switch", config=dict(
+                isPointOf=equipment, relatesTo="Property_Light"
+            ))
+            item_type = "Switch"
+
+        # Build the strings at runtime like the JSON decoder does, so that they are not shared constants
+        results.append(dict(
+            name="".join(["Equipment_" if i % 10 == 0 else "Point_", str(i)]),
+            label="".join(["Lampe ", str(i % 100)]),
+            type="".join(item_type),
+            metadata=dict(
+                semantics=dict(
+                    value="".join(semantics["value"]),
+                    config={k: "".join(v) for k, v in semantics["config"].items()}
+                ),
+                synonyms=dict(value="".join(["Leuchte ", str(i % 100), ", Licht"]))
+            )
+        ))
+
+    return results
+
+
+def measure(parse, item_results):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+
+    items = [parse(item_result) for item_result in item_results]
+
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return (after - before) / len(items), items
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=10000)
+    args = parser.parse_args()
+
+    item_results = synthetic_item_results(args.items)
+
+    legacy, _ = measure(legacy_parse_item, item_results)
+    compact, _ = measure(parse_item, item_results)
+
+    print("Items:            {}".format(args.items))
+    print("Legacy item:      {:.0f} bytes per item".format(legacy))
+    print("Compact item:     {:.0f} bytes per item".format(compact))
+    print("Reduction:        {:.0%}".format(1 - compact / legacy))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Compare peak memory and time of parsing the /rest/items response at once with the streaming parser of load_items.
+
+    $ python3 -m benchmarks.load_items --items 20000 --plain-items 40000
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+from benchmarks.item_memory import synthetic_item_results
+from openhab.json_stream import iter_json_array
+from openhab.openhab import parse_item, STREAM_CHUNK_SIZE
+
+
+def plain_item_results(count):
+    """
+    Generate items without semantic metadata, which load_items ignores.
+    """
+    return [dict(
+        name="Plain_{}".format(i),
+        label="Messwert {}".format(i),
+        type="Number",
+        editable=False,
+        metadata=dict()
+    ) for i in range(count)]
+
+
+def parse_at_once(body):
+    items = json.loads(body.decode("utf-8"))
+    items_with_semantics = [item for item in items if "metadata" in item and "semantics" in item["metadata"]]
+    return {item.name: item for item in map(parse_item, items_with_semantics)}
+
+
+def parse_streamed(body):
+    chunks = (body[i:i + STREAM_CHUNK_SIZE] for i in range(0, len(body), STREAM_CHUNK_SIZE))
+    items = {}
+
+    for item_result in iter_json_array(chunks):
+        item = parse_item(item_result)
+
+        if item is not None:
+            items[item.name] = item
+
+    return items
+
+
+def measure(parse, body):
+    """
+    Return the number of items, the peak memory and the time of the parse function. The time is measured in a
+    separate run because tracing the allocations slows down the parser.
+    """
+    start = time.perf_counter()
+    items = parse(body)
+    duration = time.perf_counter() - start
+
+    tracemalloc.start()
+    parse(body)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return len(items), peak, duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=20000, help="number of items with semantic metadata")
+    parser.add_argument("--plain-items", type=int, default=40000, help="number of items without semantic metadata")
+    args = parser.parse_args()
+
+    body = json.dumps(synthetic_item_results(args.items) + plain_item_results(args.plain_items)).encode("utf-8")
+
+    print("Response size:    {:.1f} MB".format(len(body) / 1024 / 1024))
+
+    for name, parse in (("At once", parse_at_once), ("Streamed", parse_streamed)):
+        count, peak, duration = measure(parse, body)
+        print("{:<17} {} items, peak {:.1f} MB, {:.2f} s".format(name + ":", count, peak / 1024 / 1024, duration))
+
+
+if __name__ == "__main__":
+    main()
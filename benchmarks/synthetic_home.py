@@ -0,0 +1,125 @@
+"""
+Generate semantic models of homes of arbitrary size in the JSON format of the /rest/items endpoint.
+"""
+import random
+
+ROOMS = (
+    ("Location_Indoor_Room_LivingRoom", "Wohnzimmer", "Stube"),
+    ("Location_Indoor_Room_Kitchen", "Küche", "Kochnische"),
+    ("Location_Indoor_Room_Bedroom", "Schlafzimmer", "Schlafraum"),
+    ("Location_Indoor_Room_Bathroom", "Badezimmer", "Bad"),
+    ("Location_Indoor_Room", "Esszimmer", "Speisezimmer"),
+    ("Location_Indoor_Room", "Kinderzimmer", "Spielzimmer"),
+    ("Location_Indoor_Room", "Arbeitszimmer", "Büro"),
+    ("Location_Indoor_Room", "Gästezimmer", "Gästeraum"),
+    ("Location_Indoor_Corridor", "Flur", "Diele"),
+)
+
+LAMPS = ("Deckenlampe", "Stehlampe", "Leselampe", "Wandlampe", "Lichterkette", "Tischlampe")
+OUTLETS = ("Ventilator", "Luftbefeuchter", "Kaffeemaschine", "Wasserkocher", "Radio")
+
+
+def item(name, label, item_type, semantics, synonyms=None, **config):
+    result = dict(
+        name=name,
+        label=label,
+        type=item_type,
+        editable=False,
+        metadata=dict(semantics=dict(value=semantics))
+    )
+
+    if len(config) > 0:
+        result["metadata"]["semantics"]["config"] = config
+
+    if synonyms is not None:
+        result["metadata"]["synonyms"] = dict(value=synonyms)
+
+    return result
+
+
+def equipment(name, label, semantics, location, points, synonyms=None):
+    """
+    Return the equipment and its points. Points are tuples of name suffix, label, item type, semantics and property.
+    """
+    point_names = ["{}_{}".format(name, suffix) for suffix, _, _, _, _ in points]
+    items = [item(name, label, "Group", semantics, synonyms, hasLocation=location)]
+
+    for point_name, (_, point_label, item_type, point_semantics, relates_to) in zip(point_names, points):
+        config = dict(isPointOf=name)
+
+        if relates_to is not None:
+            config["relatesTo"] = relates_to
+
+        items.append(item(point_name, point_label, item_type, point_semantics, **config))
+
+    return items
+
+
+def synthetic_home(locations, floors=2, equipment_per_location=4, seed=0):
+    """
+    Return the items and the initial states of a home with a building, the floors and the locations distributed over
+    the floors. The first location of each room type uses the plain room name, e.g. Wohnzimmer, following ones are
+    numbered. Every location contains a temperature sensor, a thermostat, a player and the number of lamps and power
+    outlets passed. Every third location additionally contains a receiver and a screen.
+    """
+    rng = random.Random(seed)
+    items = [item("haus", "Haus", "Group", "Location_Indoor_Building", "Gebäude")]
+    states = {}
+    counts = {}
+
+    for floor in range(floors):
+        items.append(item(
+            "etage_{}".format(floor), "Etage {}".format(floor), "Group", "Location_Indoor_Floor", isPartOf="haus"
+        ))
+
+    for i in range(locations):
+        semantics, label, synonym = ROOMS[i % len(ROOMS)]
+        count = counts[label] = counts.get(label, 0) + 1
+
+        if count > 1:
+            label = "{} {}".format(label, count)
+            synonym = "{} {}".format(synonym, count)
+
+        location = "raum_{}".format(i)
+        items.append(item(location, label, "Group", semantics, synonym, isPartOf="etage_{}".format(i % floors)))
+
+        temperature = "{}_Temperatur".format(location)
+        items.append(item(
+            temperature, "Temperatur", "Number", "Point_Measurement",
+            hasLocation=location, relatesTo="Property_Temperature"
+        ))
+        states[temperature] = "{:.1f}".format(rng.uniform(17, 24))
+
+        setpoint = "{}_Solltemperatur".format(location)
+        items.append(item(
+            setpoint, "Solltemperatur", "Number", "Point_Control",
+            hasLocation=location, relatesTo="Property_Temperature"
+        ))
+        states[setpoint] = "21.0"
+
+        items.append(item("{}_Player".format(location), "Musik", "Player", "Point_Control", hasLocation=location))
+
+        for j in range(equipment_per_location):
+            name = "{}_Geraet_{}".format(location, j)
+
+            if j % 2 == 0:
+                items += equipment(name, rng.choice(LAMPS), "Equipment_Lightbulb", location, (
+                    ("Schalter", "Schalter", "Switch", "Point_Control_Switch", "Property_Light"),
+                    ("Helligkeit", "Helligkeit", "Dimmer", "Point_Control", "Property_Light")
+                ), synonyms="Leuchte")
+            else:
+                items += equipment(name, rng.choice(OUTLETS), "Equipment_PowerOutlet", location, (
+                    ("Schalter", "Schalter", "Switch", "Point_Control_Switch", None),
+                    ("Leistung", "Leistung", "Number", "Point_Measurement", "Property_Power")
+                ))
+
+        if i % 3 == 0:
+            items += equipment("{}_Anlage".format(location), "Anlage", "Equipment_Receiver", location, (
+                ("An_Aus", "Power", "Switch", "Point_Control_Switch", None),
+                ("Volume", "Lautstärke", "Dimmer", "Point_Control", "Property_SoundVolume")
+            ), synonyms="Musikanlage")
+            items += equipment("{}_Fernseher".format(location), "Fernseher", "Equipment_Screen", location, (
+                ("An_Aus", "Power", "Switch", "Point_Control_Switch", None),
+            ))
+
+    return items, states
@@ -0,0 +1,52 @@
+import json
+import os
+import pickle
+
+
+def write_atomically(path, data):
+    """
+    Replace the file by the bytes passed. The bytes are written to a temporary file which then replaces the file, so
+    that a crash while writing never leaves a broken file behind.
+    """
+    temporary_path = "{}.tmp".format(path)
+
+    with open(temporary_path, "wb") as f:
+        f.write(data)
+
+    os.replace(temporary_path, path)
+
+
+def write_versioned(path, version, fields, binary=False):
+    """
+    Store the dict of fields together with the format version, as JSON or, if binary is set, pickled.
+    """
+    record = dict(fields, version=version)
+
+    if binary:
+        data = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+    else:
+        data = json.dumps(record, ensure_ascii=False).encode("utf-8")
+
+    write_atomically(path, data)
+
+
+def read_versioned(path, version, binary=False, description="file"):
+    """
+    Return the dict of fields stored by write_versioned or None if the file does not exist, can't be read or has been
+    written in another format version. Unreadable files are reported with the description passed.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+
+        record = pickle.loads(data) if binary else json.loads(data.decode("utf-8"))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+        print("Ignoring unreadable {} {}: {}".format(description, path, e))
+        return None
+
+    if not isinstance(record, dict) or record.get("version") != version:
+        return None
+
+    return record
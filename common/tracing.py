@@ -0,0 +1,361 @@
+import json
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+METRIC_NAME = "snips_openhab_intent_duration_seconds"
+COUNTER_PREFIX = "snips_openhab"
+TOTAL = "total"
+
+_local = threading.local()
+
+
+def current_trace():
+    return getattr(_local, "trace", None)
+
+
+class Histogram:
+    """
+    Number of observed durations per bucket. Each bucket counts the durations up to its upper bound, the last bucket
+    counts all durations above the largest bound.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """
+        Estimate the quantile by the upper bound of the bucket it falls into.
+        """
+        rank = q * self.count
+        cumulative = 0
+
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+
+            if cumulative >= rank:
+                return min(bound, self.max)
+
+        return self.max
+
+
+class Trace:
+    """
+    Durations of the stages of a single intent. Stages which are entered again while they are running, e.g. by
+    recursive calls, are only measured once. Once details is set to a dict, the details of the stages, e.g. the
+    resolved items, are collected as well.
+    """
+
+    def __init__(self, intent_name, start=None):
+        self.intent_name = intent_name
+        self.start = start if start is not None else time.perf_counter()
+        self.spans = {}
+        self.active = set()
+        self.details = None
+
+    def add(self, stage, duration):
+        self.spans[stage] = self.spans.get(stage, 0.0) + duration
+
+    def add_detail(self, stage, detail):
+        if self.details is not None:
+            self.details.setdefault(stage, []).append(detail)
+
+    def activate(self):
+        return _Activation(self)
+
+    def wrap(self, function):
+        """
+        Return a function which runs the function passed with the trace activated, e.g. on another thread.
+        """
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with self.activate():
+                return function(*args, **kwargs)
+
+        return wrapper
+
+
+class _Activation:
+    def __init__(self, trace):
+        self.trace = trace
+        self.previous = None
+
+    def __enter__(self):
+        self.previous = current_trace()
+        _local.trace = self.trace
+        return self.trace
+
+    def __exit__(self, exception_type, exception_val, trace):
+        _local.trace = self.previous
+        return False
+
+
+class span:
+    """
+    Measure the duration of a stage for the trace active on the current thread. Without an active trace nothing is
+    measured.
+    """
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.trace = None
+        self.start = None
+
+    def __enter__(self):
+        trace = current_trace()
+
+        if trace is not None and self.stage not in trace.active:
+            trace.active.add(self.stage)
+            self.trace = trace
+            self.start = time.perf_counter()
+
+        return self
+
+    def __exit__(self, exception_type, exception_val, trace):
+        if self.trace is not None:
+            self.trace.add(self.stage, time.perf_counter() - self.start)
+            self.trace.active.discard(self.stage)
+            self.trace = None
+
+        return False
+
+
+def traced(stage, details=None):
+    """
+    Decorator which measures every call of the function as the stage passed. details converts the result into a
+    detail of the stage, e.g. the names of the resolved items, it is only called if the trace collects details.
+    """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                result = function(*args, **kwargs)
+
+            trace = current_trace()
+
+            if details is not None and trace is not None and trace.details is not None:
+                trace.add_detail(stage, details(result))
+
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def escape_label(value):
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class Tracer:
+    """
+    Collects the traces of all intents into histograms per intent name and stage. The stage total covers the time
+    from receiving the intent until the session has been ended.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.histograms = {}
+        self.counters = {}
+        self.profiler = None
+        self.lock = threading.Lock()
+
+    def add_counters(self, name, counters):
+        """
+        Register a function returning a dict of numbers, e.g. the hits and misses of a cache, which are reported
+        together with the histograms.
+        """
+        self.counters[name] = counters
+
+    def counter_values(self):
+        return [(name, sorted(self.counters[name]().items())) for name in sorted(self.counters)]
+
+    def start(self, intent_name, start=None):
+        return Trace(intent_name, start)
+
+    def finish(self, trace):
+        """
+        Add the durations of the trace to the histograms and return the total duration.
+        """
+        duration = time.perf_counter() - trace.start
+
+        with self.lock:
+            self.observe(trace.intent_name, TOTAL, duration)
+
+            for stage, stage_duration in trace.spans.items():
+                self.observe(trace.intent_name, stage, stage_duration)
+
+        return duration
+
+    def observe(self, intent_name, stage, duration):
+        key = (intent_name, stage)
+
+        if key not in self.histograms:
+            self.histograms[key] = Histogram(self.buckets)
+
+        self.histograms[key].observe(duration)
+
+    def snapshot(self):
+        with self.lock:
+            return sorted(
+                (key, list(histogram.counts), histogram.count, histogram.sum, histogram.quantile(0.5),
+                 histogram.quantile(0.95))
+                for key, histogram in self.histograms.items()
+            )
+
+    def render_prometheus(self):
+        """
+        Return the histograms in the text format of Prometheus.
+        """
+        lines = [
+            "# HELP {} Duration of the stages of the intent pipeline".format(METRIC_NAME),
+            "# TYPE {} histogram".format(METRIC_NAME)
+        ]
+
+        for (intent_name, stage), counts, count, total, _, _ in self.snapshot():
+            labels = 'intent="{}",stage="{}"'.format(escape_label(intent_name), escape_label(stage))
+            cumulative = 0
+
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append('{}_bucket{{{},le="{}"}} {}'.format(METRIC_NAME, labels, bound, cumulative))
+
+            lines.append('{}_bucket{{{},le="+Inf"}} {}'.format(METRIC_NAME, labels, count))
+            lines.append("{}_sum{{{}}} {}".format(METRIC_NAME, labels, total))
+            lines.append("{}_count{{{}}} {}".format(METRIC_NAME, labels, count))
+
+        for name, values in self.counter_values():
+            for key, value in values:
+                metric_name = "{}_{}_{}".format(COUNTER_PREFIX, name, key)
+                lines.append("# TYPE {} gauge".format(metric_name))
+                lines.append("{} {}".format(metric_name, value))
+
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """
+        Return one line per intent name and stage with the number of calls and the average, median and 95th
+        percentile duration in milliseconds, followed by one line per registered counter function.
+        """
+        lines = [
+            "{} {}: {} calls, avg {:.1f} ms, p50 {:.1f} ms, p95 {:.1f} ms".format(
+                intent_name, stage, count, total / count * 1000, p50 * 1000, p95 * 1000
+            )
+            for (intent_name, stage), _, count, total, p50, p95 in self.snapshot()
+        ]
+
+        if len(lines) > 0:
+            lines += [
+                "{}: {}".format(name, ", ".join("{} {}".format(key, value) for key, value in values))
+                for name, values in self.counter_values()
+            ]
+
+        return "\n".join(lines)
+
+    def start_server(self, port, host="127.0.0.1"):
+        """
+        Serve the histograms on /metrics in the text format of Prometheus and, if a profiler is set, the slowest
+        intents on /slow as JSON. The slowest intents contain the spoken input, so only the local host is served
+        unless another host is passed.
+        """
+        server = MetricsServer((host, port), self)
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        return server
+
+    def start_log_summary(self, interval):
+        """
+        Print the summary every interval seconds.
+        """
+        def log_summary():
+            while True:
+                time.sleep(interval)
+                summary = self.summary()
+
+                if summary != "":
+                    print("Intent latency:\n{}".format(summary))
+
+        thread = threading.Thread(target=log_summary, name="metrics-log", daemon=True)
+        thread.start()
+        return thread
+
+
+class StartupTimer:
+    """
+    Offsets of the startup phases, e.g. connecting to the MQTT broker or loading the item model, in seconds since the
+    start of the process. Each phase is recorded once.
+    """
+
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self.phases = []
+        self.lock = threading.Lock()
+
+    def mark(self, phase):
+        """
+        Record the phase as finished now. Returns False if the phase has already been recorded.
+        """
+        offset = time.perf_counter() - self.start
+
+        with self.lock:
+            if phase in (name for name, _ in self.phases):
+                return False
+
+            self.phases.append((phase, offset))
+            return True
+
+    def offsets(self):
+        with self.lock:
+            return dict(self.phases)
+
+    def report(self):
+        with self.lock:
+            return "Startup: {}".format(", ".join("{} {:.3f} s".format(phase, offset) for phase, offset in self.phases))
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        request_path = self.path.split("?")[0]
+        profiler = self.server.tracer.profiler
+
+        if request_path == "/metrics":
+            body = self.server.tracer.render_prometheus().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif request_path == "/slow" and profiler is not None:
+            body = json.dumps(profiler.slowest(), ensure_ascii=False, indent=2).encode("utf-8")
+            content_type = "application/json; charset=utf-8"
+        else:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MetricsServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, tracer):
+        super().__init__(address, MetricsRequestHandler)
+        self.tracer = tracer
@@ -5,10 +5,13 @@ import os
 openhab_mock_base = "http://localhost:8080"
 
 
-def load_mocks() -> None:
+def load_mocks(exclude=None) -> None:
     with open(os.path.join(os.path.dirname(__file__), "items.json")) as f:
         data = json.load(f)
 
+    if exclude is not None:
+        data = [item for item in data if item["name"] not in exclude]
+
     responses.add(
         responses.GET,
         openhab_mock_base + '/rest/items?recursive=false&fields=name%2Clabel%2Ctype%2Ceditable%2Cmetadata&metadata=semantics%2Csynonyms',
@@ -76,3 +79,16 @@ def add_player_command_mock() -> None:
         responses.POST,
         openhab_mock_base + '/rest/items/Wohnzimmer_Control'
     )
+
+
+def add_states_mock() -> None:
+    responses.add(
+        responses.GET,
+        openhab_mock_base + '/rest/items?recursive=false&fields=name%2Cstate',
+        json=[
+            dict(name="Temperature_Livingroom", state="23.1"),
+            dict(name="Lampe_Bett", state="NULL"),
+            dict(name="Fernseher_An_Aus", state="ON")
+        ],
+        status=200
+    )
@@ -0,0 +1,199 @@
+import json
+import os
+import queue
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlparse, parse_qs
+
+
+class FakeOpenHABRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, which would otherwise be delayed on keep-alive connections
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data).encode("utf-8")
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_empty(self, status):
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        segments = url.path.strip("/").split("/")
+
+        if segments == ["rest", "items"]:
+            self.send_json(self.server.get_items(parse_qs(url.query)))
+        elif len(segments) == 3 and segments[:2] == ["rest", "items"]:
+            item = self.server.get_item(segments[2], recursive=parse_qs(url.query).get("recursive") == ["true"])
+
+            if item is None:
+                self.send_empty(404)
+            else:
+                self.send_json(item)
+        elif segments == ["rest", "events"]:
+            self.stream_events()
+        else:
+            self.send_empty(404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        segments = url.path.strip("/").split("/")
+        length = int(self.headers.get("Content-Length", 0))
+        command = self.rfile.read(length).decode("utf-8")
+
+        if len(segments) == 3 and segments[:2] == ["rest", "items"] and self.server.get_item(segments[2]) is not None:
+            self.server.commands.append((segments[2], command))
+            self.send_empty(200)
+        else:
+            self.send_empty(404)
+
+    def stream_events(self):
+        events = self.server.subscribe()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        try:
+            while True:
+                event = events.get()
+
+                if event is None:
+                    break
+
+                chunk = "event: message\ndata: {}\n\n".format(json.dumps(event)).encode("utf-8")
+                self.wfile.write("{:x}\r\n".format(len(chunk)).encode("ascii") + chunk + b"\r\n")
+                self.wfile.flush()
+
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.server.unsubscribe(events)
+
+
+class FakeOpenHABServer(ThreadingMixIn, HTTPServer):
+    """
+    Minimal openHAB REST API on a local port which serves the items of the mocks, accepts commands and streams events
+    published by the test.
+    """
+    daemon_threads = True
+
+    def __init__(self, items=None):
+        super().__init__(("127.0.0.1", 0), FakeOpenHABRequestHandler)
+
+        if items is None:
+            with open(os.path.join(os.path.dirname(__file__), "items.json")) as f:
+                items = json.load(f)
+
+        self.items = {item["name"]: item for item in items}
+        self.states = {}
+        self.commands = []
+        self.subscribers = []
+        self.lock = threading.RLock()
+        self.thread = None
+
+    @property
+    def url(self):
+        return "http://{}:{}".format(*self.server_address)
+
+    def get_items(self, query):
+        with self.lock:
+            items = [self.get_item(name) for name in self.items]
+
+        if "fields" in query:
+            fields = query["fields"][0].split(",")
+            items = [{k: v for k, v in item.items() if k in fields} for item in items]
+
+        return items
+
+    def get_item(self, name, recursive=False):
+        with self.lock:
+            if name not in self.items:
+                return None
+
+            item = dict(self.items[name])
+            item["state"] = self.states.get(name, "NULL")
+
+            if recursive and item["type"] == "Group":
+                item["members"] = [self.get_item(member, recursive=True) for member in self.get_members(name)]
+
+            return item
+
+    def get_members(self, name):
+        """
+        Return the names of the direct members of the group. Like in openHAB the semantic relations of the items
+        follow their group memberships, which may also be given by groupNames.
+        """
+        members = []
+
+        for item in self.items.values():
+            config = item.get("metadata", {}).get("semantics", {}).get("config", {})
+            parents = [config.get(relation) for relation in ("hasLocation", "isPointOf", "isPartOf")]
+
+            if name in parents or name in item.get("groupNames", []):
+                members.append(item["name"])
+
+        return members
+
+    def subscribe(self):
+        events = queue.Queue()
+
+        with self.lock:
+            self.subscribers.append(events)
+
+        return events
+
+    def unsubscribe(self, events):
+        with self.lock:
+            if events in self.subscribers:
+                self.subscribers.remove(events)
+
+    def publish(self, event_type, topic, payload):
+        event = dict(type=event_type, topic=topic, payload=json.dumps(payload))
+
+        with self.lock:
+            subscribers = list(self.subscribers)
+
+        for events in subscribers:
+            events.put(event)
+
+    def add_item(self, item):
+        with self.lock:
+            self.items[item["name"]] = item
+
+        self.publish("ItemAddedEvent", "smarthome/items/{}/added".format(item["name"]), item)
+
+    def remove_item(self, name):
+        with self.lock:
+            item = self.items.pop(name)
+
+        self.publish("ItemRemovedEvent", "smarthome/items/{}/removed".format(name), item)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        with self.lock:
+            subscribers = list(self.subscribers)
+
+        for events in subscribers:
+            events.put(None)
+
+        self.shutdown()
+        self.server_close()
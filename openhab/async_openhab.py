@@ -0,0 +1,77 @@
+import asyncio
+from functools import partial
+
+from common.tracing import current_trace
+from openhab.openhab import OpenHAB
+
+
+class AsyncOpenHAB(OpenHAB):
+    """
+    OpenHAB client for asyncio applications. The item model and all queries are shared with OpenHAB, the requests to
+    openHAB run on an executor using the pooled session, so the event loop is never blocked by network I/O.
+
+    Use the coroutine create to construct an instance with a loaded item model on the running event loop.
+    """
+
+    def __init__(self, openhab_server_url, loop, executor=None, **kwargs):
+        kwargs["load"] = False
+        super().__init__(openhab_server_url, **kwargs)
+        self.loop = loop
+        self.executor = executor
+
+    @classmethod
+    async def create(cls, openhab_server_url, loop=None, executor=None, **kwargs):
+        loop = loop if loop is not None else asyncio.get_running_loop()
+        openhab = cls(openhab_server_url, loop, executor=executor, **kwargs)
+        await openhab.async_load()
+        return openhab
+
+    def run_blocking(self, function, *args, **kwargs):
+        """
+        Run the function on the executor. The stages it records are added to the trace active when it is called.
+        """
+        function = partial(function, *args, **kwargs)
+        trace = current_trace()
+
+        if trace is not None:
+            function = trace.wrap(function)
+
+        return self.loop.run_in_executor(self.executor, function)
+
+    async def async_load(self):
+        await self.run_blocking(self.load)
+
+    async def async_reload_items(self):
+        await self.run_blocking(self.reload_items)
+
+    async def async_get_state(self, item):
+        return await self.run_blocking(self.get_state, item)
+
+    async def async_send_command_to_devices(self, devices, command):
+        """
+        Send the command like send_command_to_devices and return the devices for which the command failed.
+        """
+        return await self.run_blocking(self.send_command_to_devices, list(devices), command)
+
+    async def stream_events(self, callback):
+        """
+        Apply the events of openHAB to the item model and pass them to the callback on the event loop until the
+        coroutine is cancelled. The callback may be a coroutine function.
+        """
+        def forward(event):
+            self.loop.call_soon_threadsafe(dispatch, event)
+
+        def dispatch(event):
+            if asyncio.iscoroutinefunction(callback):
+                self.loop.create_task(callback(event))
+            else:
+                callback(event)
+
+        self.add_event_listener(forward)
+        self.start_event_stream()
+
+        try:
+            await self.loop.create_future()
+        finally:
+            self.event_listeners.remove(forward)
+            self.stop_event_stream()
@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class StateCache:
+    """
+    Last known states of the items together with the time they were received. Entries older than max_age seconds are
+    considered stale and are not returned anymore.
+    """
+
+    def __init__(self, max_age, clock=time.monotonic):
+        self.max_age = max_age
+        self.clock = clock
+        self.states = {}
+        self.lock = threading.Lock()
+
+    def get(self, name):
+        """
+        Return a tuple of whether a fresh entry exists and the state of the item.
+        """
+        with self.lock:
+            entry = self.states.get(name)
+
+        if entry is None:
+            return False, None
+
+        state, timestamp = entry
+
+        if self.clock() - timestamp > self.max_age:
+            return False, None
+
+        return True, state
+
+    def update(self, name, state):
+        with self.lock:
+            self.states[name] = (state, self.clock())
+
+    def update_all(self, states):
+        now = self.clock()
+
+        with self.lock:
+            for name, state in states.items():
+                self.states[name] = (state, now)
+
+    def invalidate(self, name):
+        with self.lock:
+            self.states.pop(name, None)
+
+    def clear(self):
+        with self.lock:
+            self.states.clear()
+
+
+class ResolutionCache:
+    """
+    LRU cache of the results of resolving spoken items. The entries belong to one generation of the item model and
+    are dropped as soon as a lookup for another generation happens, e.g. after the items or synonyms were reloaded.
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.generation = None
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, generation, key):
+        """
+        Return a tuple of whether an entry exists for the generation of the item model and the cached result.
+        """
+        with self.lock:
+            if generation != self.generation:
+                self.entries.clear()
+                self.generation = generation
+
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return True, self.entries[key]
+
+            self.misses += 1
+            return False, None
+
+    def put(self, generation, key, result):
+        """
+        Store the result unless the item model has changed while it was computed.
+        """
+        with self.lock:
+            if generation != self.generation:
+                return
+
+            self.entries[key] = result
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            return dict(hits=self.hits, misses=self.misses, size=len(self.entries), generation=self.generation)
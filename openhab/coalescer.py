@@ -0,0 +1,143 @@
+import threading
+import time
+
+DIMMER_STEP = 10
+
+
+def format_value(item, value):
+    if item.item_type == "Dimmer":
+        return str(int(round(value)))
+
+    return str(value)
+
+
+class CommandCoalescer:
+    """
+    Merges the relative changes of an item which are requested within window seconds into a single command with the
+    resulting value. The value of the last command is kept for target_max_age seconds and used as the base of the next
+    change, so that a second step does not depend on the state of the first step having been propagated by openHAB.
+
+    With a window of 0 every change is sent immediately. Otherwise a merged command which fails is reported by the
+    next change of the item, which is not applied then.
+    """
+
+    def __init__(self, openhab, window=0, target_max_age=10, clock=time.monotonic):
+        self.openhab = openhab
+        self.window = window
+        self.target_max_age = target_max_age
+        self.clock = clock
+        self.targets = {}
+        self.pending = {}
+        self.failed = set()
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    def item_lock(self, name):
+        with self.lock:
+            return self.locks.setdefault(name, threading.Lock())
+
+    def target(self, name):
+        """
+        Return the locally tracked value of the item or None if it is unknown or outdated.
+        """
+        entry = self.targets.get(name)
+
+        if entry is None:
+            return None
+
+        value, timestamp = entry
+
+        if name not in self.pending and self.clock() - timestamp > self.target_max_age:
+            return None
+
+        return value
+
+    def adjust(self, item, delta, minimum=None, maximum=None):
+        """
+        Add delta to the value of the item. Returns a tuple of whether the command has been sent or scheduled and the
+        new value, which is None if the current state of the item is not a number or the last merged command failed.
+        """
+        with self.item_lock(item.name):
+            if item.name in self.failed:
+                self.failed.discard(item.name)
+                return False, None
+
+            value = self.target(item.name)
+
+            if value is None:
+                try:
+                    value = float(self.openhab.get_state(item))
+                except (TypeError, ValueError):
+                    return False, None
+
+            value += delta
+
+            if minimum is not None:
+                value = max(minimum, value)
+
+            if maximum is not None:
+                value = min(maximum, value)
+
+            self.targets[item.name] = (value, self.clock())
+
+            if self.window <= 0:
+                return self.send(item, value), value
+
+            timer = self.pending.pop(item.name, None)
+
+            if timer is not None:
+                timer.cancel()
+
+            timer = threading.Timer(self.window, self.flush)
+            timer.args = (item, timer)
+            timer.daemon = True
+            self.pending[item.name] = timer
+            timer.start()
+
+        return True, value
+
+    def step(self, items, increase):
+        """
+        Increase or decrease the dimmers passed and return the list of devices which failed. Without a window the
+        INCREASE and DECREASE commands are passed on, otherwise the steps are merged into a single percent value.
+        """
+        if self.window <= 0:
+            return self.openhab.send_command_to_devices(items, "INCREASE" if increase else "DECREASE")
+
+        return [
+            item for item in items
+            if not self.adjust(item, DIMMER_STEP if increase else -DIMMER_STEP, minimum=0, maximum=100)[0]
+        ]
+
+    def send(self, item, value):
+        if len(self.openhab.send_command_to_devices([item], format_value(item, value))) > 0:
+            self.targets.pop(item.name, None)
+            return False
+
+        self.targets[item.name] = (value, self.clock())
+        return True
+
+    def flush(self, item, timer=None):
+        """
+        Send the pending value of the item. Does nothing if the timer passed has been replaced by a later change.
+        """
+        with self.item_lock(item.name):
+            if item.name not in self.pending or (timer is not None and self.pending[item.name] is not timer):
+                return
+
+            self.pending.pop(item.name).cancel()
+            value = self.targets[item.name][0]
+
+            if not self.send(item, value):
+                self.failed.add(item.name)
+                print("Sending the merged value {} to {} failed".format(format_value(item, value), item.name))
+
+    def flush_all(self):
+        """
+        Send all pending values immediately, e.g. before shutting down.
+        """
+        with self.lock:
+            pending = [timer.args[0] for timer in self.pending.values()]
+
+        for item in pending:
+            self.flush(item)
@@ -0,0 +1,156 @@
+import codecs
+import json
+import socket
+import threading
+
+import requests
+
+EVENT_TOPICS = "smarthome/items/*,smarthome/metadata/*,openhab/items/*,openhab/metadata/*"
+
+
+def parse_event(data):
+    """
+    Convert the data of a server sent event of openHAB into a dict with the keys type, topic, entity, namespace and
+    payload. The entity is the name of the item the event refers to.
+    """
+    event = json.loads(data)
+    topic = event.get("topic", "")
+    segments = topic.split("/")
+
+    entity = None
+    namespace = None
+
+    if len(segments) >= 3 and segments[1] == "items":
+        entity = segments[2]
+    elif len(segments) >= 3 and segments[1] == "metadata":
+        if ":" in segments[2]:
+            namespace, _, entity = segments[2].partition(":")
+        elif len(segments) >= 4:
+            namespace, entity = segments[2], segments[3]
+
+    payload = event.get("payload")
+
+    if isinstance(payload, str) and payload != "":
+        try:
+            payload = json.loads(payload)
+        except ValueError:
+            pass
+
+    return dict(
+        type=event.get("type"),
+        topic=topic,
+        entity=entity,
+        namespace=namespace,
+        payload=payload
+    )
+
+
+def read_lines(chunks):
+    """
+    Split the chunks of a streamed response into lines as soon as they arrive. iter_lines of requests waits until a
+    chunk of a fixed size has been read, which would delay events.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+
+    for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        lines = buffer.split("\n")
+        buffer = lines.pop()
+
+        for line in lines:
+            yield line.rstrip("\r")
+
+    if buffer != "":
+        yield buffer.rstrip("\r")
+
+
+def read_events(lines):
+    """
+    Yield the data of every server sent event contained in the lines passed. Multiple data lines of one event are
+    joined by a newline as described by the SSE specification.
+    """
+    data = []
+
+    for line in lines:
+        if line == "":
+            if len(data) > 0:
+                yield "\n".join(data)
+                data = []
+        elif line.startswith("data:"):
+            data.append(line[5:].lstrip(" "))
+
+    if len(data) > 0:
+        yield "\n".join(data)
+
+
+class EventStream(threading.Thread):
+    """
+    Background thread which subscribes to the event stream of openHAB and passes every event to the handler. The
+    connection is opened again after it got lost.
+    """
+
+    def __init__(self, openhab_server_url, handler, topics=EVENT_TOPICS, reconnect_delay=5):
+        super().__init__(name="openhab-events", daemon=True)
+        self.url = "{0}/rest/events".format(openhab_server_url)
+        self.handler = handler
+        self.topics = topics
+        self.reconnect_delay = reconnect_delay
+        self.connected = threading.Event()
+        self._stopped = threading.Event()
+        self._response = None
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                self._listen()
+            except requests.RequestException as e:
+                if not self._stopped.is_set():
+                    print("Lost connection to the openHAB event stream: {}".format(e))
+
+            self.connected.clear()
+            self._stopped.wait(self.reconnect_delay)
+
+    def _listen(self):
+        with requests.get(self.url, params=dict(topics=self.topics), stream=True,
+                          headers=dict(Accept="text/event-stream")) as response:
+            response.raise_for_status()
+            self._response = response
+            self.connected.set()
+
+            for data in read_events(read_lines(response.iter_content(chunk_size=None))):
+                if self._stopped.is_set():
+                    break
+
+                try:
+                    event = parse_event(data)
+                except ValueError:
+                    continue
+
+                try:
+                    self.handler(event)
+                except Exception as e:
+                    print("Failed to handle openHAB event {}: {}".format(event["topic"], e))
+
+    def stop(self):
+        """
+        Stop the thread. Closing the response from another thread would block until the next event arrives, so the
+        socket is shut down instead to interrupt the pending read.
+        """
+        self._stopped.set()
+
+        if self._response is None:
+            return
+
+        raw = self._response.raw
+
+        try:
+            if hasattr(raw, "shutdown"):
+                raw.shutdown()
+            else:
+                connection = getattr(raw, "_connection", None)
+
+                if connection is not None and connection.sock is not None:
+                    connection.sock.shutdown(socket.SHUT_RDWR)
+        except (OSError, ValueError):
+            pass
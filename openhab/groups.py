@@ -0,0 +1,125 @@
+import threading
+
+ON_OFF_TYPES = frozenset(("Switch", "Dimmer", "Color"))
+INCREASE_DECREASE_TYPES = frozenset(("Dimmer", "Color"))
+PLAYER_TYPES = frozenset(("Player",))
+NUMBER_TYPES = frozenset(("Number", "Dimmer", "Color", "Rollershutter"))
+
+
+def accepting_types(command):
+    """
+    Return the item types which accept the command or None if the command is unknown.
+    """
+    if command in ("ON", "OFF"):
+        return ON_OFF_TYPES
+    elif command in ("INCREASE", "DECREASE"):
+        return INCREASE_DECREASE_TYPES
+    elif command in ("PLAY", "PAUSE", "NEXT", "PREVIOUS", "REWIND", "FASTFORWARD"):
+        return PLAYER_TYPES
+
+    try:
+        float(command)
+    except ValueError:
+        return None
+
+    return NUMBER_TYPES
+
+
+def base_type(item_type):
+    """
+    Strip the dimension of number items, e.g. Number:Temperature.
+    """
+    return item_type.split(":")[0]
+
+
+def leaf_members(group_result):
+    """
+    Yield the name and type of all members of the recursive REST representation of a group which are no groups
+    themselves.
+    """
+    for member in group_result.get("members", []):
+        if member["type"] == "Group":
+            yield from leaf_members(member)
+        else:
+            yield member["name"], base_type(member["type"])
+
+
+class GroupCommandPlanner:
+    """
+    Replaces commands to every command accepting member of a group by a single command to the group, which openHAB
+    forwards to the members itself.
+
+    openHAB forwards the command to all members of the group, including items without semantic tags which are not
+    part of the item model. A group is therefore only used after its members have been fetched from openHAB. The
+    members are kept until the item model changes.
+    """
+
+    def __init__(self, fetch_group):
+        self.fetch_group = fetch_group
+        self.members = {}
+        self.lock = threading.Lock()
+
+    def clear(self):
+        with self.lock:
+            self.members = {}
+
+    def invalidate(self, names):
+        """
+        Drop the members of the groups passed and of all groups containing one of the items passed.
+        """
+        names = set(names)
+
+        with self.lock:
+            self.members = {
+                group: members for group, members in self.members.items()
+                if group not in names and (members is None or names.isdisjoint(name for name, _ in members))
+            }
+
+    def group_members(self, name):
+        """
+        Return the list of names and types of the leaf members of the group or None if it could not be fetched.
+        """
+        with self.lock:
+            if name in self.members:
+                return self.members[name]
+
+        group_result = self.fetch_group(name)
+        members = list(leaf_members(group_result)) if group_result is not None else None
+
+        with self.lock:
+            self.members[name] = members
+
+        return members
+
+    def plan(self, devices, command, candidates):
+        """
+        Return a list of tuples of group and the devices it covers and the list of remaining devices. The candidates
+        are pairs of a group item and the devices of the item model it would cover, tried in the order passed. A group
+        is only used if the devices passed are exactly the members of the group which accept the command.
+        """
+        types = accepting_types(command)
+        remaining = {device.name: device for device in devices}
+        groups = []
+
+        if types is None:
+            return groups, list(devices)
+
+        for group, covered in candidates:
+            covered_names = {device.name for device in covered}
+
+            if len(covered_names) < 2 or not covered_names.issubset(remaining):
+                continue
+
+            members = self.group_members(group.name)
+
+            if members is None:
+                continue
+
+            accepting = {name for name, member_type in members if member_type in types}
+
+            if accepting != covered_names:
+                continue
+
+            groups.append((group, [remaining.pop(name) for name in sorted(covered_names)]))
+
+        return groups, [device for device in devices if device.name in remaining]
@@ -0,0 +1,269 @@
+from bisect import bisect_left
+from itertools import chain
+
+from openhab.phrases import PhraseIndex
+
+
+class ItemIndex:
+    """
+    Lookup tables over the semantic item model, built once after the items have been loaded.
+
+    Every table maps a key to the matching items in the order in which they appear in the item model so that
+    queries return the same results as a linear scan over all items. The phrase index contains all labels and
+    synonyms of the items together with the additional phrases passed, e.g. the synonyms of the tags.
+
+    An index is never modified after it has been built, with_changes returns a new index for a changed item model.
+    """
+
+    def __init__(self, items, phrases=()):
+        self.items = items
+        self.by_semantics = {}
+        self.by_property = {}
+        self.by_type = {}
+        self.by_name = {}
+        self.location_members = {}
+        self.ancestors = {}
+        self.children = {}
+        self.cycles = []
+        self.positions = {}
+        self.next_position = len(items)
+
+        for position, item in enumerate(items.values()):
+            self.positions[item.name] = position
+
+            for table, key in self._keys(item):
+                table.setdefault(key, []).append(item)
+
+            container = self._container(item)
+
+            if container is not None:
+                self.children.setdefault(container, set()).add(item.name)
+
+        self.phrases = PhraseIndex(chain(self.by_name.keys(), phrases))
+
+        for item in items.values():
+            self._resolve_ancestors(items, item)
+
+        for item in items.values():
+            for ancestor in self.ancestors[item.name]:
+                self.location_members.setdefault(ancestor, set()).add(item)
+
+    def _keys(self, item):
+        """
+        Yield the tables the item is listed in together with its key in each table.
+        """
+        yield self.by_semantics, item.semantics
+        yield self.by_type, item.item_type
+
+        if item.relates_to is not None:
+            yield self.by_property, item.relates_to
+
+        names = set(item.synonyms)
+
+        if item.label is not None:
+            names.add(item.label)
+
+        for name in names:
+            yield self.by_name, name
+
+    @staticmethod
+    def _container(item):
+        if item.has_location is not None:
+            return item.has_location
+        elif item.is_point_of is not None:
+            return item.is_point_of
+        else:
+            return item.is_part_of
+
+    @staticmethod
+    def _parent(items, item):
+        """
+        Return the name of the item containing the item passed and whether the container itself counts as one of the
+        locations of the item. Points only inherit the locations of their equipment.
+        """
+        parent = ItemIndex._container(item)
+
+        if parent is None or parent not in items:
+            return None, False
+
+        return parent, item.has_location is not None or item.is_point_of is None
+
+    def with_changes(self, changes, phrases=()):
+        """
+        Return a new index in which the items passed as dict of name to item are replaced, an item of None removes
+        the item. Only the entries of the changed items and of the items they (transitively) contain are recomputed,
+        all other entries are shared with this index. The phrase index is only rebuilt if the labels or synonyms of
+        the model have changed.
+        """
+        index = ItemIndex.__new__(ItemIndex)
+        index.items = dict(self.items)
+        index.by_semantics = dict(self.by_semantics)
+        index.by_property = dict(self.by_property)
+        index.by_type = dict(self.by_type)
+        index.by_name = dict(self.by_name)
+        index.location_members = dict(self.location_members)
+        index.ancestors = dict(self.ancestors)
+        index.children = dict(self.children)
+        index.positions = dict(self.positions)
+        index.next_position = self.next_position
+
+        for name, item in changes.items():
+            old_item = index.items.pop(name, None)
+
+            if old_item is not None:
+                for table, key in index._keys(old_item):
+                    remaining = [listed for listed in table[key] if listed is not old_item]
+
+                    if len(remaining) > 0:
+                        table[key] = remaining
+                    else:
+                        del table[key]
+
+                container = self._container(old_item)
+
+                if container is not None:
+                    index.children[container] = index.children.get(container, frozenset()) - {name}
+
+            if item is None:
+                index.positions.pop(name, None)
+                continue
+
+            if name not in index.positions:
+                index.positions[name] = index.next_position
+                index.next_position += 1
+
+            index.items[name] = item
+
+            for table, key in index._keys(item):
+                listed = list(table.get(key, []))
+                positions = [index.positions[other.name] for other in listed]
+                listed.insert(bisect_left(positions, index.positions[name]), item)
+                table[key] = listed
+
+            container = self._container(item)
+
+            if container is not None:
+                index.children[container] = index.children.get(container, frozenset()) | {name}
+
+        # The ancestors of all items below a changed item may have changed as well
+        affected = set()
+        pending = list(changes)
+
+        while len(pending) > 0:
+            name = pending.pop()
+
+            if name not in affected:
+                affected.add(name)
+                pending.extend(index.children.get(name, ()))
+
+        for name in affected:
+            old_item = self.items.get(name)
+
+            for ancestor in self.ancestors.get(name, ()):
+                members = index.location_members[ancestor] - {old_item}
+
+                if len(members) > 0:
+                    index.location_members[ancestor] = members
+                else:
+                    del index.location_members[ancestor]
+
+            index.ancestors.pop(name, None)
+
+        index.cycles = [cycle for cycle in self.cycles if affected.isdisjoint(cycle)]
+
+        for name in affected:
+            if name in index.items:
+                index._resolve_ancestors(index.items, index.items[name])
+
+        for name in affected:
+            if name in index.items:
+                for ancestor in index.ancestors[name]:
+                    index.location_members[ancestor] = index.location_members.get(ancestor, frozenset()) | {
+                        index.items[name]
+                    }
+
+        if index.by_name.keys() == self.by_name.keys():
+            index.phrases = self.phrases
+        else:
+            index.phrases = PhraseIndex(chain(index.by_name.keys(), phrases))
+
+        return index
+
+    def _resolve_ancestors(self, items, item):
+        """
+        Compute the ancestor sets of the item and of all its containers by walking up the containment chain once.
+        Every item has at most one container, so a chain either ends, reaches an item which has already been resolved
+        or runs into a cycle.
+        """
+        path = []
+        on_path = {}
+        name = item.name
+
+        while name is not None and name not in self.ancestors and name not in on_path:
+            on_path[name] = len(path)
+            path.append(name)
+            name = self._parent(items, items[name])[0]
+
+        if name is not None and name in on_path:
+            cycle = path[on_path[name]:]
+            path = path[:on_path[name]]
+            self.cycles.append(cycle + [name])
+
+            cycle_ancestors = set()
+
+            for member in cycle:
+                parent, counts = self._parent(items, items[member])
+
+                if counts:
+                    cycle_ancestors.add(parent)
+
+            cycle_ancestors = frozenset(cycle_ancestors)
+
+            for member in cycle:
+                self.ancestors[member] = cycle_ancestors
+
+        for name in reversed(path):
+            parent, counts = self._parent(items, items[name])
+
+            if parent is None:
+                self.ancestors[name] = frozenset()
+            elif counts:
+                self.ancestors[name] = self.ancestors[parent].union((parent,))
+            else:
+                self.ancestors[name] = self.ancestors[parent]
+
+    def is_part_of(self, item, location):
+        """
+        Return whether the item is (transitively) part of the location passed.
+        """
+        ancestors = self.ancestors.get(item.name)
+
+        return ancestors is not None and location.name in ancestors
+
+    def with_semantics(self, semantics):
+        return self.by_semantics.get(semantics, [])
+
+    def with_property(self, esm_property):
+        return self.by_property.get(esm_property, [])
+
+    def with_type(self, item_type):
+        return self.by_type.get(item_type, [])
+
+    def with_name(self, name):
+        return self.by_name.get(name, [])
+
+    def members_of(self, location):
+        """
+        Return the set of items which are (transitively) part of the location or None if the item passed is not part
+        of the item model.
+        """
+        if location.name not in self.positions:
+            return None
+
+        return self.location_members.get(location.name, frozenset())
+
+    def first(self, items):
+        """
+        Return the item which appears first in the item model or None if no item is passed.
+        """
+        return min(items, key=lambda item: self.positions[item.name], default=None)
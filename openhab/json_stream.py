@@ -0,0 +1,59 @@
+import codecs
+import json
+
+WHITESPACE = " \t\n\r"
+
+
+def iter_json_array(chunks, decoder=json.JSONDecoder()):
+    """
+    Yield the elements of a JSON array while its text arrives in chunks of bytes. Only the current element and the
+    unparsed rest of the last chunk are kept in memory, the elements themselves are decoded by the C decoder of the
+    json module.
+    """
+    text = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    position = 0
+    started = False
+
+    for chunk in chunks:
+        buffer = buffer[position:] + text.decode(chunk)
+        position = 0
+
+        while True:
+            while position < len(buffer) and (buffer[position] in WHITESPACE or (started and buffer[position] == ",")):
+                position += 1
+
+            if position >= len(buffer):
+                break
+
+            if not started:
+                if buffer[position] != "[":
+                    raise ValueError("Expected a JSON array")
+
+                started = True
+                position += 1
+                continue
+
+            if buffer[position] == "]":
+                return
+
+            try:
+                element, end = decoder.raw_decode(buffer, position)
+            except ValueError:
+                # The element is not complete yet, wait for the next chunk
+                break
+
+            following = end
+
+            while following < len(buffer) and buffer[following] in WHITESPACE:
+                following += 1
+
+            if following == len(buffer) or buffer[following] not in ",]":
+                # Numbers may be cut off at the end of a chunk, so an element is only complete once the separator
+                # following it has arrived
+                break
+
+            yield element
+            position = end
+
+    raise ValueError("Unexpected end of the JSON array")
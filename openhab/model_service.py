@@ -0,0 +1,414 @@
+import json
+import os
+import socket
+import threading
+from socketserver import StreamRequestHandler, ThreadingMixIn, UnixStreamServer
+
+from common.tracing import traced
+from openhab.openhab import Item, item_name, item_names
+
+DEFAULT_SOCKET_PATH = "/tmp/snips-openhab.sock"
+
+# Methods which must not be sent again once the server may have received them
+UNSAFE_METHODS = frozenset(("send_command_to_devices",))
+
+
+class ModelServiceError(Exception):
+    pass
+
+
+def item_to_dict(item):
+    return {field: getattr(item, field) for field in Item.__slots__}
+
+
+def item_from_dict(data):
+    item = Item(data["name"], None, data["item_type"])
+
+    for field in Item.__slots__:
+        setattr(item, field, data[field])
+
+    item.has_points = tuple(item.has_points)
+    item.synonyms = tuple(item.synonyms)
+    return item
+
+
+class ModelService:
+    """
+    The queries of the item model a remote process may call. Items are passed by their name and returned as dicts.
+    The generation is increased whenever the vocabulary of the item model changes, so that clients know when to
+    notify their vocabulary listeners. The model generation is the generation of the item model of OpenHAB, which
+    increases with every change of the model, so that clients know when to drop the items they received before.
+    """
+
+    def __init__(self, openhab):
+        self.openhab = openhab
+        self.generation = 0
+        self.methods = dict(
+            items=self.items,
+            get_location=self.get_location,
+            get_relevant_items=self.get_relevant_items,
+            get_items_with_attributes=self.get_items_with_attributes,
+            send_command_to_devices=self.send_command_to_devices,
+            get_state=self.get_state,
+            get_states=self.get_states,
+            get_injections=self.get_injections,
+            additional_synonyms=self.additional_synonyms
+        )
+
+        openhab.add_vocabulary_listener(self.increase_generation)
+
+    def increase_generation(self):
+        self.generation += 1
+
+    @property
+    def model_generation(self):
+        return self.openhab.generation
+
+    def call(self, method, args):
+        if method not in self.methods:
+            raise ModelServiceError("Unknown method {}".format(method))
+
+        return self.methods[method](*args)
+
+    def item(self, name):
+        if name is None:
+            return None
+
+        return self.openhab.items.get(name)
+
+    def items(self, names=None):
+        if names is None:
+            return [item_to_dict(item) for item in self.openhab.items.values()]
+
+        return [item_to_dict(item) if item is not None else None for item in map(self.item, names)]
+
+    def get_location(self, spoken_location, fuzzy=True, lang=None):
+        location = self.openhab.get_location(spoken_location, fuzzy=fuzzy, lang=lang)
+        return item_to_dict(location) if location is not None else None
+
+    def get_relevant_items(self, spoken_items, location=None, item_type=None, fuzzy=True, lang=None):
+        items = self.openhab.get_relevant_items(spoken_items, self.item(location), item_type, fuzzy=fuzzy, lang=lang)
+        return [item_to_dict(item) for item in items]
+
+    def get_items_with_attributes(self, point_type, esm_property=None, is_part_of_equipment=None, location=None,
+                                  item_type=None):
+        items = self.openhab.get_items_with_attributes(
+            point_type, esm_property, is_part_of_equipment, self.item(location), item_type
+        )
+        return [item_to_dict(item) for item in items]
+
+    def send_command_to_devices(self, names, command):
+        devices = [self.openhab.items[name] for name in names if name in self.openhab.items]
+        failed_devices = self.openhab.send_command_to_devices(devices, command)
+        return [name for name in names if name not in self.openhab.items] + [device.name for device in failed_devices]
+
+    def get_state(self, name):
+        item = self.item(name)
+        return self.openhab.get_state(item) if item is not None else None
+
+    def get_states(self, names):
+        items = [item for item in map(self.item, names) if item is not None]
+        return {item.name: state for item, state in self.openhab.get_states(items).items()}
+
+    def get_injections(self):
+        return self.openhab.get_injections()
+
+    def additional_synonyms(self):
+        return self.openhab.additional_synonyms
+
+
+class ModelRequestHandler(StreamRequestHandler):
+    """
+    Answers requests of one connection. Requests and responses are JSON objects on a single line each.
+    """
+
+    def handle(self):
+        service = self.server.service
+
+        for line in self.rfile:
+            try:
+                request = json.loads(line.decode("utf-8"))
+                response = dict(result=service.call(request["method"], request.get("args", [])))
+            except Exception as e:
+                print("Failed to answer a request of the model service: {}".format(e))
+                response = dict(error="{}: {}".format(type(e).__name__, e))
+
+            response["generation"] = service.generation
+            response["model_generation"] = service.model_generation
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+class ModelServer(ThreadingMixIn, UnixStreamServer):
+    """
+    Shares the item model, the index and the state cache of this process with other skill processes on the same
+    machine through a Unix socket.
+    """
+    daemon_threads = True
+
+    def __init__(self, path, openhab):
+        remove_stale_socket(path)
+        super().__init__(path, ModelRequestHandler)
+        os.chmod(path, 0o660)
+        self.service = ModelService(openhab)
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="model-service", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+        try:
+            os.remove(self.server_address)
+        except FileNotFoundError:
+            pass
+
+
+def remove_stale_socket(path):
+    """
+    Remove the socket left behind by a server which did not shut down cleanly. Raises an error if another server is
+    still listening.
+    """
+    if not os.path.exists(path):
+        return
+
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    try:
+        probe.connect(path)
+    except OSError:
+        os.remove(path)
+    else:
+        raise ModelServiceError("Another model service is listening on {}".format(path))
+    finally:
+        probe.close()
+
+
+class RemoteItems:
+    """
+    The items of the model service received so far. An item is fetched on first access and afterwards the same
+    object is returned, so that items can be compared and put into sets like the items of OpenHAB.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.items = {}
+        self.complete = False
+        self.lock = threading.Lock()
+
+    def clear(self):
+        with self.lock:
+            self.items = {}
+            self.complete = False
+
+    def add(self, data):
+        if data is None:
+            return None
+
+        with self.lock:
+            if data["name"] not in self.items:
+                self.items[data["name"]] = item_from_dict(data)
+
+            return self.items[data["name"]]
+
+    def get(self, name, default=None):
+        with self.lock:
+            if name in self.items or self.complete:
+                return self.items.get(name, default)
+
+        item = self.add(self.client.call("items", [[name]])[0])
+        return item if item is not None else default
+
+    def __getitem__(self, name):
+        item = self.get(name)
+
+        if item is None:
+            raise KeyError(name)
+
+        return item
+
+    def __contains__(self, name):
+        return name is not None and self.get(name) is not None
+
+    def values(self):
+        if not self.complete:
+            items = [self.add(data) for data in self.client.call("items")]
+
+            with self.lock:
+                self.complete = True
+
+            return items
+
+        with self.lock:
+            return list(self.items.values())
+
+
+class RemoteOpenHAB:
+    """
+    Queries the item model of a ModelServer instead of loading it from openHAB. Offers the part of the interface of
+    OpenHAB used by the actions, so it can be used in its place. Changes of the item model and the vocabulary are
+    noticed with the next response of the server.
+    """
+
+    def __init__(self, path=DEFAULT_SOCKET_PATH, timeout=5):
+        self.path = path
+        self.timeout = timeout
+        self.items = RemoteItems(self)
+        self.generation = None
+        self.model_generation = None
+        self.synonyms = None
+        self.vocabulary_listeners = []
+        self.connections = threading.local()
+
+    @property
+    def additional_synonyms(self):
+        if self.synonyms is None:
+            self.synonyms = self.call("additional_synonyms")
+
+        return self.synonyms
+
+    def connect(self):
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.settimeout(self.timeout)
+        connection.connect(self.path)
+        return connection, connection.makefile("rb")
+
+    def close(self):
+        connection = getattr(self.connections, "connection", None)
+
+        if connection is not None:
+            connection[1].close()
+            connection[0].close()
+            self.connections.connection = None
+
+    def request(self, data, resend=True):
+        """
+        Send the request and return the response. A broken connection, e.g. after the server has been restarted, is
+        reopened once. If the connection breaks after the request has been sent, e.g. by a timeout while waiting for
+        the response, the request is only sent again with resend, as the server may already have executed it.
+        """
+        for attempt in range(2):
+            sent = False
+
+            try:
+                if getattr(self.connections, "connection", None) is None:
+                    self.connections.connection = self.connect()
+
+                connection, reader = self.connections.connection
+                connection.sendall(data)
+                sent = True
+                line = reader.readline()
+
+                if line == b"":
+                    raise ConnectionResetError("The model service closed the connection")
+
+                return json.loads(line.decode("utf-8"))
+            except OSError:
+                self.close()
+
+                if attempt > 0 or (sent and not resend):
+                    raise
+
+    def call(self, method, args=()):
+        """
+        Call the method of the model service and return its result.
+        """
+        data = json.dumps(dict(method=method, args=list(args))).encode("utf-8") + b"\n"
+
+        try:
+            response = self.request(data, resend=method not in UNSAFE_METHODS)
+        except OSError as e:
+            raise ModelServiceError("The model service at {} is not available: {}".format(self.path, e))
+
+        if self.generation != response["generation"]:
+            self.vocabulary_changed(response["generation"])
+
+        if self.model_generation != response["model_generation"]:
+            self.model_generation = response["model_generation"]
+            self.items.clear()
+
+        if "error" in response:
+            raise ModelServiceError(response["error"])
+
+        return response["result"]
+
+    def vocabulary_changed(self, generation):
+        notify = self.generation is not None
+        self.generation = generation
+        self.items.clear()
+        self.synonyms = None
+
+        if notify:
+            for listener in self.vocabulary_listeners:
+                listener()
+
+    def add_vocabulary_listener(self, listener):
+        self.vocabulary_listeners.append(listener)
+
+    def load(self):
+        """
+        Check that the model service is reachable. The model itself is loaded by the server.
+        """
+        self.call("additional_synonyms")
+
+    def start_event_stream(self):
+        """
+        Nothing to do, the server keeps the item model up to date.
+        """
+        return None
+
+    @traced("location", details=item_name)
+    def get_location(self, spoken_location, fuzzy=True, lang=None):
+        return self.items.add(self.call("get_location", [spoken_location, fuzzy, lang]))
+
+    @traced("resolve", details=item_names)
+    def get_relevant_items(self, spoken_items, location=None, item_type=None, fuzzy=True, lang=None):
+        location_name = location.name if location is not None else None
+        results = self.call("get_relevant_items", [spoken_items, location_name, item_type, fuzzy, lang])
+        return set(self.items.add(data) for data in results)
+
+    @traced("resolve", details=item_names)
+    def get_items_with_attributes(self, point_type, esm_property=None, is_part_of_equipment=None, location=None,
+                                  item_type=None):
+        location_name = location.name if location is not None else None
+        results = self.call(
+            "get_items_with_attributes", [point_type, esm_property, is_part_of_equipment, location_name, item_type]
+        )
+        return [self.items.add(data) for data in results]
+
+    @traced("openhab")
+    def send_command_to_devices(self, devices, command):
+        devices = list(devices)
+
+        try:
+            failed_names = set(self.call("send_command_to_devices", [[device.name for device in devices], command]))
+        except ModelServiceError as e:
+            print("Failed to send command {}: {}".format(command, e))
+            return devices
+
+        return [device for device in devices if device.name in failed_names]
+
+    @traced("openhab")
+    def get_state(self, item):
+        try:
+            return self.call("get_state", [item.name])
+        except ModelServiceError as e:
+            print("Failed to get the state of {}: {}".format(item.name, e))
+            return None
+
+    @traced("openhab")
+    def get_states(self, items):
+        items = list(items)
+
+        try:
+            states = self.call("get_states", [[item.name for item in items]])
+        except ModelServiceError as e:
+            print("Failed to get the states of {} items: {}".format(len(items), e))
+            states = {}
+
+        return {item: states.get(item.name) for item in items}
+
+    def get_injections(self):
+        items, locations = self.call("get_injections")
+        return items, locations
@@ -1,40 +1,116 @@
-import os
+import pickle
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from itertools import chain
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from common.tracing import traced
+from openhab.cache import ResolutionCache, StateCache
+from openhab.events import EventStream
+from openhab.groups import GroupCommandPlanner, accepting_types, base_type
+from openhab.index import ItemIndex
+from openhab.json_stream import iter_json_array
+from openhab.snapshot import read_snapshot, write_snapshot
+from openhab.synonyms import load_synonym_table
+
+ITEM_EVENTS = ("ItemAddedEvent", "ItemUpdatedEvent")
+METADATA_EVENTS = ("MetadataAddedEvent", "MetadataUpdatedEvent", "MetadataRemovedEvent")
+METADATA_NAMESPACES = ("semantics", "synonyms")
+STREAM_CHUNK_SIZE = 64 * 1024
+STATE_EVENTS = ("ItemStateChangedEvent", "ItemStateEvent", "GroupItemStateChangedEvent")
+
+
+def intern(value):
+    """
+    Intern strings which are repeated across many items like types, tags and item names of relations so that every
+    distinct value is kept in memory only once.
+    """
+    return None if value is None else sys.intern(value)
+
+
+def item_name(item):
+    return item.name if item is not None else None
+
 
+def item_names(items):
+    return sorted(item.name for item in items)
 
-def load_properties(filepath, sep='=', comment_char='#'):
+
+def normalize_spoken(spoken):
+    """
+    Lower case the spoken words and collapse whitespace, so that utterances which only differ in these resolve to the
+    same cache entry.
     """
-    Read the file passed as parameter as a properties file.
+    return " ".join(spoken.lower().split())
+
+
+def parse_item(item_result):
     """
-    props = {}
-    with open(filepath, "rt", encoding='utf-8') as f:
-        for line in f:
-            l = line.strip()
-            if l and not l.startswith(comment_char):
-                key_value = l.split(sep)
-                key = key_value[0].strip()
-                value = sep.join(key_value[1:]).strip().strip('"')
-                props[key] = value
-    return props
+    Create an item from the JSON representation of the REST API. Items without semantic metadata are not relevant
+    and None is returned for them.
+    """
+    if "metadata" not in item_result or "semantics" not in item_result["metadata"]:
+        return None
+
+    item = Item(
+        intern(item_result['name']),
+        item_result.get('label', None),
+        intern(item_result['type'])
+    )
+
+    semantics = item_result["metadata"]["semantics"]
+    item.semantics = intern(semantics["value"])
+
+    if "config" in semantics:
+        semantic_config = semantics["config"]
+
+        if "hasLocation" in semantic_config:
+            item.has_location = intern(semantic_config["hasLocation"])
+
+        if "relatesTo" in semantic_config:
+            item.relates_to = intern(semantic_config["relatesTo"])
+
+        if "isPartOf" in semantic_config:
+            item.is_part_of = intern(semantic_config["isPartOf"])
+
+        if "isPointOf" in semantic_config:
+            item.is_point_of = intern(semantic_config["isPointOf"])
+
+        if "hasPoint" in semantic_config:
+            item.has_points = tuple(intern(point) for point in semantic_config["hasPoint"].split(','))
+
+    if "synonyms" in item_result["metadata"]:
+        item.synonyms = tuple(
+            intern(synonym.strip().lower()) for synonym in item_result["metadata"]["synonyms"]["value"].split(",")
+        )
+
+    return item
 
 
 class Item:
+    __slots__ = (
+        "name", "label", "item_type", "semantics", "has_location", "has_points", "is_point_of", "is_part_of",
+        "relates_to", "synonyms"
+    )
+
     def __init__(self, name, label, item_type):
         self.name = name
         self.label = label
         self.item_type = item_type
         self.semantics = None
         self.has_location = None
-        self.has_points = []
+        self.has_points = ()
         self.is_point_of = None
         self.is_part_of = None
         self.relates_to = None
-        self.synonyms = []
+        self.synonyms = ()
 
         if self.label is not None:
-            self.label = self.label.lower()
+            self.label = sys.intern(self.label.lower())
 
     def is_point(self):
         return self.semantics.startswith("Point")
@@ -59,65 +135,385 @@ class Item:
 
 
 class OpenHAB:
-    def __init__(self, openhab_server_url, lang="de"):
+    def __init__(self, openhab_server_url, lang="de", state_max_age=0, timeout=5, retries=3, pool_size=10,
+                 command_workers=8, snapshot_path=None, stream_items=True, group_commands=False,
+                 resolution_cache_size=256, languages=None, synonym_cache_path=None, load=True):
         self.openhab_server_url = openhab_server_url
         self.lang = lang
-        self.items = {}
+        self.languages = tuple(languages) if languages else (lang,)
+        self.synonym_cache_path = synonym_cache_path
+        self.synonym_table = None
         self.additional_synonyms = None
         self.reversed_additional_synonyms = {}
+        self.index = ItemIndex({})
+        self.event_stream = None
+        self.vocabulary_listeners = []
+        self.event_listeners = []
+        self.model_lock = threading.RLock()
+        self.state_cache = StateCache(state_max_age) if state_max_age > 0 else None
+        self.timeout = timeout
+        self.session = self.create_session(retries, pool_size)
+        self.request_count = 0
+        self.request_count_lock = threading.Lock()
+        self.command_executor = ThreadPoolExecutor(max_workers=command_workers) if command_workers > 1 else None
+        self.snapshot_path = snapshot_path
+        self.stream_items = stream_items
+        self.revalidation = None
+        self.group_planner = GroupCommandPlanner(self.fetch_group) if group_commands else None
+        self.generation = 0
+        self.resolution_cache = ResolutionCache(resolution_cache_size) if resolution_cache_size > 0 else None
+
+        if load:
+            self.load()
+
+    @property
+    def items(self):
+        return self.index.items
+
+    def load(self):
+        """
+        Load the tag synonyms, the items and the states if the state cache is enabled. If a snapshot of the item model
+        exists it is used right away and the items and states are fetched from openHAB in a background thread.
+        """
+        self.load_synonyms()
+
+        if self.load_snapshot():
+            self.revalidation = threading.Thread(target=self.revalidate, name="openhab-revalidation", daemon=True)
+            self.revalidation.start()
+            return
 
         self.load_items()
-        self.load_synonyms()
-        self.fix_inverse_relations()
 
-    def load_synonyms(self):
-        self.additional_synonyms = {
-            k: [synonym.lower() for synonym in v.split(',')] for k, v in
-            load_properties(os.path.dirname(__file__) + "/tags/tags_{language}.properties".format(language=self.lang)).items()
+        if self.state_cache is not None:
+            self.load_states()
+
+    def revalidate(self):
+        try:
+            self.reload_items()
+
+            if self.state_cache is not None:
+                self.load_states()
+        except requests.RequestException as e:
+            print("Failed to revalidate the item model with openHAB: {}".format(e))
+
+    def load_snapshot(self):
+        """
+        Replace the item model with the snapshot stored on disk. Returns whether a valid snapshot was found.
+        """
+        if self.snapshot_path is None:
+            return False
+
+        index = read_snapshot(self.snapshot_path, self.openhab_server_url)
+
+        if index is None:
+            return False
+
+        self.index = index
+        self.model_changed()
+        return True
+
+    def save_snapshot(self):
+        if self.snapshot_path is None:
+            return
+
+        try:
+            write_snapshot(self.snapshot_path, self.openhab_server_url, self.index)
+        except (OSError, pickle.PicklingError) as e:
+            print("Failed to write the snapshot of the item model: {}".format(e))
+
+    @staticmethod
+    def create_session(retries, pool_size):
+        """
+        Create a session which keeps up to pool_size connections to openHAB alive. Failed connection attempts and
+        reads are retried with an exponential backoff, commands are only retried if they could not be sent at all.
+        """
+        retry = Retry(
+            total=retries,
+            read=retries,
+            connect=retries,
+            status=retries,
+            backoff_factor=0.2,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(("GET",)),
+            raise_on_status=False
+        )
+
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        return session
+
+    def request(self, method, url, **kwargs):
+        with self.request_count_lock:
+            self.request_count += 1
+
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def connection_stats(self):
+        """
+        Return the number of requests sent to openHAB and the number of connections which had to be opened for them.
+        """
+        connections = 0
+
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+
+            for key in pools.keys():
+                pool = pools.get(key)
+
+                if pool is not None:
+                    connections += pool.num_connections
+
+        return dict(requests=self.request_count, connections=connections)
+
+    def resolution_stats(self):
+        """
+        Return the hits and misses of the resolution cache, the number of cached results and the generation of the
+        item model they belong to.
+        """
+        if self.resolution_cache is None:
+            return dict(hits=0, misses=0, size=0, generation=self.generation)
+
+        return self.resolution_cache.stats()
+
+    def reload_items(self):
+        """
+        Fetch the items from openHAB again and rebuild the index so that queries reflect the current item model.
+        """
+        with self.model_lock:
+            vocabulary = self.get_vocabulary()
+            self.load_items()
+            changed = vocabulary != self.get_vocabulary()
+
+        if changed:
+            self.notify_vocabulary_listeners()
+
+    def add_vocabulary_listener(self, listener):
+        """
+        Register a function which is called without arguments whenever the names of the items or locations that are
+        injected into Snips have changed.
+        """
+        self.vocabulary_listeners.append(listener)
+
+    def notify_vocabulary_listeners(self):
+        for listener in self.vocabulary_listeners:
+            listener()
+
+    def add_event_listener(self, listener):
+        """
+        Register a function which is called with every event of the event stream after it has been applied to the
+        item model.
+        """
+        self.event_listeners.append(listener)
+
+    def start_event_stream(self):
+        """
+        Keep the item model up to date by applying the item and metadata events of openHAB in a background thread.
+        """
+        if self.event_stream is None:
+            self.event_stream = EventStream(self.openhab_server_url, self.dispatch_event)
+            self.event_stream.start()
+
+        return self.event_stream
+
+    def stop_event_stream(self):
+        if self.event_stream is not None:
+            self.event_stream.stop()
+            self.event_stream = None
+
+    def dispatch_event(self, event):
+        self.handle_event(event)
+
+        for listener in self.event_listeners:
+            listener(event)
+
+    def handle_event(self, event):
+        name = event["entity"]
+
+        if name is None:
+            return
+
+        if event["type"] in STATE_EVENTS:
+            if self.state_cache is not None and isinstance(event["payload"], dict):
+                self.state_cache.update(name, event["payload"].get("value"))
+        elif event["type"] in ITEM_EVENTS:
+            self.apply_item_changes({name: self.load_item(name)})
+        elif event["type"] == "ItemRemovedEvent":
+            if self.state_cache is not None:
+                self.state_cache.invalidate(name)
+
+            self.apply_item_changes({name: None})
+        elif event["type"] in METADATA_EVENTS and event["namespace"] in METADATA_NAMESPACES:
+            self.apply_item_changes({name: self.load_item(name)})
+
+    def apply_item_changes(self, changes):
+        """
+        Replace the items passed as dict of item name to item. An item of None removes the item from the model.
+        Changes which leave the model as it is, e.g. of items without semantic tags, are ignored. Otherwise the index
+        is updated for the changed items and the vocabulary listeners are notified if the injected names have changed.
+        """
+        with self.model_lock:
+            changes = {name: item for name, item in changes.items() if self.changes_model(name, item)}
+
+            if len(changes) == 0:
+                return
+
+            vocabulary = self.get_vocabulary()
+            old_index = self.index
+
+            for name in changes:
+                old_item = old_index.items.get(name)
+
+                if old_item is not None and old_item.is_point_of in old_index.items:
+                    equipment = old_index.items[old_item.is_point_of]
+
+                    if name in equipment.has_points:
+                        equipment.has_points = tuple(point for point in equipment.has_points if point != name)
+
+            phrases = self.synonym_table.all_synonyms if self.synonym_table is not None else ()
+            index = old_index.with_changes(changes, phrases=phrases)
+            self.fix_inverse_relations(index.items)
+
+            for cycle in index.cycles:
+                if not set(cycle).isdisjoint(changes):
+                    print("The semantic model contains a cycle: {}".format(" -> ".join(cycle)))
+
+            self.index = index
+
+            # Group commands only depend on the groups containing the changed items
+            touched = set(changes)
+
+            for name in changes:
+                touched.update(old_index.ancestors.get(name, ()))
+                touched.update(index.ancestors.get(name, ()))
+
+            self.model_changed(touched)
+
+            changed = vocabulary != self.get_vocabulary()
+
+        if changed:
+            self.notify_vocabulary_listeners()
+
+    def changes_model(self, name, item):
+        """
+        Return whether replacing the item of the name by the item passed changes the model. Points which are derived
+        from the isPointOf relation of other items don't count as change of the equipment.
+        """
+        old_item = self.items.get(name)
+
+        if old_item is None or item is None:
+            return old_item is not item
+
+        if any(getattr(old_item, attribute) != getattr(item, attribute) for attribute in Item.__slots__
+               if attribute != "has_points"):
+            return True
+
+        derived = {
+            point for point in old_item.has_points if point in self.items and self.items[point].is_point_of == name
         }
 
-        for tag, synonyms in self.additional_synonyms.items():
-            for synonym in synonyms:
-                self.reversed_additional_synonyms.setdefault(synonym, []).append(tag)
+        return set(item.has_points) | derived != set(old_item.has_points)
+
+    def set_items(self, items):
+        """
+        Derive the inverse relations and the index of the items passed and swap them in as the current item model.
+        The model is replaced by a single assignment so that concurrent queries never see a partially built model.
+        """
+        self.fix_inverse_relations(items)
+        phrases = self.synonym_table.all_synonyms if self.synonym_table is not None else ()
+        index = ItemIndex(items, phrases=phrases)
+
+        for cycle in index.cycles:
+            print("The semantic model contains a cycle: {}".format(" -> ".join(cycle)))
+
+        self.index = index
+        self.model_changed()
+
+    def model_changed(self, touched=None):
+        """
+        Drop everything derived from the previous item model or synonyms. Must be called after the new model has been
+        swapped in, so that results computed from the old model are never cached for the new generation. With the
+        names of the touched items only the group members involving them are dropped. Cached resolutions are always
+        dropped, as any changed label, tag or location may change which items a spoken phrase resolves to.
+        """
+        self.generation += 1
+
+        if self.group_planner is not None:
+            if touched is None:
+                self.group_planner.clear()
+            else:
+                self.group_planner.invalidate(touched)
+
+    def load_synonyms(self):
+        """
+        Load the synonyms of the semantic tags of all languages. The synonyms of the default language are used for the
+        injection and for lookups without a language.
+        """
+        languages = self.languages if self.lang in self.languages else (self.lang,) + self.languages
+        self.synonym_table = load_synonym_table(languages, self.synonym_cache_path)
+        self.additional_synonyms = self.synonym_table.tags[self.lang]
+        self.reversed_additional_synonyms = self.synonym_table.synonyms[self.lang]
+        self.model_changed()
+
+    def tag_synonyms(self, lang=None):
+        """
+        Return the dict of synonym to tags of the language. Falls back to the default language if the language is None
+        or has not been loaded.
+        """
+        if lang is None or lang == self.lang or self.synonym_table is None:
+            return self.reversed_additional_synonyms
+
+        return self.synonym_table.synonyms.get(lang, self.reversed_additional_synonyms)
+
+    @traced("location", details=item_name)
+    def get_location(self, spoken_location, fuzzy=True, lang=None):
+        """
+        Return the location matching the spoken location. If there is no exact match the most similar phrase of the
+        model which denotes a location is used. Tag synonyms are looked up in the language passed.
+        """
+        synonyms = self.tag_synonyms(lang)
+        location = self.find_location(spoken_location, synonyms)
+
+        if location is None and fuzzy:
+            for _, phrase in self.index.phrases.lookup(spoken_location):
+                location = self.find_location(phrase, synonyms)
+
+                if location is not None:
+                    break
 
-    def get_location(self, spoken_location):
+        return location
+
+    def find_location(self, spoken_location, synonyms=None):
         location = None
 
-        if spoken_location in self.reversed_additional_synonyms:
-            tags = self.reversed_additional_synonyms[spoken_location]
-            location = next((
-                location for location in self.items.values() if
-                location.is_location() and location.semantics in tags
-            ), None)
+        if synonyms is None:
+            synonyms = self.reversed_additional_synonyms
+
+        if spoken_location in synonyms:
+            tags = synonyms[spoken_location]
+            location = self.index.first(
+                location for tag in tags for location in self.index.with_semantics(tag) if location.is_location()
+            )
 
         if location is None:
             location = next((
-                location for location in self.items.values() if
-                location.is_location() and (spoken_location.lower() in location.synonyms or
-                                            spoken_location.lower() == location.label)
+                location for location in self.index.with_name(spoken_location.lower()) if location.is_location()
             ), None)
 
         return location
 
     def item_is_part_of_location(self, item, location):
-        if item.has_location is not None:
-            if location.name == item.has_location or self.item_is_part_of_location(
-                    self.items[item.has_location],
-                    location
-            ):
-                return True
-        elif item.is_point_of is not None and self.item_is_part_of_location(self.items[item.is_point_of], location):
-            return True
-        elif item.is_part_of is not None:
-            if item.is_part_of == location.name or self.item_is_part_of_location(self.items[item.is_part_of], location):
-                return True
+        return self.index.is_part_of(item, location)
 
-        return False
-
-    def fix_inverse_relations(self):
-        for item in self.items.values():
-            if item.is_point_of is not None and item.name not in self.items[item.is_point_of].has_points:
-                self.items[item.is_point_of].has_points.append(item.name)
+    @staticmethod
+    def fix_inverse_relations(items):
+        for item in items.values():
+            if item.is_point_of in items and item.name not in items[item.is_point_of].has_points:
+                items[item.is_point_of].has_points += (item.name,)
 
     def load_items(self):
         params = dict(
@@ -128,50 +524,50 @@ class OpenHAB:
 
         url = "{0}/rest/items".format(self.openhab_server_url)
 
-        result = requests.get(url=url, params=params)
-        result.raise_for_status()
-
-        items = result.json()
-        items_with_semantics = [item for item in items if "metadata" in item and "semantics" in item["metadata"]]
+        with self.request("GET", url, params=params, stream=self.stream_items) as result:
+            result.raise_for_status()
 
-        for item_result in items_with_semantics:
-            item = Item(
-                item_result['name'],
-                item_result.get('label', None),
-                item_result['type']
-            )
+            if self.stream_items:
+                item_results = iter_json_array(result.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+            else:
+                item_results = result.json()
 
-            semantics = item_result["metadata"]["semantics"]
-            item.semantics = semantics["value"]
+            items = {}
 
-            if "config" in semantics:
-                semantic_config = semantics["config"]
+            for item_result in item_results:
+                item = parse_item(item_result)
 
-                if "hasLocation" in semantic_config:
-                    item.has_location = semantic_config["hasLocation"]
+                if item is not None:
+                    items[item.name] = item
 
-                if "relatesTo" in semantic_config:
-                    item.relates_to = semantic_config["relatesTo"]
+        self.set_items(items)
+        self.save_snapshot()
 
-                if "isPartOf" in semantic_config:
-                    item.is_part_of = semantic_config["isPartOf"]
+    def load_item(self, name):
+        """
+        Fetch a single item from openHAB. Returns None if the item does not exist or has no semantic metadata.
+        """
+        url = "{0}/rest/items/{1}".format(self.openhab_server_url, name)
+        result = self.request("GET", url, params=dict(metadata="semantics,synonyms"))
 
-                if "isPointOf" in semantic_config:
-                    item.is_point_of = semantic_config["isPointOf"]
+        if result.status_code == 404:
+            return None
 
-                if "hasPoint" in semantic_config:
-                    item.has_points = semantic_config["hasPoint"].split(',')
+        result.raise_for_status()
 
-            if "synonyms" in item_result["metadata"]:
-                item.synonyms = [synonym.strip().lower() for synonym in item_result["metadata"]["synonyms"]["value"].split(",")]
+        return parse_item(result.json())
 
-            self.items[item.name] = item
+    def get_vocabulary(self):
+        items, locations = self.get_injections()
+        return set(items), set(locations)
 
     def get_injections(self):
+        items = self.items.values()
+
         item_names = set(chain.from_iterable(
-            (item.synonyms for item in self.items.values() if not item.is_location())
+            (item.synonyms for item in items if not item.is_location())
         )).union(
-            (item.label for item in self.items.values() if not item.is_location() and item.label is not None)
+            (item.label for item in items if not item.is_location() and item.label is not None)
         ).union(
             chain.from_iterable((v for k, v in self.additional_synonyms.items()
                                  if k.startswith("Property") or k.startswith("Equipment")
@@ -179,9 +575,9 @@ class OpenHAB:
         )
 
         location_names = set(
-            chain.from_iterable((item.synonyms for item in self.items.values() if item.is_location()))
+            chain.from_iterable((item.synonyms for item in items if item.is_location()))
         ).union(
-            (item.label for item in self.items.values() if item.is_location() and item.label is not None)
+            (item.label for item in items if item.is_location() and item.label is not None)
         ).union(set(
             chain.from_iterable((v for k, v in self.additional_synonyms.items() if k.startswith("Location"))))
         )
@@ -189,68 +585,311 @@ class OpenHAB:
         return list(item_names), list(location_names)
 
     def filter_by_location(self, items, location):
-        return set((item for item in items if self.item_is_part_of_location(item, location)))
+        members = self.index.members_of(location)
+
+        if members is None:
+            return set()
+
+        return set(members.intersection(items))
 
+    @traced("resolve", details=item_names)
     def get_items_with_attributes(self, point_type, esm_property=None, is_part_of_equipment=None, location=None,
                                   item_type=None):
-        items_found = [item for item in self.items.values() if
-                       item.semantics == point_type and
+        items_found = [item for item in self.index.with_semantics(point_type) if
                        (esm_property is None or esm_property == item.relates_to) and
                        (is_part_of_equipment is None or is_part_of_equipment == item.is_point_of) and
                        (item_type is None or item.item_type == item_type)
                        ]
 
         if location is not None:
-            return [item for item in items_found if self.item_is_part_of_location(item, location)]
+            members = self.index.members_of(location) or frozenset()
+            return [item for item in items_found if item in members]
         else:
             return items_found
 
-    def get_relevant_items(self, spoken_items, location=None, item_type=None):
+    @traced("resolve", details=item_names)
+    def get_relevant_items(self, spoken_items, location=None, item_type=None, fuzzy=True, lang=None):
+        """
+        Return the set of items matching the spoken item or list of spoken items in the location. Tag synonyms are
+        looked up in the language passed. The results are cached per generation of the item model, keyed by the
+        normalized spoken items.
+        """
+        if isinstance(spoken_items, list):
+            spoken_items = sorted(set(normalize_spoken(spoken_item) for spoken_item in spoken_items))
+        else:
+            spoken_items = normalize_spoken(spoken_items)
+
+        synonyms = self.tag_synonyms(lang)
+
+        if self.resolution_cache is None:
+            return self.resolve_items(spoken_items, location, item_type, fuzzy, synonyms)
+
+        generation = self.generation
+        key = (
+            tuple(spoken_items) if isinstance(spoken_items, list) else spoken_items,
+            location.name if location is not None else None,
+            item_type,
+            fuzzy,
+            lang if synonyms is not self.reversed_additional_synonyms else None
+        )
+        cached, items_found = self.resolution_cache.get(generation, key)
+
+        if not cached:
+            items_found = frozenset(self.resolve_items(spoken_items, location, item_type, fuzzy, synonyms))
+            self.resolution_cache.put(generation, key, items_found)
+
+        # Callers may modify the result
+        return set(items_found)
+
+    def resolve_items(self, spoken_items, location=None, item_type=None, fuzzy=True, synonyms=None):
         items_found = set()
 
         if isinstance(spoken_items, list):
             for spoken_item in spoken_items:
-                items_found = items_found.union(self.get_relevant_items(spoken_item, location))
+                items_found = items_found.union(
+                    self.resolve_items(spoken_item, location, fuzzy=fuzzy, synonyms=synonyms)
+                )
 
             return items_found
+
+        items_found = self.find_items(spoken_items, location, item_type, synonyms)
+
+        if len(items_found) > 0 or not fuzzy:
+            return items_found
+
+        # Resolve the most similar phrases of the model instead, e.g. inflected forms or compounds split differently
+        # by the speech recognition
+        best_distance = None
+
+        for distance, phrase in self.index.phrases.lookup(spoken_items):
+            if best_distance is not None and distance > best_distance:
+                break
+
+            phrase_items = self.find_items(phrase, location, item_type, synonyms)
+
+            if len(phrase_items) > 0:
+                best_distance = distance
+                items_found = items_found.union(phrase_items)
+
+        return items_found
+
+    def find_items(self, spoken_item, location=None, item_type=None, synonyms=None):
+        items_found = set()
+        spoken_item = spoken_item.lower()
+
+        if synonyms is None:
+            synonyms = self.reversed_additional_synonyms
+
+        if spoken_item in synonyms:
+            tags_to_search_for = synonyms[spoken_item]
+
+            for tag in tags_to_search_for:
+                if tag.startswith("Property"):
+                    items_found = items_found.union(set((
+                        item for item in self.index.with_property(tag) if
+                        item_type is None or item.item_type == item_type
+                    )))
+                elif tag.startswith("Equipment"):
+                    items_found = items_found.union(set((
+                        item for item in self.index.with_semantics(tag) if
+                        item_type is None or item.item_type == item_type
+                    )))
+
+            if location is not None:
+                items_found = self.filter_by_location(items_found, location)
+
+        if len(items_found) > 0:
+            return items_found
         else:
-            spoken_item = spoken_items.lower()
-
-            if spoken_item in self.reversed_additional_synonyms:
-                tags_to_search_for = self.reversed_additional_synonyms[spoken_item]
-
-                for tag in tags_to_search_for:
-                    if tag.startswith("Property"):
-                        items_found = items_found.union(set((
-                            item for item in self.items.values() if
-                            tag == item.relates_to and (item_type is None or item.item_type == item_type)
-                        )))
-                    elif tag.startswith("Equipment"):
-                        items_found = items_found.union(set((
-                            item for item in self.items.values() if
-                            item.semantics == tag and (item_type is None or item.item_type == item_type)
-                        )))
+            return items_found.union(set((
+                item for item in self.index.with_name(spoken_item) if
+                item_type is None or item.item_type == item_type
+            )))
 
-                if location is not None:
-                    items_found = self.filter_by_location(items_found, location)
+    def send_command(self, device, command):
+        """
+        Send the command to a single item and return whether openHAB accepted it.
+        """
+        url = "{0}/rest/items/{1}".format(self.openhab_server_url, device.name)
 
-            if len(items_found) > 0:
-                return items_found
-            else:
-                return items_found.union(set((
-                    item for item in self.items.values() if
-                    (item.label == spoken_item or spoken_item in item.synonyms) and
-                    (item_type is None or item.item_type == item_type))
-                ))
+        try:
+            result = self.request("POST", url, data=command)
+        except requests.RequestException as e:
+            print("Failed to send command {} to {}: {}".format(command, device.name, e))
+            return False
+
+        if self.state_cache is not None:
+            self.state_cache.invalidate(device.name)
+
+        if not result.ok:
+            print("openHAB rejected command {} for {}: {}".format(command, device.name, result.status_code))
+
+        return result.ok
 
+    @traced("openhab")
     def send_command_to_devices(self, devices, command):
+        """
+        Send the command to all devices passed. If group commands are enabled, devices which are exactly the command
+        accepting members of a group are switched by a single command to the group. The remaining commands are sent
+        concurrently if a command executor is configured. Returns the list of devices for which the command failed.
+        """
+        devices = list(devices)
+
+        if self.group_planner is not None and len(devices) > 1:
+            groups, devices = self.group_planner.plan(devices, command, self.group_candidates(devices, command))
+
+            for group, covered in groups:
+                if self.send_command(group, command):
+                    if self.state_cache is not None:
+                        for device in covered:
+                            self.state_cache.invalidate(device.name)
+                else:
+                    devices += covered
+
+        if self.command_executor is None or len(devices) < 2:
+            results = [self.send_command(device, command) for device in devices]
+        else:
+            results = list(self.command_executor.map(lambda device: self.send_command(device, command), devices))
+
+        return [device for device, success in zip(devices, results) if not success]
+
+    def group_candidates(self, devices, command):
+        """
+        Return pairs of the groups containing at least two of the devices and the devices they contain, largest groups
+        first. Groups with a command accepting member in the item model which is not among the devices are skipped
+        right away.
+        """
+        types = accepting_types(command)
+
+        if types is None:
+            return []
+
+        index = self.index
+        items = index.items
+        names = {device.name for device in devices}
+        contained = {}
+
         for device in devices:
-            url = "{0}/rest/items/{1}".format(self.openhab_server_url, device.name)
-            requests.post(url, command)
+            containers = set(index.ancestors.get(device.name, ()))
+
+            if device.is_point_of is not None:
+                containers.add(device.is_point_of)
+
+            for container in containers:
+                contained.setdefault(container, []).append(device)
 
+        candidates = []
+
+        for name, covered in contained.items():
+            group = items.get(name)
+
+            if group is None or group.item_type != "Group" or len(covered) < 2:
+                continue
+
+            members = set(index.members_of(group) or ())
+
+            for member in list(members) + [group]:
+                members.update(items[point] for point in member.has_points if point in items)
+
+            if any(member.name not in names and base_type(member.item_type) in types for member in members):
+                continue
+
+            candidates.append((group, covered))
+
+        candidates.sort(key=lambda candidate: (-len(candidate[1]), index.positions[candidate[0].name]))
+        return candidates
+
+    def fetch_group(self, name):
+        """
+        Return the recursive REST representation of the group including its members or None if it failed.
+        """
+        url = "{0}/rest/items/{1}".format(self.openhab_server_url, name)
+
+        try:
+            result = self.request("GET", url, params=dict(recursive="true"))
+        except requests.RequestException as e:
+            print("Failed to load the members of {}: {}".format(name, e))
+            return None
+
+        if not result.ok:
+            return None
+
+        return result.json()
+
+    def load_states(self):
+        """
+        Seed the state cache with the states of all items using a single request.
+        """
+        self.fetch_states()
+
+    def fetch_states(self):
+        """
+        Fetch the states of all items using a single request and update the state cache. Returns a dict of item name
+        to state.
+        """
+        url = "{0}/rest/items".format(self.openhab_server_url)
+        result = self.request("GET", url, params=dict(recursive="false", fields="name,state"))
+        result.raise_for_status()
+
+        states = {item["name"]: item.get("state") for item in result.json()}
+
+        if self.state_cache is not None:
+            self.state_cache.update_all(states)
+
+        return states
+
+    @traced("openhab")
+    def get_states(self, items):
+        """
+        Return a dict of the items passed to their states, None if a state is unknown. Fresh states of the state cache
+        are used, the remaining states are fetched together with a single request.
+        """
+        states = {}
+        missing = []
+
+        for item in items:
+            fresh, state = self.state_cache.get(item.name) if self.state_cache is not None else (False, None)
+
+            if fresh:
+                states[item] = state
+            else:
+                missing.append(item)
+
+        if len(missing) == 1:
+            states[missing[0]] = self.fetch_state(missing[0])
+        elif len(missing) > 1:
+            try:
+                fetched = self.fetch_states()
+            except requests.RequestException as e:
+                print("Failed to fetch the states of {} items: {}".format(len(missing), e))
+                fetched = {}
+
+            for item in missing:
+                states[item] = fetched.get(item.name)
+
+        return {item: None if state == "NULL" else state for item, state in states.items()}
+
+    @traced("openhab")
     def get_state(self, item):
+        if self.state_cache is not None:
+            fresh, state = self.state_cache.get(item.name)
+
+            if fresh:
+                return None if state == "NULL" else state
+
+        state = self.fetch_state(item)
+        return None if state == "NULL" else state
+
+    def fetch_state(self, item):
+        """
+        Fetch the state of a single item and update the state cache. Returns None if the request failed.
+        """
         url = "{0}/rest/items/{1}".format(self.openhab_server_url, item.name)
-        result = requests.get(url)
+
+        try:
+            result = self.request("GET", url)
+        except requests.RequestException:
+            return None
 
         if result.status_code != 200:
             return None
@@ -258,7 +897,7 @@ class OpenHAB:
         data = result.json()
         state = data['state']
 
-        if state == "NULL":
-            state = None
+        if self.state_cache is not None:
+            self.state_cache.update(item.name, state)
 
         return state
@@ -0,0 +1,162 @@
+import re
+
+MAX_DISTANCE = 2
+SEPARATORS = re.compile(r"[\s\-_]+")
+
+
+def normalize_phrase(phrase):
+    """
+    Lower the phrase and remove spaces and hyphens so that "Wohnzimmer Lampe", "Wohnzimmer-Lampe" and
+    "Wohnzimmerlampe" are treated as the same phrase.
+    """
+    return SEPARATORS.sub("", phrase.lower())
+
+
+def default_max_distance(word):
+    if len(word) <= 4:
+        return 0
+    elif len(word) <= 8:
+        return 1
+    else:
+        return MAX_DISTANCE
+
+
+def partition(length, parts):
+    """
+    Return the start and length of the segments a word of the length passed is split into.
+    """
+    size, remainder = divmod(length, parts)
+    segments = []
+    start = 0
+
+    for i in range(parts):
+        segment_length = size + (1 if i >= parts - remainder else 0)
+        segments.append((start, segment_length))
+        start += segment_length
+
+    return segments
+
+
+def edit_distance(a, b, max_distance):
+    """
+    Levenshtein distance of a and b or max_distance + 1 if it exceeds max_distance. Only the diagonal band of the
+    matrix which can stay within max_distance is computed.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    infinity = max_distance + 1
+    previous_row = list(range(len(b) + 1))
+
+    for i in range(1, len(a) + 1):
+        row = [infinity] * (len(b) + 1)
+        row[0] = i
+        low = max(1, i - max_distance)
+        high = min(len(b), i + max_distance)
+
+        for j in range(low, high + 1):
+            row[j] = min(
+                row[j - 1] + 1,
+                previous_row[j] + 1,
+                previous_row[j - 1] + (a[i - 1] != b[j - 1])
+            )
+
+        if min(row[low - 1:high + 1]) > max_distance:
+            return infinity
+
+        previous_row = row
+
+    return min(previous_row[-1], infinity)
+
+
+class PhraseIndex:
+    """
+    Finds all phrases within a bounded edit distance of a spoken phrase.
+
+    Every normalized phrase is split into MAX_DISTANCE + 1 segments. A phrase within the distance of the spoken
+    phrase contains at least one of its segments unchanged and shifted by at most the distance, so only phrases
+    sharing such a segment with the spoken phrase have to be compared. Each normalized phrase keeps the original
+    phrases it was created from, so that they can be resolved like an exact match afterwards.
+    """
+
+    def __init__(self, phrases=()):
+        self.words = {}
+        self.segments = {}
+        self.short_words = {}
+
+        for phrase in phrases:
+            self.add(phrase)
+
+    def __len__(self):
+        return len(self.words)
+
+    def add(self, phrase):
+        word = normalize_phrase(phrase)
+
+        if word == "":
+            return
+
+        if word not in self.words:
+            self.words[word] = set()
+
+            if len(word) > MAX_DISTANCE:
+                for i, (start, length) in enumerate(partition(len(word), MAX_DISTANCE + 1)):
+                    self.segments.setdefault((len(word), i, word[start:start + length]), []).append(word)
+            else:
+                self.short_words.setdefault(len(word), []).append(word)
+
+        self.words[word].add(phrase)
+
+    def candidates(self, word, max_distance):
+        """
+        Return the phrases which keep enough of their segments within the distance of the spoken phrase. Each edit
+        changes at most one segment, so at least MAX_DISTANCE + 1 - max_distance segments have to be found.
+        """
+        required = MAX_DISTANCE + 1 - max_distance
+        matches = {}
+
+        for length in range(max(MAX_DISTANCE + 1, len(word) - max_distance), len(word) + max_distance + 1):
+            for i, (start, segment_length) in enumerate(partition(length, MAX_DISTANCE + 1)):
+                found = set()
+
+                for shift in range(max(0, start - max_distance), min(len(word), start + max_distance) + 1):
+                    found.update(self.segments.get((length, i, word[shift:shift + segment_length]), ()))
+
+                for candidate in found:
+                    matches[candidate] = matches.get(candidate, 0) + 1
+
+        candidates = {candidate for candidate, count in matches.items() if count >= required}
+
+        # Phrases too short to be split into segments are compared by their length only
+        for length in range(max(1, len(word) - max_distance), MAX_DISTANCE + 1):
+            candidates.update(self.short_words.get(length, ()))
+
+        return candidates
+
+    def lookup(self, phrase, max_distance=None):
+        """
+        Return a list of tuples of edit distance and original phrase for all phrases within max_distance of the
+        phrase passed, ranked by distance and by how close the length of the phrase is. If no distance is passed it
+        is derived from the length of the phrase.
+        """
+        word = normalize_phrase(phrase)
+
+        if max_distance is None:
+            max_distance = default_max_distance(word)
+
+        max_distance = min(max_distance, MAX_DISTANCE)
+
+        if max_distance == 0:
+            return [(0, original) for original in sorted(self.words.get(word, ()))]
+
+        results = []
+
+        for candidate in self.candidates(word, max_distance):
+            distance = edit_distance(word, candidate, max_distance)
+
+            if distance <= max_distance:
+                for original in self.words[candidate]:
+                    results.append((distance, abs(len(candidate) - len(word)), original))
+
+        results.sort()
+        return [(distance, original) for distance, _, original in results]
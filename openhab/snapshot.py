@@ -0,0 +1,23 @@
+from common.files import read_versioned, write_versioned
+
+SNAPSHOT_VERSION = 2
+
+
+def write_snapshot(path, openhab_server_url, index):
+    """
+    Store the index, which includes the items, on disk.
+    """
+    write_versioned(path, SNAPSHOT_VERSION, dict(openhab_server_url=openhab_server_url, index=index), binary=True)
+
+
+def read_snapshot(path, openhab_server_url):
+    """
+    Return the index stored in the snapshot or None if there is no usable snapshot for the openHAB server. Snapshots
+    of another format version are ignored.
+    """
+    snapshot = read_versioned(path, SNAPSHOT_VERSION, binary=True, description="snapshot")
+
+    if snapshot is None or snapshot.get("openhab_server_url") != openhab_server_url:
+        return None
+
+    return snapshot["index"]
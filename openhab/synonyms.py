@@ -0,0 +1,115 @@
+import os
+import pickle
+from itertools import chain
+
+from common.files import read_versioned, write_versioned
+
+TABLE_VERSION = 1
+TAGS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tags")
+
+
+def load_properties(filepath, sep='=', comment_char='#'):
+    """
+    Read the file passed as parameter as a properties file.
+    """
+    props = {}
+    with open(filepath, "rt", encoding='utf-8') as f:
+        for line in f:
+            l = line.strip()
+            if l and not l.startswith(comment_char):
+                key_value = l.split(sep)
+                key = key_value[0].strip()
+                value = sep.join(key_value[1:]).strip().strip('"')
+                props[key] = value
+    return props
+
+
+def tags_path(lang):
+    return os.path.join(TAGS_DIRECTORY, "tags_{language}.properties".format(language=lang))
+
+
+def parse_synonyms(path):
+    """
+    Return a dict of the semantic tags to the lower cased synonyms of the properties file.
+    """
+    return {tag: [synonym.lower() for synonym in value.split(',')] for tag, value in load_properties(path).items()}
+
+
+def reverse_synonyms(tags):
+    synonyms = {}
+
+    for tag, tag_synonyms in tags.items():
+        for synonym in tag_synonyms:
+            synonyms.setdefault(synonym, []).append(tag)
+
+    return synonyms
+
+
+class SynonymTable:
+    """
+    The synonyms of the semantic tags in several languages. tags maps each language to a dict of tag to synonyms,
+    synonyms maps each language to a dict of synonym to tags.
+    """
+
+    def __init__(self, tags):
+        self.tags = tags
+        self.synonyms = {lang: reverse_synonyms(lang_tags) for lang, lang_tags in tags.items()}
+        self.all_synonyms = frozenset(chain.from_iterable(self.synonyms.values()))
+
+    @property
+    def languages(self):
+        return tuple(sorted(self.tags))
+
+
+def source_signatures(languages):
+    """
+    Return the modification time and size of the properties file of each language.
+    """
+    signatures = {}
+
+    for lang in languages:
+        stat = os.stat(tags_path(lang))
+        signatures[lang] = (stat.st_mtime_ns, stat.st_size)
+
+    return signatures
+
+
+def read_cached_table(path, signatures):
+    """
+    Return the table stored in the cache file or None if there is no cache or any properties file has changed since
+    it was written.
+    """
+    cached = read_versioned(path, TABLE_VERSION, binary=True, description="synonym cache")
+
+    if cached is None or cached.get("signatures") != signatures:
+        return None
+
+    return cached["table"]
+
+
+def write_cached_table(path, signatures, table):
+    write_versioned(path, TABLE_VERSION, dict(signatures=signatures, table=table), binary=True)
+
+
+def load_synonym_table(languages, cache_path=None):
+    """
+    Return the SynonymTable of the languages passed. The table is read from the cache file as long as the properties
+    files of the languages are unchanged, otherwise it is built from the properties files and the cache is replaced.
+    """
+    signatures = source_signatures(languages)
+
+    if cache_path is not None:
+        table = read_cached_table(cache_path, signatures)
+
+        if table is not None:
+            return table
+
+    table = SynonymTable({lang: parse_synonyms(tags_path(lang)) for lang in languages})
+
+    if cache_path is not None:
+        try:
+            write_cached_table(cache_path, signatures, table)
+        except (OSError, pickle.PicklingError) as e:
+            print("Failed to write the synonym cache: {}".format(e))
+
+    return table
@@ -1,11 +1,17 @@
+import asyncio
 import unittest
+from unittest.mock import patch
 import responses
 
 from assistant.assistant import TestIntentMessage, TestIntent, TestSlots, TestSlot, TestValue
 from mocks.mocks import load_mocks, openhab_mock_base, add_anlage_an_aus_command_mock, add_get_temperature_mock, \
-    add_anlage_volume_command_mock, add_esszimmer_lights_command_mock, add_player_command_mock
+    add_anlage_volume_command_mock, add_esszimmer_lights_command_mock, add_player_command_mock, add_item_command_mock, \
+    add_states_mock
 
-from actions import get_test_assistant, user_intent
+import actions
+import assistant.assistant as assistant_module
+from assistant.profiling import IntentProfiler
+from actions import get_test_assistant, user_intent, inject_items, NOT_READY
 
 
 class TestAssistant(unittest.TestCase):
@@ -59,6 +65,25 @@ class TestAssistant(unittest.TestCase):
         self.assertTrue(success)
         self.assertEqual("Ich habe dir die anlage eingeschaltet.", message)
 
+    @responses.activate
+    def test_switch_on_callback_failed_device(self):
+        load_mocks()
+        add_item_command_mock()
+        assistant = get_test_assistant(openhab_mock_base)
+
+        success, message = assistant.callback(
+            TestIntentMessage(
+                TestIntent(user_intent("switchDeviceOn")),
+                TestSlots(dict(
+                    device=TestSlot([TestValue("licht")]),
+                    room=TestSlot([TestValue("esszimmer")])
+                ))
+            )
+        )
+
+        self.assertFalse(success)
+        self.assertEqual("Ich habe dir die tischlampe eingeschaltet. Vitrine konnte ich nicht einschalten.", message)
+
     @responses.activate
     def test_get_temperature_callback(self):
         load_mocks()
@@ -77,6 +102,27 @@ class TestAssistant(unittest.TestCase):
         self.assertIsNone(success)
         self.assertEqual("Die Temperatur im wohnzimmer beträgt 23,1 Grad.", message)
 
+    @responses.activate
+    def test_get_summary_callback(self):
+        load_mocks()
+        add_states_mock()
+        assistant = get_test_assistant(openhab_mock_base)
+
+        success, message = assistant.callback(
+            TestIntentMessage(
+                TestIntent(user_intent("getSummary")),
+                TestSlots(dict(
+                    room=TestSlot([TestValue("wohnzimmer")])
+                ))
+            )
+        )
+
+        self.assertIsNone(success)
+        self.assertEqual(
+            "Die Temperatur im wohnzimmer beträgt 23,1 Grad. Eingeschaltet ist der fernseher.", message
+        )
+        self.assertEqual(2, len(responses.calls))
+
     @responses.activate
     def test_increase_volume(self):
         load_mocks()
@@ -131,3 +177,154 @@ class TestAssistant(unittest.TestCase):
 
         self.assertTrue(success)
         self.assertEqual("Ich habe die Wiedergabe im wohnzimmer fortgesetzt.", message)
+
+    @responses.activate
+    def test_async_callback(self):
+        load_mocks()
+        add_get_temperature_mock()
+        add_player_command_mock()
+        assistant = get_test_assistant(openhab_mock_base)
+        loop = asyncio.new_event_loop()
+
+        async def run_callbacks():
+            return await asyncio.gather(
+                assistant.async_callback(TestIntentMessage(
+                    TestIntent(user_intent("getTemperature")),
+                    TestSlots(dict(room=TestSlot([TestValue("wohnzimmer")])))
+                ), loop),
+                assistant.async_callback(TestIntentMessage(
+                    TestIntent(user_intent("pauseMedia")),
+                    TestSlots(dict(room=TestSlot([TestValue("wohnzimmer")])))
+                ), loop)
+            )
+
+        try:
+            results = loop.run_until_complete(run_callbacks())
+        finally:
+            loop.close()
+
+        self.assertEqual((None, "Die Temperatur im wohnzimmer beträgt 23,1 Grad."), results[0])
+        self.assertEqual((True, "Ich habe die Wiedergabe im wohnzimmer pausiert."), results[1])
+
+    @responses.activate
+    def test_repeat_last_message_per_site(self):
+        load_mocks()
+        assistant = get_test_assistant(openhab_mock_base)
+
+        assistant.callback(TestIntentMessage(
+            TestIntent(user_intent("switchDeviceOn")),
+            TestSlots({}),
+            site_id="kueche"
+        ))
+
+        success, message = assistant.callback(TestIntentMessage(
+            TestIntent(user_intent("repeatLastMessage")),
+            TestSlots({}),
+            site_id="kueche"
+        ))
+
+        self.assertEqual("Ich habe nicht verstanden, welches Gerät du einschalten möchtest.", message)
+
+        success, message = assistant.callback(TestIntentMessage(
+            TestIntent(user_intent("repeatLastMessage")),
+            TestSlots({}),
+            site_id="wohnzimmer"
+        ))
+
+        self.assertIsNone(message)
+
+    @responses.activate
+    def test_inject_only_changes(self):
+        load_mocks()
+        assistant = get_test_assistant(openhab_mock_base)
+
+        self.assertEqual(1, len(assistant.injections))
+        entities, from_vanilla = assistant.injections[0]
+        self.assertTrue(from_vanilla)
+        self.assertIn("fernseher", entities["device"])
+
+        inject_items(assistant)
+        self.assertEqual(1, len(assistant.injections))
+
+    @responses.activate
+    def test_trace_stages(self):
+        load_mocks()
+        add_anlage_an_aus_command_mock()
+        assistant = get_test_assistant(openhab_mock_base)
+
+        assistant.callback(TestIntentMessage(
+            TestIntent(user_intent("switchDeviceOn")),
+            TestSlots(dict(
+                device=TestSlot([TestValue("anlage")])
+            ))
+        ))
+
+        stages = {stage for intent_name, stage in assistant.tracer.histograms}
+
+        self.assertEqual({"total", "callback", "slots", "resolve", "openhab", "sentence"}, stages)
+        self.assertIn("switchDeviceOn total", assistant.tracer.summary())
+
+    @responses.activate
+    def test_not_ready(self):
+        load_mocks()
+        assistant = get_test_assistant(openhab_mock_base)
+        intent_message = TestIntentMessage(
+            TestIntent(user_intent("getTemperature")),
+            TestSlots(dict(
+                room=TestSlot([TestValue("wohnzimmer")])
+            ))
+        )
+        actions.ready.clear()
+
+        try:
+            self.assertEqual((False, NOT_READY), assistant.callback(intent_message))
+        finally:
+            actions.ready.set()
+
+    def test_start_model_retries(self):
+        class FlakyModel:
+            def __init__(self):
+                self.attempts = 0
+                self.items = {}
+
+            def load(self):
+                self.attempts += 1
+
+                if self.attempts == 1:
+                    raise ValueError("Truncated item list")
+
+            def get_injections(self):
+                return [], []
+
+        model = FlakyModel()
+        assistant = assistant_module.TestAssistant()
+        assistant.conf['secret']['model_service'] = 'client'
+        actions.ready.clear()
+
+        with patch.object(actions, "openhab", model), patch.object(actions, "STARTUP_RETRY_INTERVAL", 0):
+            actions.start_model(assistant)
+
+        self.assertEqual(2, model.attempts)
+        self.assertTrue(actions.ready.is_set())
+
+    @responses.activate
+    def test_profiler(self):
+        load_mocks()
+        add_anlage_an_aus_command_mock()
+        assistant = get_test_assistant(openhab_mock_base)
+        assistant.profiler = IntentProfiler(sample_rate=1)
+
+        assistant.callback(TestIntentMessage(
+            TestIntent(user_intent("switchDeviceOn")),
+            TestSlots(dict(
+                device=TestSlot([TestValue("anlage")])
+            ))
+        ))
+
+        entry = assistant.profiler.slowest()[0]
+
+        self.assertEqual(user_intent("switchDeviceOn"), entry["intent"])
+        self.assertEqual({"device": ["anlage"]}, entry["slots"])
+        self.assertIn("openhab", entry["stages"])
+        self.assertIsNotNone(entry["profile"])
+        self.assertEqual({"resolve": [["Anlage"]]}, entry["details"])
@@ -0,0 +1,93 @@
+import unittest
+
+from mocks.server import FakeOpenHABServer
+from openhab.coalescer import CommandCoalescer
+from openhab.openhab import OpenHAB
+
+
+class TestCommandCoalescer(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeOpenHABServer().start()
+        self.server.states["Temperature_Livingroom"] = "21.0"
+        self.server.states["Anlage_Volume"] = "95"
+        self.oh = OpenHAB(self.server.url, command_workers=1)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_tracked_target(self):
+        coalescer = CommandCoalescer(self.oh)
+        thermostat = self.oh.items["Temperature_Livingroom"]
+
+        self.assertEqual((True, 22.0), coalescer.adjust(thermostat, 1))
+        self.assertEqual((True, 23.0), coalescer.adjust(thermostat, 1))
+        self.assertEqual(
+            [("Temperature_Livingroom", "22.0"), ("Temperature_Livingroom", "23.0")],
+            self.server.commands
+        )
+
+    def test_outdated_target(self):
+        now = [0]
+        coalescer = CommandCoalescer(self.oh, target_max_age=10, clock=lambda: now[0])
+        thermostat = self.oh.items["Temperature_Livingroom"]
+
+        coalescer.adjust(thermostat, 1)
+        now[0] = 11
+
+        self.assertEqual((True, 20.0), coalescer.adjust(thermostat, -1))
+
+    def test_merged_commands(self):
+        coalescer = CommandCoalescer(self.oh, window=60)
+        thermostat = self.oh.items["Temperature_Livingroom"]
+
+        coalescer.adjust(thermostat, 1)
+        coalescer.adjust(thermostat, 1)
+        coalescer.adjust(thermostat, -0.5)
+
+        self.assertEqual([], self.server.commands)
+
+        coalescer.flush_all()
+
+        self.assertEqual([("Temperature_Livingroom", "22.5")], self.server.commands)
+        self.assertEqual({}, coalescer.pending)
+
+    def test_failed_merged_command(self):
+        coalescer = CommandCoalescer(self.oh, window=60)
+        thermostat = self.oh.items["Temperature_Livingroom"]
+        item = self.server.items["Temperature_Livingroom"]
+
+        self.assertEqual((True, 22.0), coalescer.adjust(thermostat, 1))
+
+        self.server.remove_item("Temperature_Livingroom")
+        coalescer.flush_all()
+        self.server.add_item(item)
+
+        self.assertEqual((False, None), coalescer.adjust(thermostat, 1))
+        self.assertEqual({}, coalescer.pending)
+        self.assertEqual((True, 22.0), coalescer.adjust(thermostat, 1))
+
+        coalescer.flush_all()
+
+        self.assertEqual([("Temperature_Livingroom", "22.0")], self.server.commands)
+
+    def test_dimmer_steps(self):
+        volume = self.oh.items["Anlage_Volume"]
+
+        self.assertEqual([], CommandCoalescer(self.oh).step([volume], True))
+        self.assertEqual([("Anlage_Volume", "INCREASE")], self.server.commands)
+
+        del self.server.commands[:]
+        coalescer = CommandCoalescer(self.oh, window=60)
+
+        self.assertEqual([], coalescer.step([volume], True))
+        self.assertEqual([], coalescer.step([volume], True))
+        coalescer.flush_all()
+
+        self.assertEqual([("Anlage_Volume", "100")], self.server.commands)
+
+    def test_state_without_number(self):
+        self.server.states["Temperature_Livingroom"] = "NULL"
+        coalescer = CommandCoalescer(self.oh)
+
+        self.assertEqual((False, None), coalescer.adjust(self.oh.items["Temperature_Livingroom"], 1))
+        self.assertEqual([], self.server.commands)
@@ -0,0 +1,61 @@
+import threading
+import unittest
+
+from assistant.dispatcher import IntentDispatcher, DROP
+
+
+class TestIntentDispatcher(unittest.TestCase):
+    def test_order_within_site(self):
+        dispatcher = IntentDispatcher(4)
+        executed = []
+        lock = threading.Lock()
+
+        def task(i):
+            with lock:
+                executed.append(i)
+
+        for i in range(20):
+            dispatcher.submit("wohnzimmer", lambda i=i: task(i))
+
+        dispatcher.shutdown()
+
+        self.assertEqual(list(range(20)), executed)
+
+    def test_sites_run_in_parallel(self):
+        dispatcher = IntentDispatcher(2)
+        blocked = threading.Event()
+        finished = threading.Event()
+
+        dispatcher.submit("wohnzimmer", lambda: blocked.wait(5))
+        dispatcher.submit("kueche", finished.set)
+
+        self.assertTrue(finished.wait(5))
+
+        blocked.set()
+        dispatcher.shutdown()
+
+    def test_drop_when_full(self):
+        dispatcher = IntentDispatcher(1, max_pending=2, policy=DROP)
+        started = threading.Event()
+        blocked = threading.Event()
+        executed = []
+
+        def block():
+            started.set()
+            blocked.wait(5)
+
+        self.assertTrue(dispatcher.submit("wohnzimmer", block))
+        self.assertTrue(started.wait(5))
+        self.assertTrue(dispatcher.submit("wohnzimmer", lambda: executed.append(1)))
+        self.assertTrue(dispatcher.submit("kueche", lambda: executed.append(2)))
+        self.assertFalse(dispatcher.submit("wohnzimmer", lambda: executed.append(3)))
+        self.assertEqual(1, dispatcher.dropped)
+
+        blocked.set()
+        dispatcher.shutdown()
+
+        self.assertEqual([1, 2], sorted(executed))
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            IntentDispatcher(1, policy="unknown")
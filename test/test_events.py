@@ -0,0 +1,120 @@
+import time
+import unittest
+
+from mocks.server import FakeOpenHABServer
+from openhab.events import parse_event, read_events, read_lines
+from openhab.openhab import OpenHAB
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+
+    while not condition():
+        if time.time() > deadline:
+            return False
+
+        time.sleep(0.01)
+
+    return True
+
+
+class TestEvents(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeOpenHABServer().start()
+        self.server.states["Temperature_Livingroom"] = "21.5"
+        self.oh = OpenHAB(self.server.url, state_max_age=60)
+
+    def tearDown(self):
+        self.oh.stop_event_stream()
+        self.server.stop()
+
+    def test_read_events(self):
+        chunks = [b"event: message\ndata: {\"a\"", b":1}\n\ndata: 2\r\ndata: 3\r\n\r\n"]
+        self.assertEqual(['{"a":1}', "2\n3"], list(read_events(read_lines(chunks))))
+
+    def test_parse_event(self):
+        event = parse_event(
+            '{"topic":"smarthome/metadata/synonyms:Lampe_Bett/added","payload":"{\\"value\\":\\"Leselampe\\"}",'
+            '"type":"MetadataAddedEvent"}'
+        )
+
+        self.assertEqual("MetadataAddedEvent", event["type"])
+        self.assertEqual("Lampe_Bett", event["entity"])
+        self.assertEqual("synonyms", event["namespace"])
+        self.assertEqual(dict(value="Leselampe"), event["payload"])
+
+    def test_item_added_and_removed(self):
+        injections = []
+        self.oh.add_vocabulary_listener(lambda: injections.append(self.oh.get_injections()))
+        self.assertTrue(self.oh.start_event_stream().connected.wait(5))
+
+        self.server.add_item(dict(
+            name="Lampe_Kueche", label="Deckenlampe", type="Switch",
+            metadata=dict(semantics=dict(value="Point_Control", config=dict(
+                relatesTo="Property_Light", hasLocation="kueche"
+            )))
+        ))
+
+        self.assertTrue(wait_for(lambda: "Lampe_Kueche" in self.oh.items))
+        self.assertEqual(
+            {self.oh.items["Lampe_Kueche"]},
+            self.oh.get_relevant_items("Licht", self.oh.get_location("küche"))
+        )
+        self.assertTrue(wait_for(lambda: len(injections) == 1))
+        self.assertIn("deckenlampe", injections[0][0])
+
+        self.server.remove_item("Anlage_An_Aus")
+
+        self.assertTrue(wait_for(lambda: "Anlage_An_Aus" not in self.oh.items))
+        self.assertNotIn("Anlage_An_Aus", self.oh.items["Anlage"].has_points)
+        self.assertEqual(1, len(injections))
+
+    def test_equipment_removed_before_points(self):
+        self.assertTrue(self.oh.start_event_stream().connected.wait(5))
+
+        self.server.remove_item("Anlage")
+
+        self.assertTrue(wait_for(lambda: "Anlage" not in self.oh.items))
+        self.assertEqual("Anlage", self.oh.items["Anlage_An_Aus"].is_point_of)
+
+        self.server.remove_item("Anlage_An_Aus")
+
+        self.assertTrue(wait_for(lambda: "Anlage_An_Aus" not in self.oh.items))
+
+    def test_changes_outside_the_model(self):
+        generation = self.oh.generation
+        index = self.oh.index
+
+        self.oh.apply_item_changes(dict(NotExisting=None))
+        self.oh.apply_item_changes(dict(Lampe_Bett=self.oh.load_item("Lampe_Bett")))
+        self.oh.apply_item_changes(dict(Anlage=self.oh.load_item("Anlage")))
+
+        self.assertEqual(generation, self.oh.generation)
+        self.assertIs(index, self.oh.index)
+
+    def test_metadata_updated(self):
+        self.assertTrue(self.oh.start_event_stream().connected.wait(5))
+
+        item = dict(self.server.items["Lampe_Bett"])
+        item["metadata"] = dict(item["metadata"], synonyms=dict(value="Leselampe"))
+        self.server.items["Lampe_Bett"] = item
+        self.server.publish(
+            "MetadataAddedEvent", "smarthome/metadata/synonyms/Lampe_Bett/added", dict(value="Leselampe")
+        )
+
+        self.assertTrue(wait_for(lambda: len(self.oh.get_relevant_items("leselampe")) == 1))
+
+    def test_state_changed(self):
+        temperature = self.oh.items["Temperature_Livingroom"]
+
+        self.assertEqual("21.5", self.oh.get_state(temperature))
+        self.assertTrue(self.oh.start_event_stream().connected.wait(5))
+
+        self.server.states["Temperature_Livingroom"] = "22.0"
+        self.server.publish(
+            "ItemStateChangedEvent", "smarthome/items/Temperature_Livingroom/statechanged",
+            dict(type="Decimal", value="22.0", oldType="Decimal", oldValue="21.5")
+        )
+
+        self.assertTrue(wait_for(lambda: self.oh.state_cache.get("Temperature_Livingroom") == (True, "22.0")))
+        self.assertEqual("22.0", self.oh.get_state(temperature))
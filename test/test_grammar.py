@@ -0,0 +1,39 @@
+import unittest
+
+from genderdeterminator import GenderDeterminator, Case
+
+from actions.grammar import CachedGenderDeterminator, gender_determinator
+
+
+class TestCachedGenderDeterminator(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.gd = CachedGenderDeterminator(cache_size=2)
+
+    def test_same_genders_as_word_list_scan(self):
+        original = GenderDeterminator()
+
+        for noun in ("Bettlampe", "Wohnzimmer", "Küche", "Fernseher", "Anlage", "Lautstärke", "Blubb", ""):
+            self.assertEqual(original.get_gender(noun), self.gd.get_gender(noun))
+
+    def test_articles(self):
+        self.assertEqual("die bettlampe", self.gd.get("bettlampe", Case.ACCUSATIVE))
+        self.assertEqual("den fernseher", self.gd.get("fernseher", Case.ACCUSATIVE))
+        self.assertEqual("dem", self.gd.get("Wohnzimmer", Case.DATIVE, append=False))
+        self.assertEqual("blubb", self.gd.get("blubb", Case.ACCUSATIVE))
+
+    def test_precompute(self):
+        gd = CachedGenderDeterminator(cache_size=2)
+        gd.precompute(["Bettlampe", "schlafzimmer"])
+
+        self.assertEqual({"bettlampe": "f", "schlafzimmer": "n"}, gd.known)
+        self.assertEqual("n", gd.get_gender("Schlafzimmer"))
+        self.assertEqual(0, gd.cached_gender.cache_info().currsize)
+
+        for noun in ("Küche", "Anlage", "Fernseher"):
+            gd.get_gender(noun)
+
+        self.assertEqual(2, gd.cached_gender.cache_info().currsize)
+
+    def test_shared_instance(self):
+        self.assertIs(gender_determinator(), gender_determinator())
@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+
+from assistant.injection import InjectionRecord, assistant_identity
+
+
+class TestInjectionRecord(unittest.TestCase):
+    def test_first_injection_from_vanilla(self):
+        record = InjectionRecord()
+
+        self.assertEqual(
+            (dict(device=["anlage", "fernseher"], room=["küche"]), True),
+            record.changes(dict(device=["fernseher", "anlage"], room=["küche"]))
+        )
+
+    def test_only_added_values(self):
+        record = InjectionRecord()
+        record.update(dict(device=["fernseher"], room=["küche"]))
+
+        self.assertIsNone(record.changes(dict(device=["fernseher"], room=["küche"])))
+        self.assertEqual(
+            (dict(device=["anlage"]), False),
+            record.changes(dict(device=["fernseher", "anlage"], room=["küche"]))
+        )
+
+    def test_removed_values_from_vanilla(self):
+        record = InjectionRecord()
+        record.update(dict(device=["fernseher", "anlage"], room=["küche"]))
+
+        self.assertEqual(
+            (dict(device=["anlage", "vitrine"], room=["küche"]), True),
+            record.changes(dict(device=["anlage", "vitrine"], room=["küche"]))
+        )
+
+    def test_persisted_record(self):
+        directory = tempfile.TemporaryDirectory()
+        path = os.path.join(directory.name, "injections.json")
+
+        record = InjectionRecord(path, assistant="a1")
+        record.update(dict(device=["fernseher"], room=["küche"]))
+
+        self.assertTrue(InjectionRecord(path, assistant="a1").changes(dict(device=["fernseher"], room=["küche"]))[1])
+
+        record.store(dict(device=["fernseher"], room=["küche"]))
+
+        self.assertIsNone(InjectionRecord(path, assistant="a1").changes(dict(device=["fernseher"], room=["küche"])))
+
+        with open(path, "w") as f:
+            f.write("{")
+
+        self.assertTrue(InjectionRecord(path, assistant="a1").changes(dict(device=["fernseher"], room=["küche"]))[1])
+
+        directory.cleanup()
+
+    def test_record_of_other_assistant(self):
+        directory = tempfile.TemporaryDirectory()
+        path = os.path.join(directory.name, "injections.json")
+        entities = dict(device=["fernseher"], room=["küche"])
+
+        InjectionRecord(path, assistant="a1").store(entities)
+
+        self.assertEqual((entities, True), InjectionRecord(path, assistant="a2").changes(entities))
+        self.assertEqual((entities, True), InjectionRecord(path).changes(entities))
+
+        directory.cleanup()
+
+    def test_assistant_identity(self):
+        directory = tempfile.TemporaryDirectory()
+
+        self.assertIsNone(assistant_identity(directory.name))
+
+        with open(os.path.join(directory.name, "assistant.json"), "w") as f:
+            f.write('{"id": "proj_1"}')
+
+        identity = assistant_identity(directory.name)
+
+        with open(os.path.join(directory.name, "assistant.json"), "w") as f:
+            f.write('{"id": "proj_2"}')
+
+        self.assertIsNotNone(identity)
+        self.assertNotEqual(identity, assistant_identity(directory.name))
+
+        directory.cleanup()
@@ -0,0 +1,156 @@
+import os
+import socket
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+import actions
+import assistant.assistant as assistant_module
+from mocks.server import FakeOpenHABServer
+from openhab.model_service import ModelServer, ModelServiceError, RemoteOpenHAB
+from openhab.openhab import Item, OpenHAB
+
+
+class TestModelService(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "model.sock")
+        self.server = FakeOpenHABServer().start()
+        self.oh = OpenHAB(self.server.url, command_workers=1)
+        self.model_server = ModelServer(self.path, self.oh).start()
+        self.remote = RemoteOpenHAB(self.path)
+
+    def tearDown(self):
+        self.remote.close()
+        self.model_server.stop()
+        self.server.stop()
+        self.directory.cleanup()
+
+    def test_queries(self):
+        location = self.remote.get_location("esszimmer")
+
+        self.assertEqual("esszimmer", location.name)
+        self.assertTrue(location.is_location())
+        self.assertIsNone(self.remote.get_location("NotExisting"))
+
+        lights = self.remote.get_relevant_items("Licht", location)
+
+        self.assertEqual({"Lampe_Esszimmer", "Lampe_Vitrine"}, {item.name for item in lights})
+        self.assertIn(self.remote.items["Lampe_Vitrine"], lights)
+        self.assertEqual(("Anlage_Volume", "Anlage_An_Aus"), self.remote.items["Anlage"].has_points)
+        self.assertNotIn("NotExisting", self.remote.items)
+        self.assertEqual(len(self.oh.items), len(self.remote.items.values()))
+
+        temperatures = self.remote.get_items_with_attributes(
+            "Point_Measurement", "Property_Temperature", location=self.remote.get_location("wohnzimmer")
+        )
+
+        self.assertEqual(["Temperature_Livingroom"], [item.name for item in temperatures])
+        self.assertEqual(self.oh.get_injections(), self.remote.get_injections())
+        self.assertEqual(self.oh.additional_synonyms, self.remote.additional_synonyms)
+
+    def test_commands_and_states(self):
+        self.server.states["Lampe_Bett"] = "ON"
+        bed_light = self.remote.items["Lampe_Bett"]
+
+        self.assertEqual("ON", self.remote.get_state(bed_light))
+        self.assertEqual({bed_light: "ON"}, self.remote.get_states([bed_light]))
+        self.assertEqual([], self.remote.send_command_to_devices([bed_light], "OFF"))
+        self.assertEqual([("Lampe_Bett", "OFF")], self.server.commands)
+
+        self.server.remove_item("Lampe_Bett")
+        self.oh.reload_items()
+
+        self.assertEqual([bed_light], self.remote.send_command_to_devices([bed_light], "ON"))
+
+    def test_vocabulary_changed(self):
+        notifications = []
+        self.remote.add_vocabulary_listener(lambda: notifications.append(True))
+        bed_light = self.remote.items["Lampe_Bett"]
+
+        self.server.remove_item("Lampe_Bett")
+        self.oh.reload_items()
+
+        self.assertIsNone(self.remote.get_location("NotExisting"))
+        self.assertEqual([True], notifications)
+        self.assertNotIn("Lampe_Bett", self.remote.items)
+        self.assertIsNotNone(bed_light)
+
+    def test_client_startup(self):
+        assistant = assistant_module.TestAssistant()
+        assistant.conf['secret'].update(model_service='client', model_socket=self.path)
+
+        with patch.object(actions, "openhab"), patch.object(actions, "coalescer"), \
+                patch.object(actions, "site_languages"):
+            self.assertIsNone(actions.create_model(assistant))
+            actions.start_model(assistant)
+
+            self.server.remove_item("Lampe_Bett")
+            self.oh.reload_items()
+            self.assertIsNone(actions.openhab.get_location("NotExisting"))
+
+            self.assertFalse(actions.openhab.items.complete)
+            actions.openhab.close()
+
+    def test_model_changed(self):
+        bed_light = self.remote.items["Lampe_Bett"]
+        moved = Item("Lampe_Bett", bed_light.label, bed_light.item_type)
+        moved.semantics = bed_light.semantics
+        moved.relates_to = bed_light.relates_to
+        moved.has_location = "wohnzimmer"
+
+        self.oh.apply_item_changes(dict(Lampe_Bett=moved))
+        living_room = self.remote.get_location("wohnzimmer")
+
+        self.assertEqual("wohnzimmer", self.remote.items["Lampe_Bett"].has_location)
+        self.assertIn(
+            self.remote.items["Lampe_Bett"], self.remote.get_relevant_items("Licht", living_room)
+        )
+
+    def test_commands_not_sent_twice(self):
+        path = os.path.join(self.directory.name, "hanging.sock")
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(path)
+        listener.listen()
+        requests = []
+
+        def serve():
+            while True:
+                try:
+                    connection, _ = listener.accept()
+                except OSError:
+                    return
+
+                # Receive the request but never answer it
+                requests.append(connection.makefile("rb").readline())
+                connection.close()
+
+        threading.Thread(target=serve, daemon=True).start()
+        remote = RemoteOpenHAB(path, timeout=1)
+        bed_light = self.oh.items["Lampe_Bett"]
+
+        self.assertEqual([bed_light], remote.send_command_to_devices([bed_light], "ON"))
+        self.assertEqual(1, len(requests))
+        self.assertIsNone(remote.get_state(bed_light))
+        self.assertEqual(3, len(requests))
+
+        remote.close()
+        listener.close()
+
+    def test_server_restart(self):
+        self.assertIsNotNone(self.remote.get_location("esszimmer"))
+
+        self.model_server.stop()
+        self.model_server = ModelServer(self.path, self.oh).start()
+
+        self.assertIsNotNone(self.remote.get_location("esszimmer"))
+
+    def test_unavailable(self):
+        self.model_server.stop()
+
+        with self.assertRaises(ModelServiceError):
+            self.remote.get_location("esszimmer")
+
+        self.model_server = ModelServer(self.path, self.oh).start()
+        self.assertIsNotNone(self.remote.get_location("esszimmer"))
@@ -1,7 +1,17 @@
+import asyncio
+import os
 import responses
+import tempfile
 import unittest
 from openhab.openhab import OpenHAB, Item
-from mocks.mocks import load_mocks, openhab_mock_base, add_item_command_mock, add_get_state_mock
+from openhab.index import ItemIndex
+from openhab.phrases import PhraseIndex, normalize_phrase
+from openhab.json_stream import iter_json_array
+from mocks.mocks import load_mocks, openhab_mock_base, add_item_command_mock, add_get_state_mock, add_states_mock
+from mocks.server import FakeOpenHABServer
+from openhab.async_openhab import AsyncOpenHAB
+from openhab.cache import StateCache
+from common.tracing import Trace
 
 
 class TestOpenHAB(unittest.TestCase):
@@ -24,11 +34,28 @@ class TestOpenHAB(unittest.TestCase):
         light_dining = oh.items["Lampe_Esszimmer"]
         stereo = oh.items["Anlage_An_Aus"]
 
-        oh.send_command_to_devices([
+        failed_devices = oh.send_command_to_devices([
             light_dining,
             stereo
         ], "OFF")
 
+        self.assertEqual([], failed_devices)
+
+    @responses.activate
+    def test_send_command_failed(self):
+        load_mocks()
+        add_item_command_mock()
+        responses.add(responses.POST, openhab_mock_base + '/rest/items/Lampe_Vitrine', status=404)
+        oh = OpenHAB(openhab_mock_base)
+
+        failed_devices = oh.send_command_to_devices([
+            oh.items["Lampe_Esszimmer"],
+            oh.items["Lampe_Vitrine"],
+            oh.items["Lampe_Bett"]
+        ], "ON")
+
+        self.assertEqual([oh.items["Lampe_Vitrine"], oh.items["Lampe_Bett"]], failed_devices)
+
     @responses.activate
     def test_get_state(self):
         load_mocks()
@@ -38,6 +65,32 @@ class TestOpenHAB(unittest.TestCase):
         state = oh.get_state(oh.items['Lampe_Bett'])
         self.assertEqual("OFF", state)
 
+    def test_get_states(self):
+        server = FakeOpenHABServer().start()
+        server.states.update(Temperature_Livingroom="23.1", Lampe_Bett="ON")
+
+        try:
+            oh = OpenHAB(server.url)
+            items = [oh.items["Temperature_Livingroom"], oh.items["Lampe_Bett"], oh.items["Lampe_Vitrine"]]
+            requests_before = oh.connection_stats()["requests"]
+
+            self.assertEqual(
+                {items[0]: "23.1", items[1]: "ON", items[2]: None},
+                oh.get_states(items)
+            )
+            self.assertEqual(requests_before + 1, oh.connection_stats()["requests"])
+            self.assertEqual({items[1]: "ON"}, oh.get_states(items[1:2]))
+            self.assertEqual(requests_before + 2, oh.connection_stats()["requests"])
+
+            cached = OpenHAB(server.url, state_max_age=60)
+            cached.load_states()
+            requests_before = cached.connection_stats()["requests"]
+
+            self.assertEqual("ON", cached.get_states([cached.items["Lampe_Bett"]])[cached.items["Lampe_Bett"]])
+            self.assertEqual(requests_before, cached.connection_stats()["requests"])
+        finally:
+            server.stop()
+
     @responses.activate
     def test_get_relevant_item(self):
         load_mocks()
@@ -94,6 +147,78 @@ class TestOpenHAB(unittest.TestCase):
 
         self.assertIsNone(location)
 
+    @responses.activate
+    def test_get_location_fuzzy(self):
+        load_mocks()
+        oh = OpenHAB(openhab_mock_base)
+
+        self.assertEqual(oh.items["wohnzimmer"], oh.get_location("Wohnzimer"))
+        self.assertEqual(oh.items["schlafzimmer"], oh.get_location("Schlaf-Zimmer"))
+        self.assertIsNone(oh.get_location("Wohnzimer", fuzzy=False))
+        self.assertIsNone(oh.get_location("Blubbzimmer"))
+
+    @responses.activate
+    def test_get_relevant_item_fuzzy(self):
+        load_mocks()
+        oh = OpenHAB(openhab_mock_base)
+
+        self.assertEqual({oh.items["Lampe_Bett"]}, oh.get_relevant_items("Bettlampen"))
+        self.assertEqual({oh.items["Lampe_Bett"]}, oh.get_relevant_items("Bett Lampe"))
+        self.assertEqual(set(), oh.get_relevant_items("Bettlampen", fuzzy=False))
+
+    @responses.activate
+    def test_resolution_cache(self):
+        load_mocks()
+        oh = OpenHAB(openhab_mock_base)
+        dining_room = oh.get_location("esszimmer")
+
+        lights = oh.get_relevant_items("Licht", dining_room)
+        lights.clear()
+
+        self.assertEqual(
+            {oh.items["Lampe_Esszimmer"], oh.items["Lampe_Vitrine"]},
+            oh.get_relevant_items(" licht ", dining_room)
+        )
+        self.assertEqual(dict(hits=1, misses=1, size=1, generation=oh.generation), oh.resolution_stats())
+
+        oh.get_relevant_items(["Anlage", "Licht"])
+        oh.get_relevant_items(["licht", "anlage"])
+
+        self.assertEqual(2, oh.resolution_stats()["hits"])
+
+        oh.reload_items()
+
+        self.assertEqual(2, len(oh.get_relevant_items("Licht", dining_room)))
+        self.assertEqual(dict(hits=2, misses=3, size=1, generation=oh.generation), oh.resolution_stats())
+
+    @responses.activate
+    def test_languages(self):
+        load_mocks()
+        oh = OpenHAB(openhab_mock_base, languages=["de", "en"])
+        bedroom = oh.items["schlafzimmer"]
+
+        self.assertEqual(bedroom, oh.get_location("bedroom", lang="en"))
+        self.assertIsNone(oh.get_location("bedroom", fuzzy=False))
+        self.assertEqual(bedroom, oh.get_location("schlafzimmer", lang="fr"))
+        self.assertEqual({oh.items["Lampe_Bett"]}, oh.get_relevant_items("Lights", bedroom, lang="en"))
+        self.assertEqual(set(), oh.get_relevant_items("Lights", bedroom, fuzzy=False))
+        self.assertEqual({oh.items["Lampe_Bett"]}, oh.get_relevant_items("Licht", bedroom))
+
+    def test_phrase_index(self):
+        index = PhraseIndex(["Wohnzimmer Lampe", "Wohnzimmerlampe", "Licht", "Bettlampe"])
+
+        self.assertEqual(3, len(index))
+        self.assertEqual("wohnzimmerlampe", normalize_phrase("Wohnzimmer-Lampe"))
+        self.assertEqual([(0, "Licht")], index.lookup("licht"))
+        self.assertEqual([], index.lookup("lich"))
+        self.assertEqual([(1, "Bettlampe")], index.lookup("Bettlampen"))
+        self.assertEqual(
+            [(1, "Wohnzimmer Lampe"), (1, "Wohnzimmerlampe")],
+            index.lookup("Wohnzimer Lampe")
+        )
+        self.assertEqual([(2, "Bettlampe")], index.lookup("Betlampen", max_distance=2))
+        self.assertEqual([], index.lookup("Betlampen", max_distance=1))
+
     @responses.activate
     def test_get_injections(self):
         load_mocks()
@@ -113,3 +238,324 @@ class TestOpenHAB(unittest.TestCase):
 
         self.assertIn("schlafzimmer", locations)
         self.assertNotIn("schlafzimmer", items)
+
+    @responses.activate
+    def test_compact_items(self):
+        load_mocks()
+        oh = OpenHAB(openhab_mock_base)
+        apartment = oh.items["wohnung"]
+
+        self.assertFalse(hasattr(apartment, "__dict__"))
+        self.assertEqual(("haus",), apartment.synonyms)
+        self.assertEqual(("Anlage_Volume", "Anlage_An_Aus"), oh.items["Anlage"].has_points)
+        self.assertIs(oh.items["Lampe_Bett"].semantics, oh.items["Lampe_Vitrine"].semantics)
+
+    @responses.activate
+    def test_index(self):
+        load_mocks()
+        oh = OpenHAB(openhab_mock_base)
+
+        self.assertEqual([oh.items["Anlage"]], oh.index.with_semantics("Equipment_Receiver"))
+        self.assertEqual(3, len(oh.index.with_property("Property_Light")))
+        self.assertIn(oh.items["wohnung"], oh.index.with_name("haus"))
+
+        apartment = oh.index.members_of(oh.items["wohnung"])
+
+        self.assertIn(oh.items["Anlage_An_Aus"], apartment)
+        self.assertIn(oh.items["schlafzimmer"], apartment)
+        self.assertNotIn(oh.items["garten"], apartment)
+        self.assertEqual(set(), oh.index.members_of(oh.items["Anlage"]))
+
+    @responses.activate
+    def test_reload_items(self):
+        load_mocks()
+        load_mocks(exclude=["Lampe_Bett"])
+        oh = OpenHAB(openhab_mock_base)
+
+        self.assertEqual(3, len(oh.get_relevant_items("Licht", oh.get_location("wohnung"))))
+
+        oh.reload_items()
+
+        self.assertNotIn("Lampe_Bett", oh.items)
+        self.assertEqual(2, len(oh.get_relevant_items("Licht", oh.get_location("wohnung"))))
+        self.assertEqual(0, len(oh.get_relevant_items("Bettlampe")))
+
+    @responses.activate
+    def test_item_is_part_of_location(self):
+        load_mocks()
+        oh = OpenHAB(openhab_mock_base)
+
+        self.assertTrue(oh.item_is_part_of_location(oh.items["Anlage_An_Aus"], oh.items["schlafzimmer"]))
+        self.assertTrue(oh.item_is_part_of_location(oh.items["Anlage_An_Aus"], oh.items["wohnung"]))
+        self.assertFalse(oh.item_is_part_of_location(oh.items["Anlage_An_Aus"], oh.items["wohnzimmer"]))
+        self.assertFalse(oh.item_is_part_of_location(oh.items["wohnung"], oh.items["wohnung"]))
+
+    def test_index_detects_cycles(self):
+        first = Item("first", "Erster", "Group")
+        first.semantics = "Location_Indoor_Room"
+        first.is_part_of = "second"
+
+        second = Item("second", "Zweiter", "Group")
+        second.semantics = "Location_Indoor_Floor"
+        second.is_part_of = "first"
+
+        lamp = Item("lamp", "Lampe", "Switch")
+        lamp.semantics = "Point_Control"
+        lamp.has_location = "first"
+
+        index = ItemIndex(dict(first=first, second=second, lamp=lamp))
+
+        self.assertEqual(1, len(index.cycles))
+        self.assertTrue(index.is_part_of(lamp, first))
+        self.assertTrue(index.is_part_of(lamp, second))
+        self.assertTrue(index.is_part_of(first, second))
+        self.assertEqual({first, second, lamp}, index.members_of(first))
+
+    @responses.activate
+    def test_index_with_changes(self):
+        load_mocks()
+        oh = OpenHAB(openhab_mock_base)
+        index = oh.index
+
+        moved = Item("Lampe_Bett", "Deckenlampe", "Switch")
+        moved.semantics = "Point_Control"
+        moved.relates_to = "Property_Light"
+        moved.has_location = "wohnzimmer"
+
+        added = Item("Lampe_Neu", "Stehlampe", "Switch")
+        added.semantics = "Point_Control"
+        added.has_location = "esszimmer"
+
+        changes = dict(Lampe_Bett=moved, Lampe_Neu=added, schlafzimmer=None)
+        updated = index.with_changes(changes)
+        items = {name: item for name, item in dict(index.items, **changes).items() if item is not None}
+        rebuilt = ItemIndex(items)
+
+        def names(table):
+            return {key: [item.name for item in listed] for key, listed in table.items()}
+
+        for table in ("by_semantics", "by_property", "by_type", "by_name"):
+            self.assertEqual(names(getattr(rebuilt, table)), names(getattr(updated, table)))
+
+        self.assertEqual(rebuilt.ancestors, updated.ancestors)
+        self.assertEqual(
+            {name: set(members) for name, members in rebuilt.location_members.items()},
+            {name: set(members) for name, members in updated.location_members.items()}
+        )
+        self.assertIn("Lampe_Bett", {item.name for item in index.members_of(index.items["schlafzimmer"])})
+        self.assertNotIn("Lampe_Bett", {item.name for item in index.members_of(index.items["wohnzimmer"])})
+        self.assertIn(moved, updated.members_of(updated.items["wohnzimmer"]))
+        self.assertIsNone(updated.members_of(index.items["schlafzimmer"]))
+        self.assertIsNot(index.phrases, updated.phrases)
+
+        relocated = Item("Lampe_Neu", "Stehlampe", "Switch")
+        relocated.semantics = "Point_Control"
+        relocated.has_location = "wohnzimmer"
+
+        self.assertIs(updated.phrases, updated.with_changes(dict(Lampe_Neu=relocated)).phrases)
+
+    @responses.activate
+    def test_get_state_from_cache(self):
+        load_mocks()
+        add_states_mock()
+        add_get_state_mock()
+        oh = OpenHAB(openhab_mock_base, state_max_age=60)
+
+        self.assertEqual("23.1", oh.get_state(oh.items["Temperature_Livingroom"]))
+        self.assertIsNone(oh.get_state(oh.items["Lampe_Bett"]))
+        self.assertEqual(2, len(responses.calls))
+
+        oh.state_cache.invalidate("Lampe_Bett")
+
+        self.assertEqual("OFF", oh.get_state(oh.items["Lampe_Bett"]))
+        self.assertEqual("OFF", oh.get_state(oh.items["Lampe_Bett"]))
+        self.assertEqual(3, len(responses.calls))
+
+    def test_state_cache_max_age(self):
+        now = [0]
+        cache = StateCache(10, clock=lambda: now[0])
+        cache.update("Lampe_Bett", "ON")
+
+        self.assertEqual((True, "ON"), cache.get("Lampe_Bett"))
+
+        now[0] = 11
+
+        self.assertEqual((False, None), cache.get("Lampe_Bett"))
+        self.assertEqual((False, None), cache.get("Lampe_Esszimmer"))
+
+    def test_connection_reuse(self):
+        server = FakeOpenHABServer().start()
+
+        try:
+            oh = OpenHAB(server.url, pool_size=2, command_workers=1)
+
+            for _ in range(5):
+                oh.get_state(oh.items["Lampe_Bett"])
+
+            oh.send_command_to_devices([oh.items["Lampe_Bett"], oh.items["Lampe_Vitrine"]], "ON")
+
+            self.assertEqual(dict(requests=8, connections=1), oh.connection_stats())
+            self.assertEqual([("Lampe_Bett", "ON"), ("Lampe_Vitrine", "ON")], server.commands)
+        finally:
+            server.stop()
+
+    def test_send_command_concurrently(self):
+        server = FakeOpenHABServer().start()
+
+        try:
+            oh = OpenHAB(server.url, command_workers=4)
+            lights = oh.get_relevant_items("Licht", oh.get_location("wohnung"))
+
+            self.assertEqual([], oh.send_command_to_devices(lights, "OFF"))
+            self.assertEqual(
+                {("Lampe_Bett", "OFF"), ("Lampe_Esszimmer", "OFF"), ("Lampe_Vitrine", "OFF")},
+                set(server.commands)
+            )
+        finally:
+            server.stop()
+
+    def test_group_commands(self):
+        server = FakeOpenHABServer().start()
+
+        try:
+            oh = OpenHAB(server.url, command_workers=1, group_commands=True)
+            lights = oh.get_relevant_items("Licht", oh.get_location("wohnung"))
+
+            self.assertEqual([], oh.send_command_to_devices(lights, "ON"))
+            self.assertEqual([("esszimmer", "ON"), ("Lampe_Bett", "ON")], server.commands)
+
+            del server.commands[:]
+            oh.send_command_to_devices([oh.items["Lampe_Esszimmer"], oh.items["Anlage_An_Aus"]], "OFF")
+
+            self.assertEqual([("Lampe_Esszimmer", "OFF"), ("Anlage_An_Aus", "OFF")], server.commands)
+        finally:
+            server.stop()
+
+    def test_group_commands_with_unknown_member(self):
+        server = FakeOpenHABServer().start()
+        server.add_item(dict(name="Steckdose_Esszimmer", type="Switch", groupNames=["esszimmer"], metadata={}))
+
+        try:
+            oh = OpenHAB(server.url, command_workers=1, group_commands=True)
+            lights = [oh.items["Lampe_Esszimmer"], oh.items["Lampe_Vitrine"]]
+
+            self.assertEqual([], oh.send_command_to_devices(lights, "ON"))
+            self.assertEqual([("Lampe_Esszimmer", "ON"), ("Lampe_Vitrine", "ON")], server.commands)
+
+            del server.commands[:]
+            server.remove_item("Steckdose_Esszimmer")
+            oh.reload_items()
+            oh.send_command_to_devices(lights, "ON")
+
+            self.assertEqual([("esszimmer", "ON")], server.commands)
+        finally:
+            server.stop()
+
+    def test_async_openhab(self):
+        server = FakeOpenHABServer().start()
+        server.states["Temperature_Livingroom"] = "23.1"
+        loop = asyncio.new_event_loop()
+
+        async def run():
+            oh = await AsyncOpenHAB.create(server.url)
+
+            self.assertIs(loop, oh.loop)
+
+            items = oh.get_items_with_attributes(
+                "Point_Measurement", "Property_Temperature", location=oh.get_location("wohnzimmer")
+            )
+
+            self.assertEqual([oh.items["Temperature_Livingroom"]], items)
+            self.assertEqual("23.1", await oh.async_get_state(items[0]))
+
+            trace = Trace("test")
+
+            with trace.activate():
+                failed_devices = await oh.async_send_command_to_devices(
+                    [oh.items["Lampe_Bett"], oh.items["Lampe_Vitrine"]], "ON"
+                )
+
+            self.assertEqual([], failed_devices)
+            self.assertIn("openhab", trace.spans)
+            self.assertEqual({("Lampe_Bett", "ON"), ("Lampe_Vitrine", "ON")}, set(server.commands))
+
+            events = asyncio.Queue()
+            stream = loop.create_task(oh.stream_events(events.put))
+
+            while oh.event_stream is None:
+                await asyncio.sleep(0.01)
+
+            await loop.run_in_executor(None, lambda: oh.event_stream.connected.wait(5))
+            server.remove_item("Lampe_Bett")
+            event = await asyncio.wait_for(events.get(), 5)
+
+            self.assertEqual("ItemRemovedEvent", event["type"])
+            self.assertNotIn("Lampe_Bett", oh.items)
+
+            stream.cancel()
+            await asyncio.gather(stream, return_exceptions=True)
+
+            self.assertIsNone(oh.event_stream)
+
+        try:
+            loop.run_until_complete(run())
+        finally:
+            loop.close()
+            server.stop()
+
+    def test_snapshot(self):
+        server = FakeOpenHABServer().start()
+        directory = tempfile.TemporaryDirectory()
+        snapshot_path = os.path.join(directory.name, "items.snapshot")
+
+        try:
+            OpenHAB(server.url, snapshot_path=snapshot_path)
+            self.assertTrue(os.path.exists(snapshot_path))
+
+            server.remove_item("Lampe_Bett")
+            changes = []
+
+            oh = OpenHAB(server.url, snapshot_path=snapshot_path, load=False)
+            oh.add_vocabulary_listener(lambda: changes.append(oh.get_vocabulary()))
+            oh.load()
+
+            self.assertIsNotNone(oh.revalidation)
+            oh.revalidation.join(5)
+
+            self.assertNotIn("Lampe_Bett", oh.items)
+            self.assertEqual(2, len(oh.get_relevant_items("Licht", oh.get_location("wohnung"))))
+            self.assertEqual(1, len(changes))
+            self.assertNotIn("bettlampe", changes[0][0])
+        finally:
+            server.stop()
+
+        oh = OpenHAB(server.url, snapshot_path=snapshot_path)
+        oh.revalidation.join(5)
+
+        self.assertNotIn("Lampe_Bett", oh.items)
+        self.assertIn("Lampe_Vitrine", oh.items)
+        self.assertEqual(oh.items["wohnung"], oh.get_location("haus"))
+
+        directory.cleanup()
+
+    def test_iter_json_array(self):
+        data = '[{"label": "Vitrine, [alt]", "value": 23.5}, -1.5e3, ["ü"], true, null]'.encode("utf-8")
+
+        for size in (1, 3, 64):
+            chunks = [data[i:i + size] for i in range(0, len(data), size)]
+            self.assertEqual(
+                [dict(label="Vitrine, [alt]", value=23.5), -1500.0, ["ü"], True, None],
+                list(iter_json_array(chunks))
+            )
+
+        with self.assertRaises(ValueError):
+            list(iter_json_array([b'[{"name": "Lampe_Bett"}']))
+
+    @responses.activate
+    def test_load_items_without_streaming(self):
+        load_mocks()
+        load_mocks()
+        streamed = OpenHAB(openhab_mock_base)
+        parsed = OpenHAB(openhab_mock_base, stream_items=False)
+
+        self.assertEqual(list(streamed.items), list(parsed.items))
@@ -0,0 +1,86 @@
+import json
+import os
+import tempfile
+import unittest
+
+from assistant.assistant import TestIntent, TestIntentMessage, TestSlot, TestSlots, TestValue
+from assistant.profiling import IntentProfiler, call, slot_values
+from common.tracing import Trace, traced
+
+
+class Lamp:
+    def __init__(self, name):
+        self.name = name
+
+
+@traced("resolve", details=lambda items: [item.name for item in items])
+def resolve(spoken):
+    return [Lamp(spoken.capitalize())]
+
+
+def message(room="wohnzimmer"):
+    return TestIntentMessage(TestIntent("switchDeviceOn"), TestSlots(dict(room=TestSlot([TestValue(room)]))))
+
+
+class TestIntentProfiler(unittest.TestCase):
+    def test_keep_slowest(self):
+        profiler = IntentProfiler(size=2)
+
+        for room, duration in (("bad", 0.1), ("flur", 0.3), ("küche", 0.2)):
+            trace = Trace("switchDeviceOn")
+            profiler.start(trace)
+            self.assertTrue(profiler.finish(trace, message(room), duration))
+
+        self.assertFalse(profiler.finish(Trace("switchDeviceOn"), message("keller"), 0.05))
+        self.assertEqual(
+            [(300.0, {"room": ["flur"]}), (200.0, {"room": ["küche"]})],
+            [(entry["duration_ms"], entry["slots"]) for entry in profiler.slowest()]
+        )
+
+    def test_details_and_profile(self):
+        profiler = IntentProfiler(sample_rate=0.5, sample=lambda: 0.25)
+        trace = Trace("switchDeviceOn")
+        profile = profiler.start(trace)
+
+        self.assertIsNotNone(profile)
+
+        with trace.activate():
+            call(profile, resolve, "lampe")
+
+        resolve("ohne trace")
+        profiler.finish(trace, message(), 0.1, profile)
+        entry = profiler.slowest()[0]
+
+        self.assertEqual({"resolve": [["Lampe"]]}, entry["details"])
+        self.assertIn("resolve", entry["stages"])
+        self.assertIn("resolve", entry["profile"])
+        self.assertIsNone(IntentProfiler(sample_rate=0.5, sample=lambda: 0.75).start(Trace("switchDeviceOn")))
+
+    def test_no_details_without_profiler(self):
+        trace = Trace("switchDeviceOn")
+
+        with trace.activate():
+            resolve("lampe")
+
+        self.assertIsNone(trace.details)
+
+    def test_log(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "slow.log")
+            profiler = IntentProfiler(size=1, path=path)
+
+            for duration in (0.1, 0.05, 0.2):
+                trace = Trace("switchDeviceOn")
+                profiler.start(trace)
+                profiler.finish(trace, message(), duration)
+
+            profiler.log.close()
+
+            with open(path, encoding="utf-8") as f:
+                entries = [json.loads(line) for line in f]
+
+        self.assertEqual([100.0, 200.0], [entry["duration_ms"] for entry in entries])
+
+    def test_slot_values(self):
+        self.assertEqual({"room": ["bad"]}, slot_values(message("bad").slots))
+        self.assertEqual({}, slot_values(None))
@@ -0,0 +1,107 @@
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from assistant.sounds import ResponseSounds, render_with_command
+
+
+class TestResponseSounds(unittest.TestCase):
+    def setUp(self):
+        self.rendered = []
+        self.registered = {}
+
+    def render(self, sentence):
+        self.rendered.append(sentence)
+        return sentence.encode("utf-8")
+
+    def register(self, name, data):
+        self.registered[name] = bytes(data)
+
+    def use(self, sounds, sentence, times):
+        results = [sounds.get(sentence) for _ in range(times)]
+        sounds.wait()
+        return results
+
+    def test_render_frequent_sentences(self):
+        sounds = ResponseSounds(self.render, self.register, max_sounds=2, min_count=2)
+
+        self.assertEqual([None, None], self.use(sounds, "Licht an", 2))
+        self.assertEqual("[[sound:response0]]", sounds.get("Licht an"))
+        self.assertEqual(["Licht an"], self.rendered)
+        self.assertEqual({"response0": b"Licht an"}, self.registered)
+        self.assertIsNone(sounds.get("Es sind 21 Grad"))
+        self.assertEqual(dict(hits=1, misses=3, sounds=1), sounds.stats())
+
+    def test_evict_least_used(self):
+        sounds = ResponseSounds(self.render, self.register, max_sounds=1, min_count=2)
+        self.use(sounds, "Licht an", 2)
+        self.use(sounds, "Licht aus", 2)
+
+        self.assertEqual(["Licht an"], self.rendered)
+
+        self.use(sounds, "Licht aus", 1)
+
+        self.assertEqual("[[sound:response0]]", sounds.get("Licht aus"))
+        self.assertEqual(["Licht an", "Licht aus"], self.rendered)
+        self.assertEqual({"response0": b"Licht aus"}, self.registered)
+        self.assertIsNone(sounds.get("Licht an"))
+
+    def test_counts_decay(self):
+        sounds = ResponseSounds(self.render, self.register, max_sounds=1, min_count=10, max_tracked=2)
+        self.use(sounds, "Licht an", 4)
+        self.use(sounds, "Licht aus", 1)
+        self.use(sounds, "Musik an", 1)
+
+        self.assertEqual({"Licht an": 2}, sounds.counts)
+
+    def test_render_failure(self):
+        def render(sentence):
+            raise OSError("no tts")
+
+        sounds = ResponseSounds(render, self.register, max_sounds=1, min_count=1)
+
+        self.assertEqual([None, None], self.use(sounds, "Licht an", 2))
+        self.assertEqual({"Licht an"}, sounds.failed)
+        self.assertEqual({}, self.registered)
+
+    def test_render_error(self):
+        def render(sentence):
+            raise KeyError("voice")
+
+        sounds = ResponseSounds(render, self.register, max_sounds=1, min_count=1)
+
+        self.assertEqual([None, None], self.use(sounds, "Licht an", 2))
+        self.assertEqual(set(), sounds.pending)
+        self.assertEqual({"Licht an"}, sounds.failed)
+
+    def test_restore(self):
+        with tempfile.TemporaryDirectory() as directory:
+            sounds = ResponseSounds(self.render, self.register, max_sounds=2, min_count=1, directory=directory)
+            sounds.load()
+            self.use(sounds, "Licht an", 1)
+            sounds.close()
+
+            registered = {}
+            restored = ResponseSounds(self.render, lambda name, data: registered.update({name: bytes(data)}),
+                                      max_sounds=2, min_count=1, directory=directory)
+            restored.load()
+
+            self.assertEqual({"response0": b"Licht an"}, registered)
+            self.assertEqual("[[sound:response0]]", restored.get("Licht an"))
+            self.assertEqual(["Licht an"], self.rendered)
+            restored.close()
+
+    def test_render_with_command(self):
+        script = "import sys; open(sys.argv[1], 'w', encoding='utf-8').write(sys.argv[2])"
+        render = render_with_command('"{}" -c "{}" {{file}} {{text}}'.format(sys.executable, script))
+
+        self.assertEqual("Licht an".encode("utf-8"), render("Licht an"))
+
+        with self.assertRaises(subprocess.CalledProcessError):
+            render_with_command('"{}" -c "import sys; sys.exit(1)"'.format(sys.executable))("Licht an")
+
+    def test_invalid_command(self):
+        for command in ("pico2wave -w {file} {voice}", "pico2wave -w {file} {0}", "pico2wave \"{file}"):
+            with self.assertRaises(ValueError):
+                render_with_command(command)
@@ -0,0 +1,55 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from openhab import synonyms
+from openhab.synonyms import load_synonym_table
+
+
+class TestSynonymTable(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.directory.name, "synonyms.cache")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_languages(self):
+        table = load_synonym_table(("de", "en"))
+
+        self.assertEqual(("de", "en"), table.languages)
+        self.assertEqual(["Location_Indoor_Room_Kitchen"], table.synonyms["de"]["küche"])
+        self.assertEqual(["Location_Indoor_Room_Kitchen"], table.synonyms["en"]["kitchen"])
+        self.assertNotIn("kitchen", table.synonyms["de"])
+        self.assertIn("lampen", table.all_synonyms)
+        self.assertIn("lamps", table.all_synonyms)
+
+    def test_cache_invalidated_by_mtime(self):
+        tags_directory = os.path.join(self.directory.name, "tags")
+        shutil.copytree(synonyms.TAGS_DIRECTORY, tags_directory)
+
+        with mock.patch.object(synonyms, "TAGS_DIRECTORY", tags_directory):
+            table = load_synonym_table(("de",), self.cache_path)
+
+            self.assertTrue(os.path.exists(self.cache_path))
+
+            with mock.patch.object(synonyms, "parse_synonyms", side_effect=AssertionError("cache not used")):
+                self.assertEqual(table.tags, load_synonym_table(("de",), self.cache_path).tags)
+
+            path = os.path.join(tags_directory, "tags_de.properties")
+
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("Equipment_Fan=Ventilator,Lüfter\n")
+
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+
+            self.assertEqual(["Equipment_Fan"], load_synonym_table(("de",), self.cache_path).synonyms["de"]["lüfter"])
+
+    def test_unreadable_cache(self):
+        with open(self.cache_path, "wb") as f:
+            f.write(b"broken")
+
+        self.assertIn("küche", load_synonym_table(("de",), self.cache_path).synonyms["de"])
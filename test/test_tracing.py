@@ -0,0 +1,154 @@
+import threading
+import time
+import unittest
+
+import requests
+
+from assistant.assistant import TestIntent, TestIntentMessage, TestSlots
+from assistant.profiling import IntentProfiler
+from common.tracing import StartupTimer, Trace, Tracer, Histogram, span, traced, current_trace
+
+
+class TestTracing(unittest.TestCase):
+    def test_histogram(self):
+        histogram = Histogram(buckets=(0.01, 0.1, 1))
+
+        for value in (0.005, 0.05, 0.05, 0.5, 5):
+            histogram.observe(value)
+
+        self.assertEqual([1, 2, 1, 1], histogram.counts)
+        self.assertEqual(5, histogram.count)
+        self.assertAlmostEqual(5.605, histogram.sum)
+        self.assertEqual(0.1, histogram.quantile(0.5))
+        self.assertEqual(5, histogram.quantile(0.95))
+
+    def test_spans(self):
+        tracer = Tracer()
+
+        @traced("resolve")
+        def resolve(depth):
+            if depth > 0:
+                resolve(depth - 1)
+
+        with span("resolve"):
+            pass
+
+        trace = tracer.start("switchDeviceOn")
+
+        with trace.activate():
+            self.assertIs(trace, current_trace())
+            resolve(3)
+
+            with span("openhab"):
+                pass
+
+        self.assertIsNone(current_trace())
+        self.assertEqual({"resolve", "openhab"}, set(trace.spans))
+
+        tracer.finish(trace)
+
+        self.assertEqual(
+            {("switchDeviceOn", "total"), ("switchDeviceOn", "resolve"), ("switchDeviceOn", "openhab")},
+            set(tracer.histograms)
+        )
+        self.assertEqual(1, tracer.histograms[("switchDeviceOn", "resolve")].count)
+
+    def test_trace_on_other_thread(self):
+        tracer = Tracer()
+        trace = tracer.start("getTemperature")
+
+        def task():
+            with span("openhab"):
+                pass
+
+        thread = threading.Thread(target=trace.wrap(task))
+        thread.start()
+        thread.join()
+
+        self.assertIn("openhab", trace.spans)
+
+    def test_render_prometheus(self):
+        tracer = Tracer(buckets=(0.1, 1))
+        tracer.observe('say "hi"', "total", 0.5)
+
+        self.assertEqual(
+            '# HELP snips_openhab_intent_duration_seconds Duration of the stages of the intent pipeline\n'
+            '# TYPE snips_openhab_intent_duration_seconds histogram\n'
+            'snips_openhab_intent_duration_seconds_bucket{intent="say \\"hi\\"",stage="total",le="0.1"} 0\n'
+            'snips_openhab_intent_duration_seconds_bucket{intent="say \\"hi\\"",stage="total",le="1"} 1\n'
+            'snips_openhab_intent_duration_seconds_bucket{intent="say \\"hi\\"",stage="total",le="+Inf"} 1\n'
+            'snips_openhab_intent_duration_seconds_sum{intent="say \\"hi\\"",stage="total"} 0.5\n'
+            'snips_openhab_intent_duration_seconds_count{intent="say \\"hi\\"",stage="total"} 1\n',
+            tracer.render_prometheus()
+        )
+        self.assertEqual(
+            'say "hi" total: 1 calls, avg 500.0 ms, p50 500.0 ms, p95 500.0 ms',
+            tracer.summary()
+        )
+
+    def test_counters(self):
+        tracer = Tracer(buckets=(1,))
+        tracer.add_counters("resolution_cache", lambda: dict(misses=1, hits=3))
+
+        self.assertEqual("", tracer.summary())
+        self.assertTrue(tracer.render_prometheus().endswith(
+            '# TYPE snips_openhab_resolution_cache_hits gauge\n'
+            'snips_openhab_resolution_cache_hits 3\n'
+            '# TYPE snips_openhab_resolution_cache_misses gauge\n'
+            'snips_openhab_resolution_cache_misses 1\n'
+        ))
+
+        tracer.observe("playMedia", "total", 0.2)
+
+        self.assertEqual(
+            "playMedia total: 1 calls, avg 200.0 ms, p50 200.0 ms, p95 200.0 ms\n"
+            "resolution_cache: hits 3, misses 1",
+            tracer.summary()
+        )
+
+    def test_startup_timer(self):
+        timer = StartupTimer(start=time.perf_counter() - 1)
+
+        self.assertTrue(timer.mark("hermes"))
+        self.assertTrue(timer.mark("model"))
+        self.assertFalse(timer.mark("hermes"))
+
+        offsets = timer.offsets()
+
+        self.assertEqual(["hermes", "model"], list(offsets))
+        self.assertGreaterEqual(offsets["hermes"], 1)
+        self.assertLessEqual(offsets["hermes"], offsets["model"])
+        self.assertRegex(timer.report(), r"^Startup: hermes \d+\.\d{3} s, model \d+\.\d{3} s$")
+
+    def test_metrics_server(self):
+        tracer = Tracer()
+        tracer.observe("playMedia", "total", 0.2)
+        server = tracer.start_server(0, host="127.0.0.1")
+        url = "http://{}:{}".format(*server.server_address)
+
+        response = requests.get(url + "/metrics")
+
+        self.assertEqual(200, response.status_code)
+        self.assertIn('intent="playMedia",stage="total"', response.text)
+        self.assertEqual(404, requests.get(url + "/other").status_code)
+        self.assertEqual(404, requests.get(url + "/slow").status_code)
+
+        tracer.profiler = IntentProfiler()
+        trace = Trace("playMedia")
+        tracer.profiler.start(trace)
+        tracer.profiler.finish(trace, TestIntentMessage(TestIntent("playMedia"), TestSlots({})), 0.2)
+        response = requests.get(url + "/slow")
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(["playMedia"], [entry["intent"] for entry in response.json()])
+
+        server.shutdown()
+        server.server_close()
+
+    def test_metrics_server_local_by_default(self):
+        server = Tracer().start_server(0)
+
+        self.assertEqual("127.0.0.1", server.server_address[0])
+
+        server.shutdown()
+        server.server_close()